@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
-    verbose_name = '账户管理'
\ No newline at end of file
+    verbose_name = '账户管理'
+
+    def ready(self):
+        # 注册令牌认证缓存的失效信号
+        from . import signals  # noqa: F401
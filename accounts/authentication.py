@@ -1,14 +1,38 @@
 """
 自定义令牌认证类 - 支持令牌过期和角色差异化过期时间
+
+令牌到用户的映射缓存在共享缓存中（用户 ID、用户名、角色、状态和令牌创建时间），
+命中时认证不查询数据库；返回的用户只加载了这些字段，其余字段在首次访问时一次性加载。
+缓存有效期不超过令牌的剩余有效期；用户保存、删除和令牌删除时由 accounts.signals 清除
 """
 from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
 from django.utils import timezone
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework.exceptions import AuthenticationFailed
 
+TOKEN_CACHE_PREFIX = 'auth_token'
+# 缓存的用户字段（认证和权限判断用到的字段）
+CACHED_USER_FIELDS = ('id', 'username', 'role', 'is_active', 'is_superuser', 'is_staff')
+
+
+def _token_cache_key(key):
+    return f'{TOKEN_CACHE_PREFIX}:{key}'
+
+
+def invalidate_token_cache(user):
+    """清除用户全部令牌的认证缓存
+    
+    用户保存或删除时由 accounts.signals 调用；用 QuerySet.update() 修改缓存字段时需要手动调用
+    """
+    keys = Token.objects.filter(user_id=user.pk).values_list('key', flat=True)
+    cache.delete_many([_token_cache_key(key) for key in keys])
+
 
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
@@ -20,26 +44,62 @@ class ExpiringTokenAuthentication(TokenAuthentication):
     
     def authenticate_credentials(self, key):
         """验证令牌，检查是否过期"""
-        try:
-            token = Token.objects.select_related('user').get(key=key)
-        except Token.DoesNotExist:
-            raise AuthenticationFailed('无效的令牌')
+        token = self.get_cached_token(key)
+        cached = token is not None
+        if not cached:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed('无效的令牌')
         
         if not token.user.is_active:
             raise AuthenticationFailed('用户已被禁用')
         
         # 检查令牌是否过期
         if self.is_token_expired(token):
-            token.delete()  # 删除过期令牌
+            token.delete()  # 删除过期令牌（缓存由删除信号清除）
             raise AuthenticationFailed('令牌已过期，请重新登录')
         
+        if not cached:
+            self.cache_token(token)
         return (token.user, token)
     
+    def get_cached_token(self, key):
+        """从缓存构造令牌和用户，未缓存时返回 None"""
+        data = cache.get(_token_cache_key(key))
+        if data is None:
+            return None
+        
+        # 只带缓存字段的用户，其余字段为延迟加载（from_db 要求值按模型字段顺序排列）
+        user_model = get_user_model()
+        field_names = [field.attname for field in user_model._meta.concrete_fields
+                       if field.attname in CACHED_USER_FIELDS]
+        user = user_model.from_db(DEFAULT_DB_ALIAS, field_names, [data[name] for name in field_names])
+        token = Token.from_db(DEFAULT_DB_ALIAS, ['key', 'user_id', 'created'], [key, user.pk, data['created']])
+        token.user = user
+        return token
+    
+    def cache_token(self, token):
+        """缓存令牌，有效期不超过令牌的剩余有效期"""
+        timeout = getattr(settings, 'TOKEN_CACHE_SECONDS', 0)
+        remaining = (self.get_token_expire_time(token) - timezone.now()).total_seconds()
+        timeout = int(min(timeout, remaining))
+        if timeout <= 0:
+            return
+        
+        data = {field: getattr(token.user, field) for field in CACHED_USER_FIELDS}
+        data['created'] = token.created
+        cache.set(_token_cache_key(token.key), data, timeout)
+    
     def is_token_expired(self, token):
         """
         检查令牌是否过期
         根据用户角色返回不同的过期时间
         """
+        return timezone.now() > self.get_token_expire_time(token)
+    
+    def get_token_expire_time(self, token):
+        """令牌的过期时间"""
         user = token.user
         
         # 获取配置的过期时间
@@ -54,9 +114,7 @@ class ExpiringTokenAuthentication(TokenAuthentication):
             expire_seconds = token_config.get('USER_TOKEN_EXPIRE_SECONDS', 7 * 24 * 60 * 60)
         
         # 计算过期时间
-        expire_time = token.created + timedelta(seconds=expire_seconds)
-        
-        return timezone.now() > expire_time
+        return token.created + timedelta(seconds=expire_seconds)
     
     @staticmethod
     def get_token_expire_info(user):
@@ -85,7 +143,7 @@ def refresh_token(user):
     刷新用户令牌
     删除旧令牌并创建新令牌
     """
-    # 删除现有令牌
+    # 删除现有令牌（缓存由删除信号清除）
     Token.objects.filter(user=user).delete()
     # 创建新令牌
     token = Token.objects.create(user=user)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_vipapplication_reject_reason'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginrecord',
+            index=models.Index(fields=['login_time'], name='loginrecord_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='onlineuser',
+            index=models.Index(fields=['is_online', 'last_activity'], name='onlineuser_activity_idx'),
+        ),
+    ]
@@ -32,6 +32,16 @@ class User(AbstractUser):
         verbose_name = '用户'
         verbose_name_plural = '用户'
 
+    def refresh_from_db(self, using=None, fields=None):
+        """加载延迟字段时一次加载全部延迟字段
+        
+        令牌认证缓存构造的用户只带少量字段，避免每访问一个字段就查询一次
+        """
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields and set(fields) & deferred_fields:
+            fields = list(set(fields) | deferred_fields)
+        super().refresh_from_db(using=using, fields=fields)
+
     @property
     def available_storage(self):
         """可用存储空间"""
@@ -99,6 +109,10 @@ class LoginRecord(models.Model):
         verbose_name = '登录记录'
         verbose_name_plural = '登录记录'
         ordering = ['-login_time']
+        indexes = [
+            # 登录趋势：login_time >= ?（按日期范围扫描）
+            models.Index(fields=['login_time'], name='loginrecord_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.login_time}"
@@ -113,6 +127,10 @@ class OnlineUser(models.Model):
     class Meta:
         verbose_name = '在线用户'
         verbose_name_plural = '在线用户'
+        indexes = [
+            # 在线统计：is_online = 1 AND last_activity >= ?
+            models.Index(fields=['is_online', 'last_activity'], name='onlineuser_activity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {'在线' if self.is_online else '离线'}"
\ No newline at end of file
@@ -22,6 +22,13 @@ class UserSerializer(serializers.ModelSerializer):
                            'used_storage', 'available_storage', 'storage_usage_percentage',
                            'role', 'is_vip', 'is_admin_user']
     
+    def update(self, instance, validated_data):
+        """只写入修改的字段，避免整行保存覆盖并发更新的 used_storage"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+    
     def get_role_display(self, obj):
         """获取角色显示名称"""
         return obj.get_role_display()
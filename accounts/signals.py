@@ -0,0 +1,35 @@
+"""
+令牌认证缓存失效
+
+用户的缓存字段（用户名、角色、启用状态等）可能变化、用户被删除或令牌被删除时清除认证缓存，
+通过模型保存和删除的任何途径（视图、管理后台、命令行）修改都不会留下过期的缓存
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import CACHED_USER_FIELDS, _token_cache_key, invalidate_token_cache
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_token_cache(sender, instance, created=False, update_fields=None, **kwargs):
+    """用户保存后清除其令牌缓存（只更新未缓存的字段时跳过）"""
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(CACHED_USER_FIELDS):
+        return
+    invalidate_token_cache(instance)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_deleted_user_token_cache(sender, instance, **kwargs):
+    """用户删除后清除其令牌缓存（级联删除的令牌另由令牌的删除信号逐个清除）"""
+    invalidate_token_cache(instance)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token_cache(sender, instance, **kwargs):
+    """令牌删除（登出、刷新、过期、随用户删除）后清除其缓存"""
+    cache.delete(_token_cache_key(instance.key))
@@ -8,7 +8,7 @@ from django.contrib.auth import authenticate
 from django.utils import timezone
 from django.db.models import Sum, Count
 from django.db.models.functions import TruncDate
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from .models import User, VIPApplication, LoginRecord, OnlineUser
 from .serializers import UserSerializer, RegisterSerializer, VIPApplicationSerializer, VIPApplicationCreateSerializer
 from .authentication import refresh_token, ExpiringTokenAuthentication
@@ -178,7 +178,7 @@ def change_username(request):
     # 更新用户名
     old_username = request.user.username
     request.user.username = new_username
-    request.user.save()
+    request.user.save(update_fields=['username', 'updated_at'])
     
     return Response({
         'message': '用户名修改成功',
@@ -217,7 +217,7 @@ def upload_avatar(request):
         
         # 保存新头像
         request.user.avatar = avatar_file
-        request.user.save()
+        request.user.save(update_fields=['avatar', 'updated_at'])
         
         serializer = UserSerializer(request.user)
         return Response({
@@ -237,7 +237,7 @@ def delete_avatar(request):
         if request.user.avatar:
             request.user.avatar.delete(save=False)
             request.user.avatar = None
-            request.user.save()
+            request.user.save(update_fields=['avatar', 'updated_at'])
         
         serializer = UserSerializer(request.user)
         return Response({
@@ -365,8 +365,10 @@ def admin_dashboard(request):
     
     # 最近 7 天登录趋势
     week_ago = today - timedelta(days=7)
+    # 按时间范围过滤（而不是 login_time__date），可以使用 login_time 索引
+    week_ago_start = timezone.make_aware(datetime.combine(week_ago, time.min))
     login_trend = LoginRecord.objects.filter(
-        login_time__date__gte=week_ago
+        login_time__gte=week_ago_start
     ).annotate(
         date=TruncDate('login_time')
     ).values('date').annotate(
@@ -481,7 +483,8 @@ def admin_update_user(request, user_id):
     if is_active is not None:
         user.is_active = is_active
     
-    user.save()
+    # 只写入可修改的字段，不覆盖并发更新的 used_storage
+    user.save(update_fields=['role', 'storage_quota', 'is_active', 'updated_at'])
     
     return Response({
         'message': '用户信息更新成功',
@@ -547,7 +550,7 @@ def admin_review_vip(request, application_id):
         user = application.user
         user.role = User.ROLE_VIP
         user.storage_quota = User.STORAGE_VIP
-        user.save()
+        user.save(update_fields=['role', 'storage_quota', 'updated_at'])
         message = 'VIP申请已通过，用户已升级'
     elif action == 'reject':
         application.status = VIPApplication.STATUS_REJECTED
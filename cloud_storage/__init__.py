@@ -1 +1,4 @@
-# This file is intentionally left empty
\ No newline at end of file
+# Django 启动时加载 Celery 应用，使 shared_task 绑定到该应用
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
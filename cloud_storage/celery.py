@@ -0,0 +1,15 @@
+"""
+Celery 应用
+
+worker 启动：celery -A cloud_storage worker -l info
+任务定义在各应用的 tasks.py 中，自动发现
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cloud_storage.settings')
+
+app = Celery('cloud_storage')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -157,10 +157,35 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # File upload settings
+# upload/ 接口的文件由 files.upload_handlers 直接写入存储，以下限制只影响其他上传
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
+# 流式上传配置：multipart 上传的文件边接收边写入存储后端
+STREAMING_UPLOAD_CONFIG = {
+    'QUEUE_SIZE': 2,  # 接收与发送之间的缓冲块数（双缓冲）
+    'MULTIPART_ALLOWANCE': 64 * 1024,  # 请求体中文件内容以外部分（分隔符、字段头、其他字段）的估计上限
+}
+
+# 分片上传（断点续传）配置
+# 单个分片由 PUT 请求体直接写入存储，不受上面的内存上限限制
+CHUNKED_UPLOAD_CONFIG = {
+    'CHUNK_SIZE': 8 * 1024 * 1024,        # 默认分片大小（8MB）
+    'MIN_CHUNK_SIZE': 1024 * 1024,        # 最小分片大小（1MB，Swift SLO 分段下限）
+    'MAX_CHUNK_SIZE': 64 * 1024 * 1024,   # 最大分片大小（64MB）
+    'SESSION_TTL_SECONDS': 24 * 60 * 60,  # 会话有效期，每收到一个分片顺延
+}
+
+# 秒传配置：已有相同内容时校验抽样范围的摘要后直接创建文件
+INSTANT_UPLOAD_CONFIG = {
+    'SAMPLE_COUNT': 3,           # 抽样范围个数
+    'SAMPLE_SIZE': 64 * 1024,    # 每个抽样范围的大小（64KB）
+}
+
+# 流式下载每次读取的块大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # 64KB
+
 # Additional settings for large file uploads
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
@@ -177,26 +202,141 @@ SWIFT_CONFIG = {
     'cacert': os.getenv('OS_CACERT', None),
 }
 
+# Swift 连接池配置（进程内共享令牌和 keep-alive 连接）
+SWIFT_POOL_CONFIG = {
+    'MAX_IDLE_CONNECTIONS': int(os.getenv('SWIFT_POOL_MAX_IDLE', '8')),  # 最多保留的空闲连接
+    'TOKEN_TTL_SECONDS': 50 * 60,  # 令牌缓存时间，略短于 Keystone 默认的 1 小时
+    'RETRIES': 5,                  # 单次请求的重试次数
+    'TIMEOUT': None,               # 连接超时（秒）
+    'AUTH_RETRY_INTERVAL': 30,     # 认证失败后的冷却时间（秒）
+}
+
+# Swift 分段上传（Static Large Object）配置
+SWIFT_SLO_CONFIG = {
+    'THRESHOLD': 1024 * 1024 * 1024,     # 超过此大小使用分段上传（1GB）
+    'SEGMENT_SIZE': 64 * 1024 * 1024,    # 分段大小（64MB）
+    'MAX_SEGMENTS': 1000,                # 单个清单最多分段数，超过时自动增大分段
+    'WORKERS': 4,                        # 并行上传线程数
+    'SEGMENT_RETRIES': 3,                # 单个分段失败后的重试次数
+}
+
+# 已确认存在的容器缓存时间（秒），上传时不再逐次 HEAD 容器
+SWIFT_CONTAINER_CACHE_TTL = 60 * 60
+
+# 流式写入 Swift 时为失败重试在内存中保留的数据量上限（8MB）
+# 容器在缓存期内被删除时重建容器，不超过此大小的上传自动重试一次
+SWIFT_STREAM_RETRY_BUFFER = 8 * 1024 * 1024
+
+# Swift 批量删除配置（集群启用 bulk-delete 中间件时每批一个请求，否则逐个删除）
+SWIFT_BULK_DELETE_CONFIG = {
+    'BATCH_SIZE': 1000,  # 每个 bulk-delete 请求的对象数（不超过集群的 max_deletes_per_request）
+    'WORKERS': 4,        # 同时进行的删除请求数
+}
+
+# Swift 临时 URL 签名配置
+# 需先在账户上设置密钥：swift post -m "Temp-URL-Key:<key>"；未配置时下载走直接下载接口
+SWIFT_TEMP_URL_KEY = os.getenv('SWIFT_TEMP_URL_KEY', '')
+SWIFT_TEMP_URL_DIGEST = 'sha256'
+SWIFT_TEMP_URL_BIND_IP = False  # 是否将临时 URL 限制为请求方 IP
+# 可选：固定存储 URL（如 http://host:8080/v1/AUTH_xxx），设置后生成临时 URL 无需认证
+SWIFT_STORAGE_URL = os.getenv('SWIFT_STORAGE_URL', '')
+
 # Local file storage settings (enabled as backup)
 LOCAL_STORAGE_ENABLED = True
 LOCAL_STORAGE_PATH = os.path.join(BASE_DIR, 'local_storage')
 
-# Cache settings (for password attempt limiting)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# 本地存储文件的输出方式
+# 'stream': Python 分块读取
+# 'sendfile': FileResponse，由 WSGI 服务器通过 os.sendfile 零拷贝发送
+# 'x-accel-redirect': 由 nginx 发送（需配置 internal location 指向 LOCAL_STORAGE_PATH）
+# 'x-sendfile': 由 Apache / lighttpd 发送
+LOCAL_STORAGE_SERVE_MODE = os.getenv('LOCAL_STORAGE_SERVE_MODE', 'sendfile')
+LOCAL_STORAGE_ACCEL_PREFIX = os.getenv('LOCAL_STORAGE_ACCEL_PREFIX', '/protected-storage/')
+
+# Cache settings (for password attempt limiting, download counters)
+# 多进程部署时需要共享缓存：设置 CACHE_REDIS_URL 后使用 Redis，否则使用进程内缓存
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
+
+# 下载计数配置
+# BUFFERED 时下载次数先在缓存中累加，由 flush_download_counters 定期批量写入数据库，
+# 需要共享缓存（进程内缓存中的计数其他进程无法写入），默认在配置了 Redis 缓存时开启；
+# 限制了下载次数的分享不经过缓存，每次下载直接原子地计数
+DOWNLOAD_COUNTER_CONFIG = {
+    'BUFFERED': os.getenv('DOWNLOAD_COUNTER_BUFFERED', 'True' if CACHE_REDIS_URL else 'False').lower() == 'true',
+    'FLUSH_BATCH_SIZE': 500,
+    'FLUSH_INTERVAL_SECONDS': 60,
 }
 
+# 令牌认证缓存有效期（秒），0 表示不缓存
+# 缓存在禁用用户、修改角色时清除，多进程部署时需要共享缓存才能及时生效，默认在配置了 Redis 缓存时开启
+TOKEN_CACHE_SECONDS = int(os.getenv('TOKEN_CACHE_SECONDS', '300' if CACHE_REDIS_URL else '0'))
+
 # Password attempt settings
 PASSWORD_MAX_ATTEMPTS = 3  # 最大尝试次数
 PASSWORD_LOCKOUT_TIME = 300  # 锁定时间（秒）- 5分钟
 
+# 限制下载次数的分享：下载占用名额时签发续传凭据（Cookie）的有效期（秒），
+# 有效期内不包含文件开头的范围请求（断点续传、拖动进度条）不再占用名额
+SHARE_RESUME_TOKEN_SECONDS = 24 * 60 * 60
+
 # Celery settings
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = TIME_ZONE
\ No newline at end of file
+CELERY_TIMEZONE = TIME_ZONE
+
+# 未配置 REDIS_URL 时任务在提交它的进程内同步执行（开发、测试不需要 Redis 和 worker）
+CELERY_TASK_ALWAYS_EAGER = os.getenv(
+    'CELERY_TASK_ALWAYS_EAGER', 'False' if os.getenv('REDIS_URL') else 'True'
+).lower() in ('true', '1', 'yes')
+# 任务状态记录在 Job 表中，不写入结果后端
+CELERY_TASK_IGNORE_RESULT = True
+# 任务可重复执行：worker 异常退出时由其他 worker 重新执行
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# 后台任务配置
+JOB_CONFIG = {
+    'PURGE_BATCH_SIZE': 1000,   # 彻底删除回收站文件时每个事务处理的文件数
+    'SYNC_BATCH_SIZE': 1000,    # 校正存储使用量时每批的用户数
+}
+
+# 定期维护配置（files.maintenance）
+MAINTENANCE_CONFIG = {
+    'TRASH_RETENTION_DAYS': int(os.getenv('TRASH_RETENTION_DAYS', '30')),  # 回收站保留天数，0 表示不自动删除
+    'PURGE_BATCH_SIZE': 1000,       # 每个事务删除的文件数
+    'PURGE_MAX_FILES': 100000,      # 每次最多删除的文件数，剩余的留给下一次
+    'SESSION_BATCH_SIZE': 100,      # 每批清理的过期上传会话数
+    'JOB_RETENTION_DAYS': 7,        # 已结束的后台任务记录保留天数
+    'INTERVAL_SECONDS': 60 * 60,    # 执行间隔
+    'LOCK_TIMEOUT_SECONDS': 60 * 60,
+}
+
+# 定时任务（celery -A cloud_storage beat）
+CELERY_BEAT_SCHEDULE = {
+    'files-maintenance': {
+        'task': 'files.run_maintenance',
+        'schedule': MAINTENANCE_CONFIG['INTERVAL_SECONDS'],
+    },
+    'files-flush-download-counters': {
+        'task': 'files.flush_download_counters',
+        'schedule': DOWNLOAD_COUNTER_CONFIG['FLUSH_INTERVAL_SECONDS'],
+    },
+}
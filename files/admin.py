@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Folder, File, FileShare
+from .models import Folder, File, FileShare, Job
 
 
 @admin.register(Folder)
@@ -31,4 +31,14 @@ class FileShareAdmin(admin.ModelAdmin):
     list_filter = ['is_active', 'created_at', 'owner']
     search_fields = ['file__name', 'share_code', 'owner__username']
     ordering = ['-created_at']
-    readonly_fields = ['share_code', 'download_count']
\ No newline at end of file
+    readonly_fields = ['share_code', 'download_count']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'owner', 'status', 'progress_done', 'progress_total',
+                   'created_at', 'finished_at']
+    list_filter = ['kind', 'status', 'created_at']
+    search_fields = ['id', 'owner__username']
+    ordering = ['-created_at']
+    readonly_fields = ['params', 'result', 'error', 'started_at', 'finished_at']
@@ -0,0 +1,165 @@
+"""
+下载计数
+
+下载次数不再逐次整行保存：
+- 普通文件和不限次数的分享：在共享缓存中原子地累加，flush_download_counters 定期用一条
+  UPDATE ... SET download_count = download_count + CASE ... 批量写入，热门分享不再争抢行锁
+- 限制了下载次数的分享：下载前用条件 UPDATE 原子地占用一次名额，不会超出上限
+
+缓存中每个对象一个计数键；计数从 0 变为 1 时把对象登记到按序号递增的待写入列表，
+写入时按序号读取列表，因此不需要缓存支持集合类型
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+
+KEY_PREFIX = 'download_counter'
+SEQUENCE_KEY = f'{KEY_PREFIX}:seq'
+FLUSHED_KEY = f'{KEY_PREFIX}:flushed'
+TARGET_KEY = f'{KEY_PREFIX}:target'
+FLUSH_LOCK_KEY = f'{KEY_PREFIX}:flush_lock'
+
+
+def _get_config():
+    """获取下载计数配置"""
+    return getattr(settings, 'DOWNLOAD_COUNTER_CONFIG', {})
+
+
+def _get_model(kind):
+    from .models import File, FileShare
+
+    return {'file': File, 'share': FileShare}[kind]
+
+
+def _counter_key(kind, pk):
+    return f'{KEY_PREFIX}:{kind}:{pk}'
+
+
+def _pending_key(seq):
+    return f'{KEY_PREFIX}:pending:{seq}'
+
+
+def _register(kind, pk):
+    """把对象登记到待写入列表"""
+    seq = cache.incr(SEQUENCE_KEY) if not cache.add(SEQUENCE_KEY, 1, timeout=None) else 1
+    cache.set(_pending_key(seq), f'{kind}:{pk}', timeout=None)
+
+
+def _apply(kind, counts):
+    """把一批计数写入数据库（一条语句）"""
+    if not counts:
+        return
+    whens = [When(pk=pk, then=Value(count)) for pk, count in counts.items()]
+    _get_model(kind).objects.filter(pk__in=list(counts)).update(
+        download_count=F('download_count') + Case(*whens, default=Value(0), output_field=IntegerField())
+    )
+
+
+def record_download(kind, pk):
+    """记录一次下载
+
+    Args:
+        kind: 'file' 或 'share'
+        pk: 对象主键
+    """
+    if not _get_config().get('BUFFERED', False):
+        _apply(kind, {pk: 1})
+        return
+
+    key = _counter_key(kind, pk)
+    try:
+        cache.add(key, 0, timeout=None)
+        if cache.incr(key) == 1:
+            # 计数从 0 开始时登记；已登记且尚未写入的对象不重复登记
+            _register(kind, pk)
+    except Exception:
+        # 缓存不可用（或计数键恰好被淘汰）时直接写入数据库
+        _apply(kind, {pk: 1})
+
+
+def claim_capped_download(share):
+    """为限制了下载次数的分享原子地占用一次下载名额
+
+    Returns:
+        bool: 已达上限时返回 False
+    """
+    from .models import FileShare
+
+    return FileShare.objects.filter(
+        pk=share.pk, download_count__lt=F('max_downloads')
+    ).update(download_count=F('download_count') + 1) > 0
+
+
+def release_capped_download(share):
+    """下载未能开始时归还占用的名额"""
+    from .models import FileShare
+
+    FileShare.objects.filter(pk=share.pk, download_count__gt=0).update(
+        download_count=F('download_count') - 1
+    )
+
+
+def _restore(kind, pk, count):
+    """写入失败时把计数退回缓存"""
+    key = _counter_key(kind, pk)
+    cache.add(key, 0, timeout=None)
+    if cache.incr(key, count) == count:
+        _register(kind, pk)
+
+
+def flush_download_counters(batch_size=None):
+    """把缓存中累加的下载次数批量写入数据库
+
+    只处理上一次执行时已经分配的登记序号，给分配了序号、还未写入登记的进程留出时间，
+    因此计数最多延迟两个写入周期。同一时间只有一个进程执行；写入失败时计数退回缓存
+
+    Returns:
+        int: 写入的对象数
+    """
+    batch_size = batch_size or _get_config().get('FLUSH_BATCH_SIZE', 500)
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=300):
+        return 0
+
+    flushed_count = 0
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        target = cache.get(TARGET_KEY, 0)
+        cache.set(TARGET_KEY, cache.get(SEQUENCE_KEY, 0), timeout=None)
+
+        for start in range(flushed + 1, target + 1, batch_size):
+            stop = min(start + batch_size, target + 1)
+            slots = [_pending_key(seq) for seq in range(start, stop)]
+
+            counts = {}
+            for entry in set(cache.get_many(slots).values()):
+                kind, pk = entry.split(':', 1)
+                key = _counter_key(kind, pk)
+                count = cache.get(key) or 0
+                if count <= 0:
+                    continue
+                # 只减去读到的数量，期间新增的下载保留在缓存中
+                try:
+                    remaining = cache.decr(key, count)
+                except ValueError:
+                    # 计数键刚被淘汰，写入已读到的数量
+                    remaining = 0
+                if remaining > 0:
+                    # 剩余的计数已经没有登记，重新登记
+                    _register(kind, pk)
+                counts.setdefault(kind, {})[pk] = count
+
+            try:
+                for kind, kind_counts in counts.items():
+                    _apply(kind, kind_counts)
+            except Exception:
+                for kind, kind_counts in counts.items():
+                    for pk, count in kind_counts.items():
+                        _restore(kind, pk, count)
+                raise
+
+            cache.delete_many(slots)
+            cache.set(FLUSHED_KEY, stop - 1, timeout=None)
+            flushed_count += sum(len(kind_counts) for kind_counts in counts.values())
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+    return flushed_count
@@ -0,0 +1,107 @@
+"""
+后台任务
+
+请求中只创建 Job 记录，事务提交后交给 Celery 执行，立即返回 202 和任务 ID；
+任务执行时在 Job 中记录状态和进度，客户端通过 /api/files/jobs/<id>/ 查询。
+未配置 Celery broker 时任务在当前进程内同步执行（CELERY_TASK_ALWAYS_EAGER）
+
+同一个任务可能被执行多次（worker 异常退出后重新投递）：已结束的 Job 不再执行，
+处理函数只处理尚未完成的部分
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobError(Exception):
+    """任务无法完成（错误信息记录在 Job 中）"""
+
+
+def create_job(owner, kind, params=None):
+    """创建任务记录
+
+    Args:
+        owner: 所有者（系统任务为 None）
+        kind: 任务类型（Job.KIND_*）
+        params: 任务参数（可 JSON 序列化）
+
+    Returns:
+        Job: 新建的任务
+    """
+    return Job.objects.create(owner=owner, kind=kind, params=params or {})
+
+
+def find_active_job(owner, kind, params=None):
+    """查找参数相同、尚未结束的任务，用于避免重复提交"""
+    jobs = Job.objects.filter(
+        owner=owner, kind=kind, status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING]
+    )
+    for job in jobs:
+        if job.params == (params or {}):
+            return job
+    return None
+
+
+def enqueue_job(job, task):
+    """在当前事务提交后投递任务
+
+    Args:
+        job: 任务记录
+        task: Celery 任务，以 job ID 为唯一参数
+    """
+    transaction.on_commit(lambda: task.delay(str(job.id)))
+
+
+def update_progress(job, done, total=None):
+    """更新任务进度"""
+    fields = {'progress_done': done, 'updated_at': timezone.now()}
+    if total is not None:
+        fields['progress_total'] = total
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def finish_job(job, result=None, error=None):
+    """结束任务
+
+    可以在处理函数的事务中调用，与任务的数据修改一同提交，重新执行时不会重复处理
+
+    Returns:
+        bool: 任务已经结束时返回 False
+    """
+    now = timezone.now()
+    return Job.objects.filter(
+        pk=job.pk, status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING]
+    ).update(
+        status=Job.STATUS_FAILED if error is not None else Job.STATUS_SUCCEEDED,
+        result=result,
+        error=error or '',
+        finished_at=now,
+        updated_at=now,
+    ) > 0
+
+
+def run_job(job_id, handler):
+    """执行任务
+
+    Args:
+        job_id: 任务 ID
+        handler: 处理函数 handler(job, progress)，返回任务结果；
+                 progress(done, total=None) 更新进度，抛出 JobError 表示任务失败
+    """
+    job = Job.objects.filter(pk=job_id).select_related('owner').first()
+    if job is None or job.is_finished:
+        return
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(status=Job.STATUS_RUNNING, started_at=now, updated_at=now)
+
+    try:
+        result = handler(job, lambda done, total=None: update_progress(job, done, total))
+    except JobError as e:
+        finish_job(job, error=str(e))
+    except Exception as e:
+        print(f"Warning: Job {job.id} ({job.kind}) failed: {e}")
+        finish_job(job, error=f'任务执行失败: {str(e)}')
+    else:
+        finish_job(job, result=result)
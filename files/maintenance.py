@@ -0,0 +1,141 @@
+"""
+定期维护
+
+由 Celery beat 定时执行（files.tasks.run_maintenance），也可以用 manage.py run_maintenance 手动执行：
+- 回收站中超过保留期的文件分批彻底删除，释放存储对象和配额
+- 已过期的分享用一条按 (is_active, expire_at) 索引范围扫描的 UPDATE 置为失效，不再等到被访问时才发现；
+  下载次数已满的分享保持有效，新的下载在下载时被拒绝，已开始的下载仍可续传
+- 过期未完成的分片上传会话删除分片并归还预留空间
+- 超过保留期的已结束后台任务记录删除
+
+每一步返回处理数量、耗时和吞吐量；同一时间只有一个进程执行
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import FileShare, Job, UploadSession
+from .quota import release_reservation
+from .services.trash_service import trash_service
+from .services.upload_service import upload_service
+
+MAINTENANCE_LOCK_KEY = 'maintenance:lock'
+
+
+def _get_config():
+    """获取维护配置"""
+    return getattr(settings, 'MAINTENANCE_CONFIG', {})
+
+
+def _metrics(count, started, **extra):
+    """单个步骤的处理数量、耗时（秒）和每秒处理数"""
+    elapsed = time.monotonic() - started
+    return {
+        'count': count,
+        'elapsed': round(elapsed, 3),
+        'per_second': round(count / elapsed, 1) if elapsed > 0 else None,
+        **extra,
+    }
+
+
+def purge_expired_trash(retention_days=None, batch_size=None, limit=None):
+    """彻底删除超过保留期的回收站文件
+
+    Args:
+        retention_days: 保留天数（可选，默认 TRASH_RETENTION_DAYS），0 或 None 表示不自动删除
+        batch_size: 每个事务处理的文件数（可选）
+        limit: 本次最多删除的文件数（可选，默认 PURGE_MAX_FILES）
+    """
+    config = _get_config()
+    if retention_days is None:
+        retention_days = config.get('TRASH_RETENTION_DAYS', 30)
+    if limit is None:
+        limit = config.get('PURGE_MAX_FILES')
+
+    started = time.monotonic()
+    if not retention_days:
+        return _metrics(0, started, freed_space=0)
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    count, freed = trash_service.purge_expired(
+        cutoff, batch_size=batch_size or config.get('PURGE_BATCH_SIZE'), limit=limit
+    )
+    return _metrics(count, started, freed_space=freed)
+
+
+def deactivate_expired_shares():
+    """把已过期的分享置为失效（一条 UPDATE）"""
+    started = time.monotonic()
+    count = FileShare.objects.filter(
+        is_active=True, expire_at__lt=timezone.now()
+    ).update(is_active=False)
+    return _metrics(count, started)
+
+
+def cleanup_expired_upload_sessions(batch_size=None):
+    """删除过期未完成的分片上传会话，删除已上传的分片并归还预留空间
+
+    会话以“仍处于上传中且已过期”为条件删除，期间收到新分片（有效期已顺延）的会话保留
+    """
+    batch_size = batch_size or _get_config().get('SESSION_BATCH_SIZE', 100)
+    started = time.monotonic()
+    now = timezone.now()
+    expired = UploadSession.objects.filter(status=UploadSession.STATUS_UPLOADING, expires_at__lt=now)
+
+    count, released = 0, 0
+    last_id = None
+    while True:
+        batch = expired.order_by('pk')
+        if last_id is not None:
+            batch = batch.filter(pk__gt=last_id)
+        sessions = list(batch.prefetch_related('chunks')[:batch_size])
+        if not sessions:
+            break
+        last_id = sessions[-1].pk
+
+        for session in sessions:
+            chunks = list(session.chunks.all())
+            deleted, _ = expired.filter(pk=session.pk).delete()
+            if not deleted:
+                continue
+            release_reservation(session.owner_id, session.size)
+            upload_service.discard(session, chunks)
+            count += 1
+            released += session.size
+    return _metrics(count, started, released_space=released)
+
+
+def delete_finished_jobs(retention_days=None):
+    """删除超过保留期的已结束后台任务记录"""
+    if retention_days is None:
+        retention_days = _get_config().get('JOB_RETENTION_DAYS', 7)
+    started = time.monotonic()
+    count, _ = Job.objects.filter(
+        finished_at__lt=timezone.now() - timedelta(days=retention_days)
+    ).delete()
+    return _metrics(count, started)
+
+
+def run_maintenance(retention_days=None, batch_size=None, limit=None):
+    """执行全部维护步骤
+
+    Returns:
+        dict or None: 各步骤的统计 {'trash': ..., 'shares': ..., 'upload_sessions': ..., 'jobs': ...}；
+                      其他进程正在执行时返回 None
+    """
+    timeout = _get_config().get('LOCK_TIMEOUT_SECONDS', 60 * 60)
+    if not cache.add(MAINTENANCE_LOCK_KEY, 1, timeout=timeout):
+        return None
+
+    try:
+        return {
+            'trash': purge_expired_trash(retention_days, batch_size, limit),
+            'shares': deactivate_expired_shares(),
+            'upload_sessions': cleanup_expired_upload_sessions(),
+            'jobs': delete_finished_jobs(),
+        }
+    finally:
+        cache.delete(MAINTENANCE_LOCK_KEY)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from files.counters import flush_download_counters
+
+
+class Command(BaseCommand):
+    help = '把缓存中累加的下载次数写入数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='每条 UPDATE 写入的对象数')
+
+    def handle(self, *args, **options):
+        flushed_count = flush_download_counters(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 已写入 {flushed_count} 个对象的下载次数'))
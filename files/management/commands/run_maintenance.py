@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from files.maintenance import run_maintenance
+
+
+class Command(BaseCommand):
+    help = '定期维护：清理超过保留期的回收站文件、失效的分享、过期的上传会话和已结束的任务记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='回收站保留天数（默认 TRASH_RETENTION_DAYS）')
+        parser.add_argument('--batch-size', type=int, help='每个事务删除的文件数')
+        parser.add_argument('--max-files', type=int, help='本次最多删除的回收站文件数')
+        parser.add_argument('--json', action='store_true', help='以 JSON 格式输出统计')
+
+    def handle(self, *args, **options):
+        for name in ('retention_days', 'batch_size', 'max_files'):
+            if options[name] is not None and options[name] < 0:
+                raise CommandError(f"--{name.replace('_', '-')} 不能小于 0")
+
+        metrics = run_maintenance(
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            limit=options['max_files'],
+        )
+        if metrics is None:
+            raise CommandError('其他进程正在执行维护')
+
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, ensure_ascii=False))
+            return
+
+        trash, shares, sessions = metrics['trash'], metrics['shares'], metrics['upload_sessions']
+        jobs = metrics['jobs']
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 回收站：删除 {trash['count']} 个文件，释放 {trash['freed_space']} bytes"
+            f"（{trash['elapsed']}s，{trash['per_second'] or 0} 个/s）"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 分享：{shares['count']} 个已失效（{shares['elapsed']}s）"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ 上传会话：清理 {sessions['count']} 个，归还 {sessions['released_space']} bytes"
+            f"（{sessions['elapsed']}s）"
+        ))
+        self.stdout.write(self.style.SUCCESS(f"✅ 后台任务记录：删除 {jobs['count']} 条"))
@@ -1,46 +1,128 @@
-from django.core.management.base import BaseCommand
-from django.db import models
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from accounts.models import User
-from files.models import File
+from files.jobs import create_job, enqueue_job
+from files.models import Job
+from files.quota import reconcile_storage
+from files.tasks import sync_storage
 
 
 class Command(BaseCommand):
     help = '同步所有用户的存储使用量'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--start-id', type=int, help='起始用户 ID（含）')
+        parser.add_argument('--end-id', type=int, help='结束用户 ID（含）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批用户数（默认 1000）')
+        parser.add_argument('--workers', type=int, default=1, help='并行处理的批数（默认 1）')
+        parser.add_argument('--dry-run', action='store_true', help='只报告差异，不写入')
+        parser.add_argument('--report', help='以 JSON Lines 格式输出差异报告的文件，- 表示标准输出')
+        parser.add_argument('--background', action='store_true',
+                            help='提交为后台任务（Celery）后立即返回，不支持 --workers 和 --report')
+
     def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size 和 --workers 必须大于 0')
+
+        if options['background']:
+            self._submit_job(options)
+            return
+
         users = User.objects.all()
-        updated_count = 0
-        
-        for user in users:
-            # 计算用户实际文件总大小
-            actual_used_storage = File.objects.filter(owner=user).aggregate(
-                total_size=models.Sum('size')
-            )['total_size'] or 0
-            
-            # 检查是否需要更新
-            if user.used_storage != actual_used_storage:
-                old_usage = user.used_storage
-                user.used_storage = actual_used_storage
-                user.save()
-                
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'用户 {user.username}: {old_usage} -> {actual_used_storage} bytes'
-                    )
-                )
-                updated_count += 1
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'用户 {user.username}: 存储信息正确 ({actual_used_storage} bytes)'
-                    )
+        if options['start_id'] is not None:
+            users = users.filter(pk__gte=options['start_id'])
+        if options['end_id'] is not None:
+            users = users.filter(pk__lte=options['end_id'])
+
+        dry_run = options['dry_run']
+        report = self._open_report(options['report'])
+        # 报告写到标准输出时，文字信息改写到标准错误，保持报告可解析
+        out = self.stderr if report is sys.stdout else self.stdout
+
+        checked_count = changed_count = updated_count = 0
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = executor.map(
+                    lambda id_range: self._reconcile_batch(users, id_range, dry_run),
+                    self._iter_id_ranges(users, options['batch_size'])
                 )
-        
-        if updated_count > 0:
-            self.stdout.write(
-                self.style.SUCCESS(f'✅ 已更新 {updated_count} 个用户的存储信息')
-            )
+                for count, changes, updated in results:
+                    checked_count += count
+                    changed_count += len(changes)
+                    updated_count += updated
+                    for change in changes:
+                        if report is not None:
+                            report.write(json.dumps({**change, 'delta': change['new'] - change['old']},
+                                                    ensure_ascii=False) + '\n')
+                        if report is not sys.stdout and options['verbosity'] >= 1:
+                            out.write(self.style.WARNING(
+                                f"用户 {change['username']}: {change['old']} -> {change['new']} bytes"
+                            ))
+        finally:
+            if report is not None and report is not sys.stdout:
+                report.close()
+
+        if dry_run:
+            out.write(self.style.SUCCESS(
+                f'✅ 已检查 {checked_count} 个用户，{changed_count} 个存储信息不一致（未写入）'
+            ))
+        elif changed_count > 0:
+            out.write(self.style.SUCCESS(
+                f'✅ 已检查 {checked_count} 个用户，已更新 {updated_count} 个用户的存储信息'
+            ))
+            if updated_count < changed_count:
+                out.write(self.style.NOTICE(
+                    f'{changed_count - updated_count} 个用户的存储使用量正在变化，已跳过'
+                ))
         else:
-            self.stdout.write(
-                self.style.SUCCESS('✅ 所有用户的存储信息都是正确的')
-            )
\ No newline at end of file
+            out.write(self.style.SUCCESS(f'✅ 已检查 {checked_count} 个用户，存储信息都是正确的'))
+
+    def _submit_job(self, options):
+        """提交后台校正任务"""
+        if options['report'] or options['workers'] != 1:
+            raise CommandError('--background 不支持 --workers 和 --report')
+
+        job = create_job(None, Job.KIND_SYNC_STORAGE, {
+            'start_id': options['start_id'],
+            'end_id': options['end_id'],
+            'batch_size': options['batch_size'],
+            'dry_run': options['dry_run'],
+        })
+        enqueue_job(job, sync_storage)
+        self.stdout.write(self.style.SUCCESS(f'✅ 已提交后台任务 {job.id}'))
+
+    def _open_report(self, path):
+        """打开差异报告输出"""
+        if not path:
+            return None
+        if path == '-':
+            return sys.stdout
+        return open(path, 'w', encoding='utf-8')
+
+    def _iter_id_ranges(self, users, batch_size):
+        """按主键顺序把用户切分为 (起始 ID, 结束 ID, 用户数) 区间，每个区间最多 batch_size 个用户"""
+        last_id = None
+        while True:
+            batch = users.order_by('pk')
+            if last_id is not None:
+                batch = batch.filter(pk__gt=last_id)
+            ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            yield ids[0], ids[-1], len(ids)
+            last_id = ids[-1]
+
+    def _reconcile_batch(self, users, id_range, dry_run):
+        """校正一个区间内的用户，在工作线程中执行"""
+        start_id, end_id, count = id_range
+        try:
+            batch = users.filter(pk__gte=start_id, pk__lte=end_id)
+            changes, updated = reconcile_storage(batch, dry_run=dry_run)
+            return count, changes, updated
+        finally:
+            # 工作线程各自持有数据库连接，处理完即关闭
+            connections.close_all()
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('files', '0003_file_deleted_at_file_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255, verbose_name='文件名')),
+                ('mime_type', models.CharField(max_length=200, verbose_name='MIME类型')),
+                ('size', models.BigIntegerField(verbose_name='文件大小(字节)')),
+                ('chunk_size', models.IntegerField(verbose_name='分片大小(字节)')),
+                ('backend', models.CharField(choices=[('swift', 'Swift'), ('local', '本地存储')], default='swift', max_length=20, verbose_name='存储后端')),
+                ('status', models.CharField(choices=[('uploading', '上传中'), ('completing', '合并中'), ('completed', '已完成')], default='uploading', max_length=20, verbose_name='状态')),
+                ('expires_at', models.DateTimeField(verbose_name='过期时间')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='files.file', verbose_name='生成的文件')),
+                ('folder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='files.folder', verbose_name='目标文件夹')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='所有者')),
+            ],
+            options={
+                'verbose_name': '上传会话',
+                'verbose_name_plural': '上传会话',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField(verbose_name='分片序号')),
+                ('size', models.IntegerField(verbose_name='分片大小(字节)')),
+                ('etag', models.CharField(blank=True, max_length=64, verbose_name='校验值')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='上传时间')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='files.uploadsession', verbose_name='上传会话')),
+            ],
+            options={
+                'verbose_name': '上传分片',
+                'verbose_name_plural': '上传分片',
+                'ordering': ['index'],
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
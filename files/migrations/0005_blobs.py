@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0004_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='大小(字节)')),
+                ('swift_container', models.CharField(blank=True, max_length=255, null=True, verbose_name='Swift容器')),
+                ('swift_object', models.CharField(blank=True, max_length=255, null=True, verbose_name='Swift对象名')),
+                ('local_path', models.CharField(blank=True, max_length=500, null=True, verbose_name='本地存储路径')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='引用数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '存储内容',
+                'verbose_name_plural': '存储内容',
+            },
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='files.blob', verbose_name='存储内容'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0005_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['owner', 'is_deleted', 'folder', '-created_at'], name='file_owner_folder_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['owner', 'is_deleted', '-deleted_at'], name='file_owner_trash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileshare',
+            index=models.Index(fields=['owner', 'is_active', '-created_at'], name='share_owner_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'parent'], name='folder_owner_parent_idx'),
+        ),
+    ]
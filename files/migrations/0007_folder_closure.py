@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_closure(apps, schema_editor):
+    """为已有文件夹生成层级闭包"""
+    Folder = apps.get_model('files', 'Folder')
+    FolderClosure = apps.get_model('files', 'FolderClosure')
+
+    parents = dict(Folder.objects.values_list('id', 'parent_id').iterator())
+    ancestors = {}
+
+    def get_ancestors(folder_id):
+        # 从根到自身的祖先链，逐级向上直到已计算过的文件夹
+        chain = []
+        current = folder_id
+        while current is not None and current not in ancestors:
+            chain.append(current)
+            current = parents.get(current)
+        base = ancestors.get(current, [])
+        for node in reversed(chain):
+            base = base + [node]
+            ancestors[node] = base
+        return ancestors[folder_id]
+
+    rows = []
+    for folder_id in parents:
+        chain = get_ancestors(folder_id)
+        rows += [
+            FolderClosure(ancestor_id=ancestor_id, descendant_id=folder_id, depth=len(chain) - 1 - index)
+            for index, ancestor_id in enumerate(chain)
+        ]
+        if len(rows) >= 1000:
+            FolderClosure.objects.bulk_create(rows)
+            rows = []
+    FolderClosure.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0006_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolderClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='层级差')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='files.folder', verbose_name='祖先')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='files.folder', verbose_name='后代')),
+            ],
+            options={
+                'verbose_name': '文件夹层级',
+                'verbose_name_plural': '文件夹层级',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='folderclosure_desc_depth_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('files', '0007_folder_closure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('purge_trash', '彻底删除回收站文件'), ('save_shared_file', '保存分享文件'), ('sync_storage', '校正存储使用量')], max_length=30, verbose_name='任务类型')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='参数')),
+                ('progress_done', models.BigIntegerField(default=0, verbose_name='已完成数量')),
+                ('progress_total', models.BigIntegerField(blank=True, null=True, verbose_name='总数量')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='结果')),
+                ('error', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='所有者')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['owner', 'kind', 'status'], name='job_owner_kind_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('purge_trash', '彻底删除回收站文件'), ('save_shared_file', '保存分享文件'), ('sync_storage', '校正存储使用量'), ('maintenance', '定期维护')], max_length=30, verbose_name='任务类型'),
+        ),
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['is_deleted', 'deleted_at'], name='file_trash_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileshare',
+            index=models.Index(fields=['is_active', 'expire_at'], name='share_active_expire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['status', 'expires_at'], name='uploadsession_expiry_idx'),
+        ),
+    ]
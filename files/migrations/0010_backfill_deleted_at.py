@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:30
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_deleted_at(apps, schema_editor):
+    """回收站中缺少删除时间的旧数据以最后修改时间代替
+
+    回收站列表按 deleted_at 键集分页，自动清理按 deleted_at 筛选，两者都要求不为 NULL
+    """
+    File = apps.get_model('files', 'File')
+    File.objects.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0009_maintenance'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_deleted_at, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,34 @@
 import os
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
 User = get_user_model()
 
 
+class FolderQuerySet(models.QuerySet):
+    """文件夹查询集"""
+    
+    def with_counts(self):
+        """附加子文件夹数和文件数（children_count、files_count）
+        
+        用相关子查询计算，列表中的文件夹数量不影响查询次数
+        """
+        children = Folder.objects.filter(parent=OuterRef('pk')).order_by().values('parent').annotate(
+            count=Count('pk')
+        ).values('count')
+        files = File.objects.filter(folder=OuterRef('pk')).order_by().values('folder').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.annotate(
+            children_count=Coalesce(Subquery(children), 0),
+            files_count=Coalesce(Subquery(files), 0),
+        )
+
+
 class Folder(models.Model):
     """文件夹模型"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -17,29 +39,152 @@ class Folder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
+    objects = FolderQuerySet.as_manager()
+    
     class Meta:
         verbose_name = '文件夹'
         verbose_name_plural = '文件夹'
         unique_together = ['parent', 'name', 'owner']
+        indexes = [
+            # 列出子文件夹：owner = ? AND parent_id = ?（根目录 parent_id IS NULL）
+            models.Index(fields=['owner', 'parent'], name='folder_owner_parent_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        """保存文件夹，同时维护层级闭包表"""
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        # 只更新其他字段（如重命名）时父文件夹不变，不查询也不改动闭包表
+        loaded_parent = not adding and (update_fields is None or 'parent' in update_fields)
+        old_parent_id = None
+        if loaded_parent:
+            old_parent_id = Folder.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+        moved = loaded_parent and old_parent_id != self.parent_id
+        
+        if moved and self.parent_id and FolderClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id
+        ).exists():
+            raise ValueError('不能把文件夹移动到自身或其子文件夹中')
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                FolderClosure.link(self)
+            elif moved:
+                FolderClosure.move_subtree(self)
+    
     @property
     def full_path(self):
-        """获取完整路径"""
-        if self.parent:
-            return f"{self.parent.full_path}/{self.name}"
-        return f"/{self.name}"
+        """获取完整路径（一次查询）"""
+        names = list(self.get_ancestors(include_self=True).values_list('name', flat=True))
+        if not names:
+            # 闭包表中没有记录（如绕过 save 批量创建），逐级向上查找
+            if self.parent:
+                return f"{self.parent.full_path}/{self.name}"
+            return f"/{self.name}"
+        return '/' + '/'.join(names)
+    
+    def get_ancestors(self, include_self=False):
+        """获取所有祖先文件夹，从根到当前（一次查询）"""
+        min_depth = 0 if include_self else 1
+        return Folder.objects.filter(
+            descendant_links__descendant=self,
+            descendant_links__depth__gte=min_depth
+        ).order_by('-descendant_links__depth')
+    
+    def get_descendants(self, include_self=False):
+        """获取所有后代文件夹（一次查询）"""
+        min_depth = 0 if include_self else 1
+        return Folder.objects.filter(
+            ancestor_links__ancestor=self,
+            ancestor_links__depth__gte=min_depth
+        )
+
+
+class FolderClosure(models.Model):
+    """文件夹层级闭包表
+    
+    每对 (祖先, 后代) 一行，depth 为层级差，每个文件夹另有一行指向自身（depth 为 0）。
+    面包屑、完整路径和整棵子树都只需一次按索引的查询
+    """
+    ancestor = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='descendant_links',
+                                 verbose_name='祖先')
+    descendant = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='ancestor_links',
+                                   verbose_name='后代')
+    depth = models.PositiveIntegerField(verbose_name='层级差')
+    
+    class Meta:
+        verbose_name = '文件夹层级'
+        verbose_name_plural = '文件夹层级'
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            # 祖先链：descendant_id = ? ORDER BY depth
+            models.Index(fields=['descendant', 'depth'], name='folderclosure_desc_depth_idx'),
+        ]
+    
+    @classmethod
+    def link(cls, folder):
+        """为新建的文件夹写入层级：父文件夹的全部祖先加上自身"""
+        rows = [cls(ancestor_id=folder.pk, descendant_id=folder.pk, depth=0)]
+        if folder.parent_id:
+            rows += [
+                cls(ancestor_id=ancestor_id, descendant_id=folder.pk, depth=depth + 1)
+                for ancestor_id, depth in cls.objects.filter(
+                    descendant_id=folder.parent_id
+                ).values_list('ancestor_id', 'depth')
+            ]
+        cls.objects.bulk_create(rows)
+    
+    @classmethod
+    def move_subtree(cls, folder):
+        """文件夹移动后重建其子树与外部祖先之间的层级"""
+        subtree = list(cls.objects.filter(ancestor_id=folder.pk).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        
+        # 断开子树与原祖先的联系，子树内部的层级不变
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        
+        if folder.parent_id:
+            ancestors = list(cls.objects.filter(descendant_id=folder.parent_id).values_list('ancestor_id', 'depth'))
+            cls.objects.bulk_create([
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, depth in subtree
+            ], batch_size=1000)
+
+
+class Blob(models.Model):
+    """按内容寻址的存储对象
+    
+    相同内容（SHA-256 相同）只保存一份，多个文件记录通过引用计数共享
+    """
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True,
+                              verbose_name='SHA-256')
+    size = models.BigIntegerField(verbose_name='大小(字节)')
+    swift_container = models.CharField(max_length=255, null=True, blank=True, verbose_name='Swift容器')
+    swift_object = models.CharField(max_length=255, null=True, blank=True, verbose_name='Swift对象名')
+    local_path = models.CharField(max_length=500, null=True, blank=True, verbose_name='本地存储路径')
+    ref_count = models.IntegerField(default=0, verbose_name='引用数')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     
-    def get_ancestors(self):
-        """获取所有祖先文件夹"""
-        ancestors = []
-        current = self.parent
-        while current:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors[::-1]  # 反转顺序，从根到当前
+    class Meta:
+        verbose_name = '存储内容'
+        verbose_name_plural = '存储内容'
+    
+    def __str__(self):
+        return self.sha256 or f"blob #{self.pk}"
+    
+    @property
+    def location(self):
+        """存储位置，与 File 上的同名字段对应"""
+        return {
+            'swift_container': self.swift_container,
+            'swift_object': self.swift_object,
+            'local_path': self.local_path,
+        }
 
 
 class File(models.Model):
@@ -56,6 +201,9 @@ class File(models.Model):
     swift_container = models.CharField(max_length=255, null=True, blank=True, verbose_name='Swift容器')
     swift_object = models.CharField(max_length=255, null=True, blank=True, verbose_name='Swift对象名')
     local_path = models.CharField(max_length=500, null=True, blank=True, verbose_name='本地存储路径')
+    # 存储位置字段与 blob 保持一致；早期数据没有 blob
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True,
+                             related_name='files', verbose_name='存储内容')
     is_public = models.BooleanField(default=False, verbose_name='是否公开')
     download_count = models.IntegerField(default=0, verbose_name='下载次数')
     # 回收站相关字段
@@ -68,6 +216,14 @@ class File(models.Model):
         verbose_name = '文件'
         verbose_name_plural = '文件'
         ordering = ['-created_at']
+        indexes = [
+            # 文件列表：owner = ? AND is_deleted = 0 AND folder_id = ? ORDER BY created_at DESC
+            models.Index(fields=['owner', 'is_deleted', 'folder', '-created_at'], name='file_owner_folder_list_idx'),
+            # 回收站：owner = ? AND is_deleted = 1 ORDER BY deleted_at DESC
+            models.Index(fields=['owner', 'is_deleted', '-deleted_at'], name='file_owner_trash_idx'),
+            # 回收站自动清理：is_deleted = 1 AND deleted_at < ? ORDER BY deleted_at
+            models.Index(fields=['is_deleted', 'deleted_at'], name='file_trash_expiry_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -90,10 +246,13 @@ class File(models.Model):
             unit_index += 1
         return f"{size_value:.2f} {units[unit_index]}"
     
-    def get_swift_url(self):
+    def get_swift_url(self, ip_range=None):
         """获取Swift临时URL"""
         from .utils import get_swift_temp_url
-        return get_swift_temp_url(self.swift_container, self.swift_object)
+        return get_swift_temp_url(
+            self.swift_container, self.swift_object,
+            ip_range=ip_range, filename=self.original_name
+        )
 
 
 class FileShare(models.Model):
@@ -113,15 +272,190 @@ class FileShare(models.Model):
     class Meta:
         verbose_name = '文件分享'
         verbose_name_plural = '文件分享'
+        indexes = [
+            # 我的分享：owner = ? AND is_active = ? ORDER BY created_at DESC
+            models.Index(fields=['owner', 'is_active', '-created_at'], name='share_owner_active_idx'),
+            # 过期分享清理：is_active = 1 AND expire_at < ?
+            models.Index(fields=['is_active', 'expire_at'], name='share_active_expire_idx'),
+        ]
     
     def __str__(self):
         return f"{self.file.name} - {self.share_code}"
     
-    def is_expired(self):
-        """检查是否过期"""
+    def is_expired(self, include_downloads=True):
+        """检查是否过期
+
+        Args:
+            include_downloads: 下载次数已满是否视为过期（续传已开始的下载时为 False）
+        """
         from django.utils import timezone
         if self.expire_at and self.expire_at < timezone.now():
             return True
-        if self.max_downloads and self.download_count >= self.max_downloads:
+        if include_downloads and self.max_downloads and self.download_count >= self.max_downloads:
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class UploadSession(models.Model):
+    """分片上传会话（断点续传）"""
+    
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETING = 'completing'
+    STATUS_COMPLETED = 'completed'
+    
+    STATUS_CHOICES = (
+        (STATUS_UPLOADING, '上传中'),
+        (STATUS_COMPLETING, '合并中'),
+        (STATUS_COMPLETED, '已完成'),
+    )
+    
+    BACKEND_SWIFT = 'swift'
+    BACKEND_LOCAL = 'local'
+    
+    BACKEND_CHOICES = (
+        (BACKEND_SWIFT, 'Swift'),
+        (BACKEND_LOCAL, '本地存储'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions',
+                              verbose_name='所有者')
+    folder = models.ForeignKey(Folder, on_delete=models.CASCADE, null=True, blank=True,
+                               verbose_name='目标文件夹')
+    file_name = models.CharField(max_length=255, verbose_name='文件名')
+    mime_type = models.CharField(max_length=200, verbose_name='MIME类型')
+    size = models.BigIntegerField(verbose_name='文件大小(字节)')
+    chunk_size = models.IntegerField(verbose_name='分片大小(字节)')
+    backend = models.CharField(max_length=20, choices=BACKEND_CHOICES, default=BACKEND_SWIFT,
+                               verbose_name='存储后端')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UPLOADING,
+                              verbose_name='状态')
+    file = models.ForeignKey(File, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='+', verbose_name='生成的文件')
+    expires_at = models.DateTimeField(verbose_name='过期时间')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '上传会话'
+        verbose_name_plural = '上传会话'
+        ordering = ['-created_at']
+        indexes = [
+            # 过期会话清理：status = 'uploading' AND expires_at < ?
+            models.Index(fields=['status', 'expires_at'], name='uploadsession_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+    
+    @property
+    def total_chunks(self):
+        """分片总数"""
+        if self.size == 0:
+            return 1
+        return (self.size + self.chunk_size - 1) // self.chunk_size
+    
+    def get_chunk_length(self, index):
+        """指定分片的字节数（最后一片可能较短）"""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+    
+    def is_expired(self):
+        """检查是否过期"""
+        from django.utils import timezone
+        return self.expires_at < timezone.now()
+
+
+class UploadChunk(models.Model):
+    """已接收的上传分片"""
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks',
+                                verbose_name='上传会话')
+    index = models.IntegerField(verbose_name='分片序号')
+    size = models.IntegerField(verbose_name='分片大小(字节)')
+    etag = models.CharField(max_length=64, blank=True, verbose_name='校验值')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='上传时间')
+    
+    class Meta:
+        verbose_name = '上传分片'
+        verbose_name_plural = '上传分片'
+        unique_together = ['session', 'index']
+        ordering = ['index']
+    
+    def __str__(self):
+        return f"{self.session_id} #{self.index}"
+
+
+class Job(models.Model):
+    """后台任务
+
+    耗时操作在请求中创建任务记录并交给 Celery 执行，客户端按 ID 查询状态和进度
+    """
+    
+    KIND_PURGE_TRASH = 'purge_trash'
+    KIND_SAVE_SHARED_FILE = 'save_shared_file'
+    KIND_SYNC_STORAGE = 'sync_storage'
+    KIND_MAINTENANCE = 'maintenance'
+    
+    KIND_CHOICES = (
+        (KIND_PURGE_TRASH, '彻底删除回收站文件'),
+        (KIND_SAVE_SHARED_FILE, '保存分享文件'),
+        (KIND_SYNC_STORAGE, '校正存储使用量'),
+        (KIND_MAINTENANCE, '定期维护'),
+    )
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = (
+        (STATUS_PENDING, '等待中'),
+        (STATUS_RUNNING, '执行中'),
+        (STATUS_SUCCEEDED, '已完成'),
+        (STATUS_FAILED, '失败'),
+    )
+    
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs',
+                              verbose_name='所有者')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name='任务类型')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING,
+                              verbose_name='状态')
+    params = models.JSONField(default=dict, blank=True, verbose_name='参数')
+    progress_done = models.BigIntegerField(default=0, verbose_name='已完成数量')
+    progress_total = models.BigIntegerField(null=True, blank=True, verbose_name='总数量')
+    result = models.JSONField(null=True, blank=True, verbose_name='结果')
+    error = models.TextField(blank=True, verbose_name='错误信息')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        ordering = ['-created_at']
+        indexes = [
+            # 查找用户未结束的同类任务：owner = ? AND kind = ? AND status IN (...)
+            models.Index(fields=['owner', 'kind', 'status'], name='job_owner_kind_status_idx'),
+            # 清理已结束的任务：finished_at < ?
+            models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        """是否已结束（成功或失败）"""
+        return self.status in self.FINISHED_STATUSES
+    
+    @property
+    def progress(self):
+        """进度百分比，总数未知时为 None"""
+        if self.status == self.STATUS_SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_done * 100 / self.progress_total))
@@ -0,0 +1,161 @@
+"""
+列表分页
+
+按 (排序字段, id) 的键集（游标）分页：每一页都是从上一页最后一行开始的索引范围扫描，
+不使用 OFFSET，也不在每次请求时 COUNT(*)，翻到第几页的代价都相同
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """键集分页
+
+    ordering 的最后一个字段必须唯一（通常为 id），其余字段不能为 NULL。
+    默认按时间倒序、id 正序：与 (..., -created_at) 索引加上 InnoDB 二级索引隐含的主键列顺序一致，
+    可以直接按索引顺序读取，不需要 filesort
+
+    响应：{'next': ..., 'previous': ..., 'results': [...]}，
+    请求带 ?count=1 时附加 count（按 count_cache_key 缓存，是近似值）
+    """
+
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    count_cache_timeout = 60
+
+    def __init__(self, ordering=('-created_at', 'id'), count_cache_key=None):
+        self.ordering = tuple(ordering)
+        self.count_cache_key = count_cache_key
+        self.count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(queryset.model, request)
+        reverse = cursor is not None and cursor['reverse']
+
+        ordering = self._reverse_ordering() if reverse else self.ordering
+        page = queryset.order_by(*ordering)
+        if cursor is not None:
+            page = page.filter(self._after(ordering, cursor['position']))
+
+        rows = list(page[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            # 向前翻页按相反顺序查询，再恢复正常顺序
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.rows = rows
+
+        if self._wants_count(request):
+            self.count = self.get_count(queryset)
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        """读取每页数量，超出范围时使用默认值或上限"""
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_count(self, queryset):
+        """总数，配置了缓存键时在有效期内复用"""
+        if self.count_cache_key is None:
+            return queryset.count()
+        return cache.get_or_set(self.count_cache_key, queryset.count, self.count_cache_timeout)
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self._build_link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.rows:
+            return None
+        return self._build_link(self.rows[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        """把一行的排序字段值编码为游标"""
+        position = [self._get_value(row, field.lstrip('-')) for field in self.ordering]
+        data = json.dumps({'p': position, 'r': reverse}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, model, request):
+        """解析请求中的游标
+
+        Returns:
+            dict or None: {'position': [...], 'reverse': bool}，未提供游标时返回 None
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            position = data['p']
+            if len(position) != len(self.ordering):
+                raise ValueError(encoded)
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound('无效的游标')
+        return {'position': values, 'reverse': bool(data.get('r'))}
+
+    def _wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def _reverse_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def _after(self, ordering, position):
+        """位于游标之后的行：(a, b) > (x, y) 展开为 a > x OR (a = x AND b > y)"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = f'{name}__lt' if field.startswith('-') else f'{name}__gt'
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def _get_value(self, row, name):
+        value = getattr(row, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _build_link(self, row, reverse):
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(row, reverse)
+        # 后续页不再重复计算总数
+        params.pop(self.count_query_param, None)
+        url = self.request.build_absolute_uri(self.request.path)
+        return f'{url}?{params.urlencode()}'
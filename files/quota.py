@@ -0,0 +1,170 @@
+"""
+存储配额
+
+上传前按声明的大小（Content-Length、会话大小等）原子地预留空间：
+预留即计入 used_storage，上传成功后按实际大小确认，失败时归还。
+used_storage 只通过 F() 表达式增减，不读出再整行保存；偏差由 reconcile_storage 按实际文件校正
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import BigIntegerField, Case, F, Q, Sum, Value, When
+
+User = get_user_model()
+
+
+def adjust_storage(user_id, delta):
+    """原子地调整用户已使用存储"""
+    if delta:
+        User.objects.filter(pk=user_id).update(used_storage=F('used_storage') + delta)
+
+
+def _reserve(user_id, size):
+    """used_storage + size 不超过 storage_quota 时增加 used_storage（一条 UPDATE）"""
+    return User.objects.filter(
+        pk=user_id,
+        used_storage__lte=F('storage_quota') - size
+    ).update(used_storage=F('used_storage') + size) > 0
+
+
+class QuotaReservation:
+    """一次上传预留的存储空间"""
+
+    def __init__(self, user_id, size):
+        self.user_id = user_id
+        self.size = size
+        self.done = False
+
+    def commit(self, actual_size=None):
+        """确认预留，实际大小与预留不同时补差
+
+        Args:
+            actual_size: 实际大小（可选，默认与预留相同）
+        """
+        if self.done:
+            return
+        self.done = True
+        if actual_size is not None:
+            adjust_storage(self.user_id, actual_size - self.size)
+
+    def resize(self, size):
+        """把预留调整为 size（如按实际大小），增加的部分同样原子地检查配额
+
+        Returns:
+            bool: 空间不足时返回 False，原预留不变
+        """
+        delta = size - self.size
+        if delta > 0 and not _reserve(self.user_id, delta):
+            return False
+        if delta < 0:
+            adjust_storage(self.user_id, delta)
+        self.size = size
+        return True
+
+    def release(self):
+        """归还未确认的预留空间"""
+        if self.done:
+            return
+        self.done = True
+        adjust_storage(self.user_id, -self.size)
+
+
+def reserve_storage(user, size):
+    """原子地预留存储空间
+
+    只有 used_storage + size 不超过 storage_quota 时才会增加，
+    并发上传之间不会超出配额
+
+    Args:
+        user: 用户
+        size: 预留大小（字节）
+
+    Returns:
+        QuotaReservation or None: 空间不足时返回 None
+    """
+    if not _reserve(user.pk, size):
+        return None
+    return QuotaReservation(user.pk, size)
+
+
+def release_reservation(user_id, size):
+    """归还已持久化的预留（如未完成的分片上传会话）"""
+    adjust_storage(user_id, -size)
+
+
+def calculate_storage_usage(user_ids):
+    """按实际数据计算用户应有的存储使用量
+
+    包括回收站中的文件（彻底删除前仍占用空间）和未完成分片上传会话的预留空间
+
+    Args:
+        user_ids: 用户 ID 列表
+
+    Returns:
+        dict: {user_id: 字节数}，没有文件的用户为 0
+    """
+    from .models import File, UploadSession
+
+    usage = dict.fromkeys(user_ids, 0)
+    file_totals = File.objects.filter(owner_id__in=user_ids).values('owner_id').annotate(
+        total=Sum('size')
+    ).order_by()
+    session_totals = UploadSession.objects.filter(
+        owner_id__in=user_ids,
+        status__in=[UploadSession.STATUS_UPLOADING, UploadSession.STATUS_COMPLETING]
+    ).values('owner_id').annotate(total=Sum('size')).order_by()
+
+    for row in list(file_totals) + list(session_totals):
+        usage[row['owner_id']] += row['total'] or 0
+    return usage
+
+
+def apply_storage_corrections(changes):
+    """批量写入校正后的存储使用量
+
+    一条 UPDATE ... CASE 语句写入一批用户，并以读到的旧值为条件：
+    期间有并发上传改变了用量的用户不会被覆盖，留待下次校正
+
+    Args:
+        changes: [{'user_id', 'old', 'new'}, ...]
+
+    Returns:
+        int: 实际写入的用户数
+    """
+    if not changes:
+        return 0
+
+    condition = Q()
+    whens = []
+    for change in changes:
+        condition |= Q(pk=change['user_id'], used_storage=change['old'])
+        whens.append(When(pk=change['user_id'], then=Value(change['new'])))
+    return User.objects.filter(condition).update(
+        used_storage=Case(*whens, default=F('used_storage'), output_field=BigIntegerField())
+    )
+
+
+def reconcile_storage(users=None, dry_run=False):
+    """校正一批用户的存储使用量
+
+    两次分组聚合（文件、上传会话）算出实际用量，一条语句写入全部差异
+
+    Args:
+        users: 用户查询集（可选，默认全部用户；大量用户应分批调用）
+        dry_run: 只计算差异，不写入
+
+    Returns:
+        tuple: (changes, updated_count)
+               changes 为用量不一致的用户 [{'user_id', 'username', 'old', 'new'}, ...]
+    """
+    if users is None:
+        users = User.objects.all()
+
+    rows = list(users.values_list('id', 'username', 'used_storage'))
+    usage = calculate_storage_usage([user_id for user_id, _, _ in rows])
+
+    changes = [
+        {'user_id': user_id, 'username': username, 'old': old, 'new': usage[user_id]}
+        for user_id, username, old in rows
+        if old != usage[user_id]
+    ]
+    updated_count = 0 if dry_run else apply_storage_corrections(changes)
+    return changes, updated_count
@@ -1,10 +1,12 @@
+import os
+
 from rest_framework import serializers
-from .models import Folder, File, FileShare
+from .models import Folder, File, FileShare, UploadSession, Job
 
 
 class FolderSerializer(serializers.ModelSerializer):
     """文件夹序列化器"""
-    full_path = serializers.ReadOnlyField()
+    full_path = serializers.SerializerMethodField()
     children_count = serializers.SerializerMethodField()
     files_count = serializers.SerializerMethodField()
     
@@ -14,11 +16,21 @@ class FolderSerializer(serializers.ModelSerializer):
                  'files_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def get_full_path(self, obj):
+        # 列表中的文件夹同属一个父文件夹，父路径由视图算好后通过 context 传入
+        parent_path = self.context.get('parent_path')
+        if parent_path is None:
+            return obj.full_path
+        return f"{parent_path}/{obj.name}"
+    
     def get_children_count(self, obj):
-        return obj.children.count()
+        # 优先使用 Folder.objects.with_counts() 的注解
+        count = getattr(obj, 'children_count', None)
+        return obj.children.count() if count is None else count
     
     def get_files_count(self, obj):
-        return obj.files.count()
+        count = getattr(obj, 'files_count', None)
+        return obj.files.count() if count is None else count
 
 
 class CreateFolderSerializer(serializers.Serializer):
@@ -48,7 +60,8 @@ class FileSerializer(serializers.ModelSerializer):
         return None
     
     def get_folder_name(self, obj):
-        return obj.folder.name if obj.folder else '根目录'
+        # 列表视图应 select_related('folder')
+        return obj.folder.name if obj.folder_id else '根目录'
 
 
 class UploadFileSerializer(serializers.Serializer):
@@ -57,6 +70,60 @@ class UploadFileSerializer(serializers.Serializer):
     folder_id = serializers.UUIDField(required=False, allow_null=True)
 
 
+class CreateUploadSessionSerializer(UploadFileSerializer):
+    """分片上传会话序列化器（文件内容随后分片上传）"""
+    file = None
+    file_name = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=0)
+    mime_type = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    chunk_size = serializers.IntegerField(required=False, min_value=1)
+    
+    def validate_file_name(self, value):
+        # 与 multipart 上传一致，只保留文件名部分
+        name = os.path.basename(value.replace('\\', '/')).strip()
+        if not name or name in ('.', '..'):
+            raise serializers.ValidationError('无效的文件名')
+        return name
+
+
+class InstantUploadSerializer(CreateUploadSessionSerializer):
+    """秒传序列化器（只提交内容哈希）"""
+    chunk_size = None
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
+    samples = serializers.ListField(
+        child=serializers.RegexField(r'^[0-9a-fA-F]{64}$'), required=False
+    )
+    
+    def validate_sha256(self, value):
+        return value.lower()
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """上传会话序列化器"""
+    total_chunks = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'file_name', 'folder', 'size', 'chunk_size', 'total_chunks',
+                 'mime_type', 'status', 'file', 'expires_at', 'created_at']
+        read_only_fields = fields
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """后台任务序列化器"""
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.ReadOnlyField()
+    is_finished = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'kind_display', 'status', 'status_display', 'is_finished',
+                 'progress', 'progress_done', 'progress_total', 'result', 'error',
+                 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
 class FileShareSerializer(serializers.ModelSerializer):
     """文件分享序列化器"""
     file_name = serializers.SerializerMethodField()
@@ -72,6 +139,7 @@ class FileShareSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'share_code', 'download_count', 'created_at']
     
     def get_file_name(self, obj):
+        # 列表视图应 select_related('file')
         return obj.file.name
     
     def get_file_size_display(self, obj):
@@ -4,12 +4,22 @@ Files 应用服务层模块
 提供存储服务的统一接口：
 - swift_service: Swift 对象存储服务
 - local_service: 本地文件存储服务
+- upload_service: 分片上传（断点续传）服务
+- blob_service: 内容寻址去重存储服务
+- trash_service: 回收站文件彻底删除服务
 """
 
 from .swift_service import SwiftStorageService
 from .local_service import LocalStorageService
+from .upload_service import ChunkedUploadService
+from .blob_service import BlobService, HashingReader
+from .trash_service import TrashService
 
 __all__ = [
     'SwiftStorageService',
     'LocalStorageService',
+    'ChunkedUploadService',
+    'BlobService',
+    'HashingReader',
+    'TrashService',
 ]
@@ -0,0 +1,352 @@
+"""
+内容寻址存储服务
+
+相同内容只保存一份：
+- 上传时边读取边计算 SHA-256，不需要再读一遍文件；本地分片在合并时计算，
+  Swift 分片在服务端合并，提交后由后台任务读取合并结果计算
+- 上传完成后按哈希登记，已有相同内容时删除刚上传的副本，引用已有对象
+- 文件记录删除时减少引用数，归零后才删除存储对象
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, ProtectedError, Value, When
+
+from .swift_service import swift_service
+from .local_service import local_service
+
+
+class HashingReader:
+    """读取时同步计算 SHA-256 的文件包装
+
+    只支持从头顺序读取；回到开头（如上传重试）时重新计算
+    """
+
+    def __init__(self, file_obj):
+        self._file = file_obj
+        self._hasher = hashlib.sha256()
+        self._position = 0
+        self.name = getattr(file_obj, 'name', None)
+        self.size = getattr(file_obj, 'size', None)
+        self.content_type = getattr(file_obj, 'content_type', None)
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self._hasher.update(data)
+        self._position += len(data)
+        return data
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        if whence != 0 or offset not in (0, self._position):
+            raise OSError("HashingReader only supports seeking to the start")
+        if offset == 0:
+            self._file.seek(0)
+            self._hasher = hashlib.sha256()
+            self._position = 0
+        return self._position
+
+    def chunks(self, chunk_size=64 * 1024):
+        """与 Django File.chunks 一致，从头开始分块读取"""
+        self.seek(0)
+        while True:
+            data = self.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+    def hexdigest(self):
+        """读取完整时返回 SHA-256，否则返回 None"""
+        if self.size is not None and self._position != self.size:
+            return None
+        return self._hasher.hexdigest()
+
+
+class BlobService:
+    """内容寻址存储服务类"""
+
+    def register(self, sha256, size, location):
+        """登记刚上传的内容
+
+        已有相同哈希的内容时引用已有对象，调用方应删除刚上传的副本
+
+        Args:
+            sha256: 内容哈希（未知时为 None，不参与去重）
+            size: 大小（字节）
+            location: 刚上传的存储位置（swift_container、swift_object、local_path）
+
+        Returns:
+            tuple: (blob, created)
+        """
+        from ..models import Blob
+
+        if not sha256:
+            return Blob.objects.create(size=size, ref_count=1, **location), True
+
+        while True:
+            blob, created = Blob.objects.get_or_create(
+                sha256=sha256,
+                defaults={'size': size, 'ref_count': 1, **location}
+            )
+            if created or self.acquire(blob):
+                return blob, created
+            # 已有对象恰好被释放删除，重新登记
+
+    def hash_content(self, blob_id):
+        """读取未登记哈希的内容计算 SHA-256，并登记到内容记录
+
+        Returns:
+            str: SHA-256，内容已登记、已删除或读取失败时返回 None
+        """
+        from ..models import Blob
+        from ..utils import open_file_stream
+
+        blob = Blob.objects.filter(pk=blob_id, sha256__isnull=True).first()
+        if blob is None:
+            return None
+
+        success, result = open_file_stream(blob)
+        if not success:
+            print(f"Warning: Blob hashing failed: {result}")
+            return None
+        stream, _ = result
+        hasher = hashlib.sha256()
+        try:
+            for chunk in stream:
+                hasher.update(chunk)
+        finally:
+            stream.close()
+
+        sha256 = hasher.hexdigest()
+        self.assign_digest(blob_id, sha256)
+        return sha256
+
+    def assign_digest(self, blob_id, sha256):
+        """为未登记哈希的内容登记 SHA-256
+
+        已有相同内容时把引用该内容的文件改为引用已有对象，并删除这一份
+        """
+        from ..models import Blob, File
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(pk=blob_id, sha256__isnull=True).first()
+            if blob is None:
+                return
+            existing = Blob.objects.select_for_update().filter(
+                sha256=sha256, ref_count__gt=0
+            ).exclude(pk=blob_id).first()
+
+            if existing is None:
+                try:
+                    with transaction.atomic():
+                        Blob.objects.filter(pk=blob_id).update(sha256=sha256)
+                except IntegrityError:
+                    # 相同内容同时登记（或已有记录正在释放），保留为不参与去重的内容
+                    pass
+                return
+
+            moved = File.objects.filter(blob_id=blob_id).update(blob=existing, **existing.location)
+            Blob.objects.filter(pk=existing.pk).update(ref_count=F('ref_count') + moved)
+            Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - moved)
+            # 不再被引用，删除记录并在提交后删除存储对象
+            self.release(blob_id, 0)
+
+    def find(self, sha256, size):
+        """按哈希和大小查找已有内容"""
+        from ..models import Blob
+
+        if not sha256:
+            return None
+        return Blob.objects.filter(sha256=sha256, size=size, ref_count__gt=0).first()
+
+    def _get_instant_config(self):
+        """获取秒传配置"""
+        return getattr(settings, 'INSTANT_UPLOAD_CONFIG', {})
+
+    def get_sample_ranges(self, sha256, size, user_id):
+        """生成秒传校验的抽样范围
+
+        由服务端密钥、用户和内容哈希确定性地计算，不需要保存状态；
+        只知道哈希而没有文件内容的客户端无法给出这些范围的摘要
+
+        Returns:
+            list: [(start, end), ...]，闭区间
+        """
+        config = self._get_instant_config()
+        sample_size = config.get('SAMPLE_SIZE', 64 * 1024)
+        sample_count = config.get('SAMPLE_COUNT', 3)
+
+        if size == 0:
+            return []
+        if size <= sample_size * sample_count:
+            # 小文件直接校验全部内容
+            return [(0, size - 1)]
+
+        seed = hmac.new(
+            settings.SECRET_KEY.encode(),
+            f"{user_id}:{sha256}:{size}".encode(),
+            hashlib.sha256
+        ).digest()
+        span = size - sample_size + 1
+        ranges = []
+        for index in range(sample_count):
+            start = int.from_bytes(seed[index * 8:(index + 1) * 8], 'big') % span
+            ranges.append((start, start + sample_size - 1))
+        return sorted(ranges)
+
+    def verify_samples(self, blob, ranges, samples):
+        """读取已有内容的抽样范围，校验客户端提交的 SHA-256 摘要
+
+        Args:
+            blob: 已有内容
+            ranges: get_sample_ranges 返回的范围
+            samples: 客户端计算的各范围十六进制摘要
+
+        Returns:
+            bool: 全部一致时返回 True
+        """
+        from ..utils import open_file_stream
+
+        if len(samples) != len(ranges):
+            return False
+
+        for byte_range, expected in zip(ranges, samples):
+            success, result = open_file_stream(blob, byte_range=byte_range)
+            if not success:
+                return False
+            stream, _ = result
+            hasher = hashlib.sha256()
+            try:
+                for chunk in stream:
+                    hasher.update(chunk)
+            finally:
+                stream.close()
+            if not hmac.compare_digest(hasher.hexdigest(), str(expected).lower()):
+                return False
+        return True
+
+    def acquire(self, blob):
+        """增加一次引用
+
+        Returns:
+            bool: 对象已被删除时返回 False
+        """
+        from ..models import Blob
+
+        return Blob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1) > 0
+
+    def release(self, blob_id, count=1):
+        """减少引用，归零时删除记录，并在事务提交后删除存储对象
+
+        Args:
+            blob_id: Blob 主键
+            count: 减少的引用数
+        """
+        from ..models import Blob
+
+        Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - count)
+
+        blob = Blob.objects.filter(pk=blob_id, ref_count__lte=0).first()
+        if blob is None:
+            return
+        try:
+            deleted, _ = Blob.objects.filter(pk=blob_id, ref_count__lte=0).delete()
+        except ProtectedError:
+            # 引用数与实际不符，仍有文件使用该内容，保留
+            return
+        if deleted:
+            location, size = blob.location, blob.size
+            transaction.on_commit(lambda: self.delete_content(location, size))
+
+    def release_many(self, blob_counts):
+        """批量减少引用，删除引用归零且不再被文件使用的内容记录
+        
+        不删除存储对象，由调用方在事务提交后调用 delete_contents
+        
+        Args:
+            blob_counts: {blob_id: 减少的引用数}
+            
+        Returns:
+            list: 需要删除的存储对象 [(location, size), ...]
+        """
+        from ..models import Blob, File
+        
+        released = []
+        blob_ids = list(blob_counts)
+        for start in range(0, len(blob_ids), 500):
+            batch = blob_ids[start:start + 500]
+            whens = [When(pk=blob_id, then=Value(blob_counts[blob_id])) for blob_id in batch]
+            Blob.objects.filter(pk__in=batch).update(
+                ref_count=F('ref_count') - Case(*whens, default=Value(0), output_field=IntegerField())
+            )
+            
+            dead = Blob.objects.filter(pk__in=batch, ref_count__lte=0).exclude(
+                Exists(File.objects.filter(blob=OuterRef('pk')))
+            )
+            dead_blobs = list(dead)
+            Blob.objects.filter(pk__in=[blob.pk for blob in dead_blobs], ref_count__lte=0).delete()
+            released += [(blob.location, blob.size) for blob in dead_blobs]
+        return released
+    
+    def delete_contents(self, contents):
+        """批量删除存储对象
+        
+        Swift 对象交给 swift_service.delete_objects 分批、并发删除（支持时使用 bulk-delete）
+        
+        Args:
+            contents: [(location, size), ...]
+            
+        Returns:
+            int: 删除失败的对象数
+        """
+        swift_objects = []
+        failed = 0
+        for location, size in contents:
+            if location.get('swift_container') and location.get('swift_object'):
+                swift_objects.append((location['swift_container'], location['swift_object'], size))
+            if location.get('local_path'):
+                success, result = local_service.delete_file(location['local_path'])
+                if not success:
+                    print(f"Warning: Local file deletion error: {result}")
+                    failed += 1
+        
+        if swift_objects:
+            try:
+                errors = swift_service.delete_objects(swift_objects)
+            except Exception as swift_error:
+                print(f"Warning: Swift deletion error: {swift_error}")
+                return failed + len(swift_objects)
+            for container_name, object_name, error in errors:
+                print(f"Warning: Swift deletion failed: {container_name}/{object_name}: {error}")
+            failed += len(errors)
+        return failed
+    
+    def delete_content(self, location, size=None):
+        """删除存储位置上的对象
+
+        Args:
+            location: 存储位置（swift_container、swift_object、local_path）
+            size: 大小（字节，可选）
+        """
+        try:
+            if location.get('swift_container') and location.get('swift_object'):
+                success, result = swift_service.delete_file(
+                    location['swift_container'], location['swift_object'], size
+                )
+                if not success:
+                    print(f"Warning: Swift deletion failed: {result}")
+        except Exception as swift_error:
+            print(f"Warning: Swift deletion error: {swift_error}")
+
+        if location.get('local_path'):
+            success, result = local_service.delete_file(location['local_path'])
+            if not success:
+                print(f"Warning: Local file deletion error: {result}")
+
+
+# 单例实例
+blob_service = BlobService()
@@ -4,11 +4,40 @@
 作为 Swift 的备用存储方案
 """
 import os
+import shutil
 import uuid
 from pathlib import Path
 from django.conf import settings
 
 
+class LocalFileStream:
+    """本地文件读取流，按固定大小逐块读取"""
+    
+    def __init__(self, file_handle, chunk_size, length=None):
+        self._file = file_handle
+        self._chunk_size = chunk_size
+        self._remaining = length
+    
+    def __iter__(self):
+        try:
+            while self._remaining is None or self._remaining > 0:
+                size = self._chunk_size
+                if self._remaining is not None:
+                    size = min(size, self._remaining)
+                chunk = self._file.read(size)
+                if not chunk:
+                    break
+                if self._remaining is not None:
+                    self._remaining -= len(chunk)
+                yield chunk
+        finally:
+            self.close()
+    
+    def close(self):
+        """关闭文件"""
+        self._file.close()
+
+
 class LocalStorageService:
     """本地存储服务类"""
     
@@ -69,14 +98,156 @@ class LocalStorageService:
         except Exception as e:
             return False, str(e)
     
-    def download_file(self, file_path):
-        """从本地存储下载文件
+    def copy_file(self, file_path, user_id, filename):
+        """复制文件到用户目录
+        
+        优先使用硬链接（不复制数据，删除任一路径不影响另一个）；
+        跨文件系统等无法链接时由 shutil.copyfile 复制，Linux 上使用内核态复制，
+        支持的文件系统会使用 reflink
+        
+        Args:
+            file_path: 源文件路径
+            user_id: 目标用户 ID
+            filename: 文件名
+            
+        Returns:
+            tuple: (success, file_path or error_message)
+        """
+        try:
+            user_dir = self._ensure_user_dir(user_id)
+            dest_path = user_dir / f"{uuid.uuid4()}_{filename}"
+            
+            try:
+                os.link(file_path, dest_path)
+            except OSError:
+                shutil.copyfile(file_path, dest_path)
+            
+            return True, str(dest_path)
+            
+        except Exception as e:
+            return False, str(e)
+    
+    def _get_chunk_dir(self, session_id):
+        """分片上传会话的临时目录"""
+        return Path(self.storage_path) / '.uploads' / str(session_id)
+    
+    def save_chunk(self, stream, session_id, index, length):
+        """保存上传分片
+        
+        Args:
+            stream: 可读对象
+            session_id: 上传会话 ID
+            index: 分片序号
+            length: 分片长度（字节）
+            
+        Returns:
+            tuple: (success, error_message or None)
+        """
+        try:
+            chunk_dir = self._get_chunk_dir(session_id)
+            chunk_dir.mkdir(parents=True, exist_ok=True)
+            chunk_path = chunk_dir / f"{index:08d}"
+            part_path = chunk_dir / f"{index:08d}.{uuid.uuid4().hex}.part"
+            
+            block_size = getattr(settings, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+            remaining = length
+            with open(part_path, 'wb') as f:
+                while remaining > 0:
+                    data = stream.read(min(block_size, remaining))
+                    if not data:
+                        break
+                    f.write(data)
+                    remaining -= len(data)
+            
+            if remaining:
+                part_path.unlink()
+                return False, "分片数据不完整"
+            
+            # 写完后再改名，并发重传同一分片时不会读到半个文件
+            os.replace(part_path, chunk_path)
+            return True, None
+            
+        except Exception as e:
+            return False, str(e)
+    
+    def assemble_chunks(self, session_id, chunk_count, user_id, filename, hasher=None):
+        """按顺序合并上传分片为最终文件
+        
+        Args:
+            session_id: 上传会话 ID
+            chunk_count: 分片总数
+            user_id: 用户 ID
+            filename: 文件名
+            hasher: 哈希对象（可选），合并时按顺序更新为整个文件的摘要
+            
+        Returns:
+            tuple: (success, file_path or error_message)
+        """
+        try:
+            chunk_dir = self._get_chunk_dir(session_id)
+            user_dir = self._ensure_user_dir(user_id)
+            file_path = user_dir / f"{uuid.uuid4()}_{filename}"
+            
+            block_size = getattr(settings, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+            if chunk_count == 1:
+                # 单个分片直接移动
+                if hasher is not None:
+                    self._hash_file(chunk_dir / f"{0:08d}", hasher, block_size)
+                os.replace(chunk_dir / f"{0:08d}", file_path)
+            else:
+                try:
+                    with open(file_path, 'wb') as f:
+                        for index in range(chunk_count):
+                            with open(chunk_dir / f"{index:08d}", 'rb') as chunk:
+                                for data in iter(lambda: chunk.read(block_size), b''):
+                                    if hasher is not None:
+                                        hasher.update(data)
+                                    f.write(data)
+                except Exception:
+                    # 保留分片以便重试合并
+                    file_path.unlink(missing_ok=True)
+                    raise
+            
+            self.delete_chunks(session_id)
+            return True, str(file_path)
+            
+        except Exception as e:
+            return False, str(e)
+    
+    def _hash_file(self, path, hasher, block_size):
+        """按块读取文件更新哈希"""
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(block_size), b''):
+                hasher.update(data)
+    
+    def delete_chunks(self, session_id):
+        """删除上传会话的全部分片"""
+        shutil.rmtree(self._get_chunk_dir(session_id), ignore_errors=True)
+    
+    def open_new_file(self, user_id, filename):
+        """在用户目录下创建新文件，用于边接收边写入
+        
+        Args:
+            user_id: 用户 ID
+            filename: 文件名
+            
+        Returns:
+            tuple: (file_path, file_handle)
+        """
+        user_dir = self._ensure_user_dir(user_id)
+        file_path = user_dir / f"{uuid.uuid4()}_{filename}"
+        return str(file_path), open(file_path, 'wb')
+    
+    def open_stream(self, file_path, chunk_size=None, byte_range=None):
+        """以流的方式读取本地文件
         
         Args:
             file_path: 文件路径
+            chunk_size: 分块大小（可选）
+            byte_range: 字节范围 (start, end)，闭区间（可选）
             
         Returns:
-            tuple: (success, (content, headers) or error_message)
+            tuple: (success, (stream, headers) or error_message)
         """
         try:
             path = Path(file_path)
@@ -84,16 +255,23 @@ class LocalStorageService:
             if not path.exists():
                 return False, f"文件不存在: {file_path}"
             
-            # 读取文件内容
-            with open(path, 'rb') as f:
-                file_content = f.read()
+            if chunk_size is None:
+                chunk_size = getattr(settings, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
             
-            # 创建简单的头信息
+            file_handle = open(path, 'rb')
+            length = None
+            if byte_range is not None:
+                # 只读取请求的范围
+                start, end = byte_range
+                file_handle.seek(start)
+                length = end - start + 1
             headers = {
-                'Content-Length': str(len(file_content)),
+                'Content-Length': str(
+                    length if length is not None else os.fstat(file_handle.fileno()).st_size
+                ),
             }
             
-            return True, (file_content, headers)
+            return True, (LocalFileStream(file_handle, chunk_size, length), headers)
             
         except Exception as e:
             return False, str(e)
@@ -118,6 +296,22 @@ class LocalStorageService:
         except Exception as e:
             return False, str(e)
     
+    def get_relative_path(self, file_path):
+        """获取文件相对于存储根目录的路径，不在存储目录内时返回 None
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            str or None: 使用 / 分隔的相对路径
+        """
+        root = Path(self.storage_path).resolve()
+        try:
+            relative = Path(file_path).resolve().relative_to(root)
+        except ValueError:
+            return None
+        return relative.as_posix()
+    
     def get_file_url(self, file_path):
         """获取文件访问 URL
         
@@ -0,0 +1,210 @@
+"""
+Swift 连接池
+
+进程内共享的 Swift 连接管理：
+- 缓存认证令牌和存储 URL，过期前不再请求 Keystone
+- 复用空闲连接，保持 keep-alive 的 HTTP 会话
+- 令牌失效（401）时由 swiftclient 自动重新认证，并回写共享缓存
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    from swiftclient import Connection
+    from swiftclient.exceptions import ClientException
+    SWIFT_AVAILABLE = True
+except ImportError:
+    SWIFT_AVAILABLE = False
+    Connection = None
+    ClientException = Exception
+
+
+class SwiftConnectionPool:
+    """线程安全的 Swift 连接池"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+        self._idle = []
+        self._auth = None  # (storage_url, token, expires_at)
+        self._auth_failed_at = 0
+        self._pid = os.getpid()
+
+    def _get_config(self):
+        """获取 Swift 配置"""
+        return getattr(settings, 'SWIFT_CONFIG', {})
+
+    def _get_pool_config(self):
+        """获取连接池配置"""
+        return getattr(settings, 'SWIFT_POOL_CONFIG', {})
+
+    @property
+    def max_idle(self):
+        """最多保留的空闲连接数"""
+        return self._get_pool_config().get('MAX_IDLE_CONNECTIONS', 8)
+
+    @property
+    def token_ttl(self):
+        """令牌缓存时间（秒），应略短于 Keystone 令牌有效期"""
+        return self._get_pool_config().get('TOKEN_TTL_SECONDS', 50 * 60)
+
+    @property
+    def auth_retry_interval(self):
+        """认证失败后的冷却时间（秒），期间直接失败，避免 Keystone 不可用时每个请求都等待超时"""
+        return self._get_pool_config().get('AUTH_RETRY_INTERVAL', 30)
+
+    def _check_fork(self):
+        """进程 fork 后丢弃父进程继承的连接和令牌"""
+        if self._pid != os.getpid():
+            with self._lock:
+                self._idle = []
+                self._auth = None
+                self._pid = os.getpid()
+
+    def _build_connection(self):
+        """创建新的 Swift 连接（不含认证）"""
+        if not SWIFT_AVAILABLE:
+            raise RuntimeError("Swift client is not installed")
+
+        swift_config = self._get_config()
+        pool_config = self._get_pool_config()
+
+        return Connection(
+            authurl=swift_config['auth_url'],
+            user=swift_config['username'],
+            key=swift_config['password'],
+            tenant_name=swift_config['project_name'],
+            auth_version=swift_config['auth_version'],
+            os_options={
+                'project_domain_id': swift_config['project_domain_id'],
+                'user_domain_id': swift_config['user_domain_id'],
+                'region_name': swift_config['region_name'],
+            },
+            retries=pool_config.get('RETRIES', 5),
+            timeout=pool_config.get('TIMEOUT'),
+        )
+
+    def _store_auth(self, url, token):
+        """保存认证结果"""
+        with self._lock:
+            self._auth = (url, token, time.time() + self.token_ttl)
+
+    def get_auth(self, force=False):
+        """获取 (storage_url, token)，缓存有效时不访问 Keystone
+
+        Args:
+            force: 是否忽略缓存强制重新认证
+
+        Returns:
+            tuple: (storage_url, token)
+        """
+        self._check_fork()
+
+        auth = self._auth
+        if auth and not force and auth[2] > time.time():
+            return auth[0], auth[1]
+
+        # 同一时刻只允许一个线程去 Keystone 认证
+        with self._auth_lock:
+            auth = self._auth
+            if auth and not force and auth[2] > time.time():
+                return auth[0], auth[1]
+            if time.time() - self._auth_failed_at < self.auth_retry_interval:
+                raise RuntimeError("Swift authentication failed recently, retry later")
+            try:
+                url, token = self._build_connection().get_auth()
+            except Exception:
+                self._auth_failed_at = time.time()
+                raise
+            self._auth_failed_at = 0
+            self._store_auth(url, token)
+            return url, token
+
+    def get_storage_url(self):
+        """获取存储 URL（来自缓存的认证结果）"""
+        return self.get_auth()[0]
+
+    def invalidate(self):
+        """使缓存的令牌失效"""
+        with self._lock:
+            self._auth = None
+
+    def create_connection(self):
+        """创建一个带有共享令牌的连接（由调用方自行管理生命周期）"""
+        conn = self._build_connection()
+        conn.url, conn.token = self.get_auth()
+        return conn
+
+    def acquire(self):
+        """从池中取出连接"""
+        url, token = self.get_auth()
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._build_connection()
+
+        conn.url, conn.token = url, token
+        conn._pool_token = token
+        return conn
+
+    def release(self, conn, discard=False):
+        """归还连接
+
+        Args:
+            conn: 连接对象
+            discard: 为 True 时关闭连接而不放回池中
+        """
+        # 使用过程中遇到 401 时 swiftclient 会重新认证，回写新令牌
+        if conn.url and conn.token and conn.token != getattr(conn, '_pool_token', None):
+            self._store_auth(conn.url, conn.token)
+
+        if not discard and self._pid == os.getpid():
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    return
+
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """以上下文管理器方式使用池中的连接
+
+        用法:
+            with swift_pool.connection() as swift:
+                swift.put_object(...)
+        """
+        conn = self.acquire()
+        healthy = True
+        try:
+            yield conn
+        except ClientException:
+            # Swift 返回的业务错误不影响连接本身
+            raise
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.release(conn, discard=not healthy)
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+# 单例实例
+swift_pool = SwiftConnectionPool()
@@ -3,23 +3,156 @@ Swift 对象存储服务
 
 封装所有 Swift 相关操作
 """
+import itertools
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote, urlsplit
+
 from django.conf import settings
 
+from .swift_pool import swift_pool, SWIFT_AVAILABLE, ClientException
+
 try:
-    from swiftclient import Connection
-    from swiftclient.exceptions import ClientException
-    SWIFT_AVAILABLE = True
+    from swiftclient.utils import generate_temp_url
 except ImportError:
-    SWIFT_AVAILABLE = False
-    Connection = None
-    ClientException = Exception
+    generate_temp_url = None
+
+
+def get_download_chunk_size():
+    """获取流式下载的分块大小"""
+    return getattr(settings, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+
+
+class ContainerCache:
+    """已确认存在的容器集合（进程内，带过期时间）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expires = {}
+    
+    @property
+    def ttl(self):
+        """缓存时间（秒）"""
+        return getattr(settings, 'SWIFT_CONTAINER_CACHE_TTL', 60 * 60)
+    
+    def __contains__(self, container_name):
+        expires_at = self._expires.get(container_name)
+        return expires_at is not None and expires_at > time.time()
+    
+    def add(self, container_name):
+        """记录容器存在"""
+        with self._lock:
+            self._expires[container_name] = time.time() + self.ttl
+    
+    def discard(self, container_name):
+        """移除容器记录"""
+        with self._lock:
+            self._expires.pop(container_name, None)
+
+
+class SwiftObjectStream:
+    """Swift 对象读取流
+    
+    按固定大小逐块读取响应体，读完或关闭时把连接归还连接池
+    """
+    
+    def __init__(self, pool, conn, body):
+        self._pool = pool
+        self._conn = conn
+        self._body = body
+    
+    def __iter__(self):
+        try:
+            for chunk in self._body:
+                yield chunk
+        finally:
+            self.close()
+    
+    def close(self):
+        """关闭响应体并归还连接"""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            self._body.close()
+            self._pool.release(conn)
+        except Exception:
+            self._pool.release(conn, discard=True)
+
+
+def _buffer_segments(chunks, segment_size):
+    """把数据块流按分段大小合并，依次产生每个分段的完整内容"""
+    buffer = bytearray()
+    for data in chunks:
+        buffer += data
+        while len(buffer) >= segment_size:
+            yield bytes(buffer[:segment_size])
+            del buffer[:segment_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class _ReplayableReader:
+    """记录已读取的数据（不超过 limit），请求失败后可以从头重新读取一次
+
+    source 为可读对象或产生 bytes 的可迭代对象
+    """
+    
+    def __init__(self, source, limit):
+        if hasattr(source, 'read'):
+            self._read_source = source.read
+        else:
+            chunks = iter(source)
+            self._read_source = lambda size: next(chunks, b'')
+        self._limit = limit
+        self._recorded = []
+        self._recorded_size = 0
+        self._replay = b''
+        self._replay_offset = 0
+        self.replayable = True
+    
+    def read(self, size=-1):
+        if self._replay_offset < len(self._replay):
+            end = len(self._replay) if size is None or size < 0 else self._replay_offset + size
+            data = self._replay[self._replay_offset:end]
+            self._replay_offset += len(data)
+            return data
+        
+        data = self._read_source(size)
+        if self.replayable and data:
+            self._recorded_size += len(data)
+            if self._recorded_size <= self._limit:
+                self._recorded.append(data)
+            else:
+                self.replayable = False
+                self._recorded = []
+        return data
+    
+    def rewind(self):
+        """回到开头，先返回已记录的数据，再继续读取 source
+        
+        Returns:
+            bool: 读取过的数据超过 limit（未全部记录）或已经回退过时返回 False
+        """
+        if not self.replayable:
+            return False
+        self._replay = b''.join(self._recorded)
+        self._replay_offset = 0
+        self._recorded = []
+        self.replayable = False
+        return True
 
 
 class SwiftStorageService:
     """Swift 存储服务类"""
     
     def __init__(self):
-        self._connection = None
+        self._pool = swift_pool
+        self._containers = ContainerCache()
+        self._bulk_delete_limit = None
     
     @property
     def is_available(self):
@@ -31,40 +164,44 @@ class SwiftStorageService:
         return getattr(settings, 'SWIFT_CONFIG', {})
     
     def get_connection(self):
-        """获取 Swift 连接"""
+        """获取 Swift 连接（复用连接池缓存的令牌，由调用方负责关闭）"""
         if not SWIFT_AVAILABLE:
             raise RuntimeError("Swift client is not installed")
-        
-        swift_config = self._get_config()
-        
-        return Connection(
-            authurl=swift_config['auth_url'],
-            user=swift_config['username'],
-            key=swift_config['password'],
-            tenant_name=swift_config['project_name'],
-            auth_version=swift_config['auth_version'],
-            os_options={
-                'project_domain_id': swift_config['project_domain_id'],
-                'user_domain_id': swift_config['user_domain_id'],
-                'region_name': swift_config['region_name'],
-            }
-        )
+        return self._pool.create_connection()
+    
+    def connection(self):
+        """从连接池借用连接（上下文管理器）"""
+        if not SWIFT_AVAILABLE:
+            raise RuntimeError("Swift client is not installed")
+        return self._pool.connection()
     
     def create_container(self, container_name):
-        """创建容器（如果不存在）"""
+        """创建容器（如果不存在），已确认存在的容器在缓存期内不再请求 Swift"""
+        if container_name in self._containers:
+            return True
+        
         try:
-            swift = self.get_connection()
-            # 尝试获取容器信息
-            swift.head_container(container_name)
+            with self.connection() as swift:
+                try:
+                    # 尝试获取容器信息
+                    swift.head_container(container_name)
+                except ClientException:
+                    # 容器不存在，创建容器
+                    swift.put_container(container_name)
+            self._containers.add(container_name)
             return True
         except Exception:
-            # 容器不存在，创建容器
-            try:
-                swift = self.get_connection()
-                swift.put_container(container_name)
-                return True
-            except Exception:
-                return False
+            return False
+    
+    def _recreate_container(self, swift, container_name):
+        """容器在缓存期内被删除（写入返回 404）：清除缓存并重建容器"""
+        self._containers.discard(container_name)
+        swift.put_container(container_name)
+        self._containers.add(container_name)
+    
+    def _get_retry_buffer_size(self):
+        """流式写入时为失败重试保留的数据量上限"""
+        return getattr(settings, 'SWIFT_STREAM_RETRY_BUFFER', 8 * 1024 * 1024)
     
     def upload_file(self, file_obj, container_name, object_name=None):
         """上传文件到 Swift
@@ -80,91 +217,639 @@ class SwiftStorageService:
         if object_name is None:
             object_name = file_obj.name
         
+        # 大文件分段并行上传
+        if self.should_segment(getattr(file_obj, 'size', None)):
+            return self.upload_large_file(file_obj, container_name, object_name)
+        
         # 确保容器存在
         self.create_container(container_name)
         
         try:
-            swift = self.get_connection()
-            swift.put_object(
-                container_name,
-                object_name,
-                contents=file_obj
-            )
+            with self.connection() as swift:
+                try:
+                    swift.put_object(
+                        container_name,
+                        object_name,
+                        contents=file_obj
+                    )
+                except ClientException as e:
+                    if e.http_status != 404 or not hasattr(file_obj, 'seek'):
+                        raise
+                    # 容器已被删除：清除缓存，重建容器后重试一次
+                    self._recreate_container(swift, container_name)
+                    file_obj.seek(0)
+                    swift.put_object(
+                        container_name,
+                        object_name,
+                        contents=file_obj
+                    )
             return True, "Upload successful"
         except Exception as e:
             return False, str(e)
     
-    def download_file(self, container_name, object_name):
-        """从 Swift 下载文件
+    def _get_slo_config(self):
+        """获取分段上传配置"""
+        return getattr(settings, 'SWIFT_SLO_CONFIG', {})
+    
+    def should_segment(self, size):
+        """文件是否需要分段上传"""
+        threshold = self._get_slo_config().get('THRESHOLD', 1024 * 1024 * 1024)
+        return size is not None and size > threshold
+    
+    def may_be_large_object(self, size):
+        """对象是否可能是分段上传的清单（大小未知时视为可能）"""
+        if size is None:
+            return True
+        slo_config = self._get_slo_config()
+        # 分片上传会话的每个分片都是一个分段，多分片文件一定大于最小分片
+        chunked_config = getattr(settings, 'CHUNKED_UPLOAD_CONFIG', {})
+        return size > min(
+            slo_config.get('THRESHOLD', 1024 * 1024 * 1024),
+            slo_config.get('SEGMENT_SIZE', 64 * 1024 * 1024),
+            chunked_config.get('MIN_CHUNK_SIZE', 1024 * 1024)
+        )
+    
+    def _upload_segment(self, segments_container, segment_name, open_segment, size, retries):
+        """上传单个分段，失败时只重试该分段
+        
+        Returns:
+            dict: 清单中的分段描述
+        """
+        last_error = None
+        for _ in range(retries + 1):
+            contents = None
+            try:
+                contents = open_segment()
+                with self.connection() as swift:
+                    etag = swift.put_object(
+                        segments_container,
+                        segment_name,
+                        contents=contents,
+                        content_length=size
+                    )
+                return {
+                    'path': f'/{segments_container}/{segment_name}',
+                    'etag': etag,
+                    'size_bytes': size,
+                }
+            except ClientException as e:
+                last_error = e
+                if e.http_status == 404:
+                    # 分段容器已被删除：重建后在下一次重试中写入
+                    try:
+                        with self.connection() as swift:
+                            self._recreate_container(swift, segments_container)
+                    except Exception:
+                        pass
+            except Exception as e:
+                last_error = e
+            finally:
+                if hasattr(contents, 'close'):
+                    contents.close()
+        raise last_error
+    
+    def upload_large_file(self, file_obj, container_name, object_name):
+        """分段上传大文件（Static Large Object）
+        
+        文件被切分为固定大小的分段，由有界线程池并行上传到 {container}_segments 容器，
+        全部成功后提交清单对象。磁盘上的上传文件由各线程按偏移独立读取，
+        其他文件对象按顺序读入内存，同时在途的分段数不超过线程数
+        
+        Args:
+            file_obj: 文件对象（需要 size 属性）
+            container_name: 容器名称
+            object_name: 对象名称
+            
+        Returns:
+            tuple: (success, message)
+        """
+        slo_config = self._get_slo_config()
+        size = file_obj.size
+        max_segments = slo_config.get('MAX_SEGMENTS', 1000)
+        segment_size = max(
+            slo_config.get('SEGMENT_SIZE', 64 * 1024 * 1024),
+            math.ceil(size / max_segments)
+        )
+        
+        segments_container = f"{container_name}_segments"
+        segment_prefix = f"{object_name}/slo/{time.time():.6f}/{size}/{segment_size}"
+        temp_path = file_obj.temporary_file_path() if hasattr(file_obj, 'temporary_file_path') else None
+        
+        self.create_container(container_name)
+        self.create_container(segments_container)
+        
+        def path_opener(offset):
+            def open_segment():
+                handle = open(temp_path, 'rb')
+                handle.seek(offset)
+                return handle
+            return open_segment
+        
+        def segments():
+            if temp_path is None:
+                file_obj.seek(0)
+            for offset in range(0, size, segment_size):
+                length = min(segment_size, size - offset)
+                if temp_path is not None:
+                    yield path_opener(offset), length
+                else:
+                    data = file_obj.read(length)
+                    yield (lambda data=data: data), length
+        
+        try:
+            manifest = self._upload_segments(segments_container, segment_prefix, segments())
+        except Exception as e:
+            return False, str(e)
+        
+        success, message = self.put_manifest(container_name, object_name, manifest)
+        if not success:
+            self._delete_segments(manifest)
+            return False, message
+        return True, "Upload successful"
+    
+    def _upload_segments(self, segments_container, segment_prefix, segments):
+        """由有界线程池并行上传分段，单个分段失败时只重试该分段
+        
+        读取下一个分段之前等待空闲线程，同时在途（已读取未上传完）的分段数不超过线程数；
+        某个分段重试后仍失败时不再读取后续分段，已上传的分段被删除
+        
+        Args:
+            segments_container: 分段容器名称
+            segment_prefix: 分段对象名前缀
+            segments: 依次产生 (open_segment, size) 的可迭代对象，open_segment() 返回分段内容
+            
+        Returns:
+            list: 清单中的分段描述
+        """
+        slo_config = self._get_slo_config()
+        workers = slo_config.get('WORKERS', 4)
+        retries = slo_config.get('SEGMENT_RETRIES', 3)
+        
+        in_flight = threading.Semaphore(workers)
+        futures = []
+        errors = []
+        
+        def on_segment_done(future):
+            in_flight.release()
+            if future.exception() is not None:
+                errors.append(future.exception())
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                segments = iter(segments)
+                while not errors:
+                    in_flight.acquire()
+                    item = next(segments, None)
+                    if item is None:
+                        in_flight.release()
+                        break
+                    open_segment, length = item
+                    segment_name = f"{segment_prefix}/{len(futures):08d}"
+                    future = executor.submit(
+                        self._upload_segment, segments_container, segment_name,
+                        open_segment, length, retries
+                    )
+                    future.add_done_callback(on_segment_done)
+                    futures.append(future)
+            
+            if errors:
+                # 某个分段重试后仍失败
+                raise errors[0]
+            return [future.result() for future in futures]
+        
+        except Exception:
+            # 清理已上传的分段
+            self._delete_segments([
+                future.result() for future in futures
+                if future.done() and not future.exception()
+            ])
+            raise
+    
+    def _delete_segments(self, segments):
+        """删除已上传的分段"""
+        for segment in segments:
+            container_name, segment_name = segment['path'].split('/', 2)[1:]
+            self.delete_file(container_name, segment_name, segment['size_bytes'])
+    
+    def put_stream(self, stream, container_name, object_name, content_length):
+        """把长度已知的流直接写入 Swift，不在本地落盘或整体读入内存
+        
+        容器已被删除（返回 404）时重建容器，已发送的数据不超过 SWIFT_STREAM_RETRY_BUFFER
+        时重试一次；更大的流无法回退，只重建容器后返回失败
+        
+        Args:
+            stream: 可读对象
+            container_name: 容器名称
+            object_name: 对象名称
+            content_length: 内容长度（字节）
+            
+        Returns:
+            tuple: (success, etag or error_message)
+        """
+        self.create_container(container_name)
+        
+        try:
+            etag = self._put_replayable(stream, container_name, object_name, content_length)
+            return True, etag
+        except Exception as e:
+            return False, str(e)
+    
+    def _put_replayable(self, source, container_name, object_name, content_length=None):
+        """写入可读对象或数据块流，容器被删除时重建容器并在数据可以回退时重试一次
+        
+        Returns:
+            str: 对象的 ETag
+        """
+        body = _ReplayableReader(source, self._get_retry_buffer_size())
+        with self.connection() as swift:
+            try:
+                return swift.put_object(
+                    container_name, object_name, contents=body, content_length=content_length
+                )
+            except ClientException as e:
+                if e.http_status != 404:
+                    raise
+                self._recreate_container(swift, container_name)
+                if not body.rewind():
+                    raise
+                return swift.put_object(
+                    container_name, object_name, contents=body, content_length=content_length
+                )
+    
+    def upload_iter(self, chunks, container_name, object_name, expected_size=None):
+        """把逐块到达的数据写入 Swift（总长度未知，使用 chunked 传输）
+        
+        预计大小超过分段阈值时按分段大小在内存中缓冲，完成的分段与 upload_large_file 一样
+        由有界线程池并行上传到 {container}_segments 并逐段重试，全部成功后提交清单；
+        接收数据时最多缓冲线程数 + 1 个分段。容器已被删除时的处理同 put_stream
         
         Args:
+            chunks: 产生 bytes 的可迭代对象
             container_name: 容器名称
             object_name: 对象名称
+            expected_size: 预计大小（可选，如请求的 Content-Length）
             
         Returns:
-            tuple: (success, (content, headers) or error_message)
+            tuple: (success, message)
         """
+        self.create_container(container_name)
+        
+        if not self.should_segment(expected_size):
+            try:
+                self._put_replayable(chunks, container_name, object_name)
+                return True, "Upload successful"
+            except Exception as e:
+                return False, str(e)
+        
+        slo_config = self._get_slo_config()
+        segment_size = max(
+            slo_config.get('SEGMENT_SIZE', 64 * 1024 * 1024),
+            math.ceil(expected_size / slo_config.get('MAX_SEGMENTS', 1000))
+        )
+        segments_container = f"{container_name}_segments"
+        segment_prefix = f"{object_name}/slo/{time.time():.6f}/stream/{segment_size}"
+        
+        buffered = _buffer_segments(chunks, segment_size)
         try:
-            swift = self.get_connection()
-            headers, file_content = swift.get_object(container_name, object_name)
-            return True, (file_content, headers)
+            first = next(buffered, b'')
+            second = next(buffered, None)
+            if second is None:
+                # 实际数据不足一个分段：作为普通对象上传
+                with self.connection() as swift:
+                    try:
+                        swift.put_object(container_name, object_name, contents=first)
+                    except ClientException as e:
+                        if e.http_status != 404:
+                            raise
+                        self._recreate_container(swift, container_name)
+                        swift.put_object(container_name, object_name, contents=first)
+                return True, "Upload successful"
+            
+            self.create_container(segments_container)
+            segments = (
+                ((lambda data=data: data), len(data))
+                for data in itertools.chain([first, second], buffered)
+            )
+            manifest = self._upload_segments(segments_container, segment_prefix, segments)
         except Exception as e:
             return False, str(e)
+        
+        success, message = self.put_manifest(container_name, object_name, manifest)
+        if not success:
+            self._delete_segments(manifest)
+            return False, message
+        return True, "Upload successful"
     
-    def delete_file(self, container_name, object_name):
+    def put_manifest(self, container_name, object_name, segments):
+        """提交分段上传清单（Static Large Object）
+        
+        Args:
+            container_name: 容器名称
+            object_name: 对象名称
+            segments: 分段描述列表，每项包含 path、etag、size_bytes
+            
+        Returns:
+            tuple: (success, message)
+        """
+        try:
+            with self.connection() as swift:
+                swift.put_object(
+                    container_name,
+                    object_name,
+                    contents=json.dumps(segments),
+                    query_string='multipart-manifest=put'
+                )
+            return True, "Manifest created"
+        except Exception as e:
+            return False, str(e)
+    
+    def copy_object(self, container_name, object_name, dest_container, dest_object, size=None):
+        """在 Swift 服务端复制对象，数据不经过应用服务器
+        
+        分段上传的大文件逐个复制分段（并行）后提交新清单，两份文件互不共享分段，
+        删除任何一个都不影响另一个
+        
+        Args:
+            container_name: 源容器名称
+            object_name: 源对象名称
+            dest_container: 目标容器名称
+            dest_object: 目标对象名称
+            size: 文件大小（可选，用于判断是否需要检查分段）
+            
+        Returns:
+            tuple: (success, message)
+        """
+        self.create_container(dest_container)
+        
+        try:
+            with self.connection() as swift:
+                if self.may_be_large_object(size):
+                    headers = swift.head_object(container_name, object_name)
+                    if headers.get('x-static-large-object', '').lower() == 'true':
+                        _, manifest = swift.get_object(
+                            container_name, object_name, query_string='multipart-manifest=get'
+                        )
+                        return self._copy_large_object(json.loads(manifest), dest_container, dest_object)
+                
+                swift.copy_object(
+                    container_name,
+                    object_name,
+                    destination=f'/{dest_container}/{dest_object}'
+                )
+            return True, "Copy successful"
+        except Exception as e:
+            return False, str(e)
+    
+    def _copy_large_object(self, manifest, dest_container, dest_object):
+        """复制分段上传的大文件：服务端复制每个分段并提交新清单
+        
+        Args:
+            manifest: 源清单（multipart-manifest=get 的返回内容）
+            dest_container: 目标容器名称
+            dest_object: 目标对象名称
+            
+        Returns:
+            tuple: (success, message)
+        """
+        segments_container = f"{dest_container}_segments"
+        segment_prefix = f"{dest_object}/slo/{time.time():.6f}/copy"
+        self.create_container(segments_container)
+        
+        def copy_segment(index, segment):
+            segment_name = f"{segment_prefix}/{index:08d}"
+            source_container, source_object = segment['name'].lstrip('/').split('/', 1)
+            with self.connection() as swift:
+                swift.copy_object(
+                    source_container,
+                    source_object,
+                    destination=f'/{segments_container}/{segment_name}'
+                )
+            return {
+                'path': f'/{segments_container}/{segment_name}',
+                'etag': segment['hash'],
+                'size_bytes': segment['bytes'],
+            }
+        
+        workers = self._get_slo_config().get('WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(copy_segment, index, segment)
+                for index, segment in enumerate(manifest)
+            ]
+        
+        copied = [future.result() for future in futures if not future.exception()]
+        errors = [future.exception() for future in futures if future.exception()]
+        if not errors:
+            success, message = self.put_manifest(dest_container, dest_object, copied)
+            if success:
+                return True, "Copy successful"
+            errors.append(message)
+        
+        # 清理已复制的分段
+        for segment in copied:
+            self.delete_file(segments_container, segment['path'].split('/', 2)[2], segment['size_bytes'])
+        return False, str(errors[0])
+    
+    def open_stream(self, container_name, object_name, chunk_size=None, byte_range=None):
+        """以流的方式读取 Swift 对象
+        
+        连接在流读完或关闭前不会归还连接池
+        
+        Args:
+            container_name: 容器名称
+            object_name: 对象名称
+            chunk_size: 分块大小（可选）
+            byte_range: 字节范围 (start, end)，闭区间，转为 Swift 范围请求（可选）
+            
+        Returns:
+            tuple: (success, (stream, headers) or error_message)
+        """
+        try:
+            conn = self._pool.acquire()
+        except Exception as e:
+            return False, str(e)
+        
+        request_headers = None
+        if byte_range is not None:
+            request_headers = {'Range': f'bytes={byte_range[0]}-{byte_range[1]}'}
+        
+        try:
+            headers, body = conn.get_object(
+                container_name,
+                object_name,
+                resp_chunk_size=chunk_size or get_download_chunk_size(),
+                headers=request_headers
+            )
+        except Exception as e:
+            self._pool.release(conn, discard=not isinstance(e, ClientException))
+            return False, str(e)
+        
+        return True, (SwiftObjectStream(self._pool, conn, body), headers)
+    
+    def delete_file(self, container_name, object_name, size=None):
         """从 Swift 删除文件
         
+        可能是分段上传清单的对象会连同分段一起删除
+        
         Args:
             container_name: 容器名称
             object_name: 对象名称
+            size: 文件大小（可选，用于判断是否需要检查分段）
             
         Returns:
             tuple: (success, error_message or None)
         """
         try:
-            swift = self.get_connection()
-            swift.delete_object(container_name, object_name)
+            with self.connection() as swift:
+                query_string = None
+                if self.may_be_large_object(size):
+                    headers = swift.head_object(container_name, object_name)
+                    if headers.get('x-static-large-object', '').lower() == 'true':
+                        query_string = 'multipart-manifest=delete'
+                swift.delete_object(container_name, object_name, query_string=query_string)
             return True, None
         except Exception as e:
             return False, str(e)
     
-    def get_temp_url(self, container_name, object_name, expires_in=3600):
-        """获取临时访问 URL
+    def _get_bulk_delete_config(self):
+        """获取批量删除配置"""
+        return getattr(settings, 'SWIFT_BULK_DELETE_CONFIG', {})
+    
+    def get_bulk_delete_limit(self):
+        """集群 bulk-delete 中间件单次请求可删除的对象数
+        
+        结果按进程缓存；集群未启用该中间件时返回 0
+        """
+        if self._bulk_delete_limit is None:
+            try:
+                with self.connection() as swift:
+                    capabilities = swift.get_capabilities()
+            except Exception:
+                # 暂时无法查询，本次按不支持处理，下次重试
+                return 0
+            bulk_delete = capabilities.get('bulk_delete')
+            self._bulk_delete_limit = bulk_delete.get('max_deletes_per_request', 10000) if bulk_delete else 0
+        return self._bulk_delete_limit
+    
+    def _bulk_delete(self, objects):
+        """通过 bulk-delete 中间件一次请求删除一批对象
+        
+        Returns:
+            list: 删除失败的对象 [(container, object, error), ...]
+        """
+        body = '\n'.join(
+            quote(f'/{container_name}/{object_name}') for container_name, object_name, _ in objects
+        )
+        try:
+            with self.connection() as swift:
+                _, response = swift.post_account(
+                    headers={'Content-Type': 'text/plain', 'Accept': 'application/json'},
+                    query_string='bulk-delete',
+                    data=body.encode()
+                )
+            result = json.loads(response)
+        except Exception as e:
+            return [(container_name, object_name, str(e)) for container_name, object_name, _ in objects]
+        
+        response_status = result.get('Response Status', '200 OK')
+        if not response_status.startswith('2') and not result.get('Errors'):
+            return [(container_name, object_name, response_status) for container_name, object_name, _ in objects]
+        
+        # 失败列表中的路径是 URL 编码的
+        failed = {unquote(path).lstrip('/'): error for path, error in result.get('Errors', [])}
+        return [
+            (container_name, object_name, failed[f'{container_name}/{object_name}'])
+            for container_name, object_name, _ in objects
+            if f'{container_name}/{object_name}' in failed
+        ]
+    
+    def delete_objects(self, objects):
+        """批量删除对象
+        
+        集群支持 bulk-delete 时每批一个请求，否则逐个删除；批次之间并发执行，并发数有上限。
+        可能是分段上传清单的对象逐个删除，以便连同分段一起删除
+        
+        Args:
+            objects: [(container, object, size), ...]
+            
+        Returns:
+            list: 删除失败的对象 [(container, object, error), ...]，不存在的对象不算失败
+        """
+        if not objects:
+            return []
+        
+        config = self._get_bulk_delete_config()
+        workers = config.get('WORKERS', 4)
+        large = [item for item in objects if self.may_be_large_object(item[2])]
+        small = [item for item in objects if not self.may_be_large_object(item[2])]
+        
+        def delete_one(item):
+            container_name, object_name, size = item
+            success, error = self.delete_file(container_name, object_name, size)
+            if success or '404' in str(error):
+                return []
+            return [(container_name, object_name, error)]
+        
+        jobs = [(delete_one, item) for item in large]
+        limit = self.get_bulk_delete_limit() if small else 0
+        if limit:
+            batch_size = min(limit, config.get('BATCH_SIZE', 1000))
+            jobs += [
+                (self._bulk_delete, small[start:start + batch_size])
+                for start in range(0, len(small), batch_size)
+            ]
+        else:
+            jobs += [(delete_one, item) for item in small]
+        
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(lambda job: job[0](job[1]), jobs):
+                failed += result
+        return failed
+    
+    def get_storage_url(self):
+        """获取存储 URL，优先使用配置，其次使用连接池缓存的认证结果"""
+        return getattr(settings, 'SWIFT_STORAGE_URL', '') or self._pool.get_storage_url()
+    
+    def get_temp_url(self, container_name, object_name, expires_in=3600,
+                     ip_range=None, filename=None, method='GET'):
+        """生成带 HMAC 签名的临时访问 URL
+        
+        签名完全在本地计算，存储 URL 来自配置或缓存的认证结果，不产生 Swift 请求
         
         Args:
             container_name: 容器名称
             object_name: 对象名称
             expires_in: 过期时间（秒）
+            ip_range: 限制访问的 IP 或网段（可选）
+            filename: 下载时使用的文件名（可选）
+            method: 允许的 HTTP 方法
             
         Returns:
-            str or None: 临时 URL
+            str or None: 临时 URL，未配置密钥时返回 None
         """
+        key = getattr(settings, 'SWIFT_TEMP_URL_KEY', '')
+        if not key or not container_name or not object_name:
+            return None
+        
         try:
-            # 检查 Swift 服务是否可用
-            swift = self.get_connection()
-            
-            # 验证连接
-            connection_ok = False
-            for result in swift.list():
-                if result.get('success', True):
-                    connection_ok = True
-                    break
-            
-            if not connection_ok:
-                return None
-            
-            # 从配置获取基础 URL
-            swift_config = self._get_config()
-            auth_url = swift_config['auth_url']
-            
-            # 构建 Swift 对象存储的 URL
-            if '/identity' in auth_url:
-                base_url = auth_url.replace('/identity', '')
-            else:
-                base_url = auth_url.rstrip('/')
+            storage_url = urlsplit(self.get_storage_url())
+            
+            # 签名使用未编码的路径，与 Swift tempurl 中间件一致
+            path = f"{storage_url.path.rstrip('/')}/{container_name}/{object_name}"
+            signed = generate_temp_url(
+                path,
+                int(expires_in),
+                key,
+                method,
+                ip_range=ip_range,
+                digest=getattr(settings, 'SWIFT_TEMP_URL_DIGEST', 'sha256')
+            )
+            query = signed.split('?', 1)[1]
+            if filename:
+                query += f"&filename={quote(filename)}"
             
-            swift_url = f"{base_url}/v1/AUTH_admin/{container_name}/{object_name}"
-            return swift_url
+            return f"{storage_url.scheme}://{storage_url.netloc}{quote(path)}?{query}"
             
         except Exception as e:
             print(f"Error generating Swift temp URL: {e}")
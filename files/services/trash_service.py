@@ -0,0 +1,138 @@
+"""
+回收站服务
+
+彻底删除回收站文件：
+- 数据库中只有集合操作：一次聚合、一次按内容分组、一次删除记录和批量减少引用
+- 引用归零的存储对象在事务提交后分批、并发删除，不占用事务
+- 大量文件按批处理，每批一个短事务，可以汇报进度，中断后重新执行只处理剩余的文件
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .blob_service import blob_service
+
+
+class TrashService:
+    """回收站服务类"""
+
+    def _get_config(self):
+        """获取后台任务配置"""
+        return getattr(settings, 'JOB_CONFIG', {})
+
+    @property
+    def batch_size(self):
+        """每个事务处理的文件数"""
+        return self._get_config().get('PURGE_BATCH_SIZE', 1000)
+
+    def purge(self, user_id, files):
+        """彻底删除一组回收站文件
+
+        Args:
+            user_id: 文件所有者 ID
+            files: 该用户的回收站文件查询集
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        from ..quota import adjust_storage
+
+        with transaction.atomic():
+            # 锁定用户行，同一用户的删除依次执行，释放量不会重复计算
+            list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+            files = files.filter(owner_id=user_id, is_deleted=True)
+            totals = files.aggregate(count=Count('id'), total_size=Sum('size'))
+            count, total_size = totals['count'], totals['total_size'] or 0
+            if not count:
+                return 0, 0
+
+            # 同一内容的多个文件合并为一次引用释放
+            blob_counts = dict(
+                files.filter(blob__isnull=False).values('blob_id').annotate(refs=Count('id'))
+                .order_by().values_list('blob_id', 'refs')
+            )
+            # 没有 blob 的旧数据直接删除对象
+            contents = [
+                ({'swift_container': container, 'swift_object': obj, 'local_path': path}, size)
+                for container, obj, path, size in files.filter(blob__isnull=True).values_list(
+                    'swift_container', 'swift_object', 'local_path', 'size'
+                )
+            ]
+
+            files.delete()
+            contents += blob_service.release_many(blob_counts)
+
+            # 更新用户存储使用量
+            adjust_storage(user_id, -total_size)
+
+        blob_service.delete_contents(contents)
+        return count, total_size
+
+    def purge_in_batches(self, user_id, files, batch_size=None, progress=None):
+        """分批彻底删除回收站文件
+
+        Args:
+            user_id: 文件所有者 ID
+            files: 该用户的回收站文件查询集
+            batch_size: 每批文件数（可选）
+            progress: 每批完成后调用 progress(已删除数, 总数)（可选）
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        from ..models import File
+
+        batch_size = batch_size or self.batch_size
+        files = files.filter(owner_id=user_id, is_deleted=True)
+        total = files.count()
+
+        deleted_count, freed = 0, 0
+        while True:
+            ids = list(files.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            count, size = self.purge(user_id, File.objects.filter(pk__in=ids))
+            deleted_count += count
+            freed += size
+            if progress is not None:
+                progress(deleted_count, max(total, deleted_count))
+        return deleted_count, freed
+
+    def purge_expired(self, cutoff, batch_size=None, limit=None):
+        """彻底删除在 cutoff 之前移入回收站的文件（所有用户）
+
+        按删除时间顺序分批读取，每批按所有者分组后调用 purge
+
+        Args:
+            cutoff: 删除时间早于该时间的文件
+            batch_size: 每批文件数（可选）
+            limit: 本次最多删除的文件数（可选），用于限制单次执行的时长
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        from ..models import File
+
+        batch_size = batch_size or self.batch_size
+        expired = File.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+
+        deleted_count, freed = 0, 0
+        while limit is None or deleted_count < limit:
+            count = batch_size if limit is None else min(batch_size, limit - deleted_count)
+            rows = list(expired.order_by('deleted_at', 'pk').values_list('pk', 'owner_id')[:count])
+            if not rows:
+                break
+
+            by_owner = {}
+            for pk, owner_id in rows:
+                by_owner.setdefault(owner_id, []).append(pk)
+            for owner_id, ids in by_owner.items():
+                count, size = self.purge(owner_id, expired.filter(pk__in=ids))
+                deleted_count += count
+                freed += size
+        return deleted_count, freed
+
+
+# 单例实例
+trash_service = TrashService()
@@ -0,0 +1,166 @@
+"""
+分片上传服务
+
+断点续传会话的分片存储与合并：
+- Swift：分片直接写入 {container}_segments 容器，合并时提交 SLO 清单，数据不再搬运
+- 本地存储：分片写入临时目录，合并时按顺序拼接
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+
+from .swift_service import swift_service
+from .local_service import local_service
+
+
+class ChunkedUploadService:
+    """分片上传服务类"""
+
+    def __init__(self):
+        self._swift = swift_service
+        self._local = local_service
+
+    def _get_config(self):
+        """获取分片上传配置"""
+        return getattr(settings, 'CHUNKED_UPLOAD_CONFIG', {})
+
+    @property
+    def default_chunk_size(self):
+        """默认分片大小"""
+        return self._get_config().get('CHUNK_SIZE', 8 * 1024 * 1024)
+
+    @property
+    def min_chunk_size(self):
+        """最小分片大小"""
+        return self._get_config().get('MIN_CHUNK_SIZE', 1024 * 1024)
+
+    @property
+    def max_chunk_size(self):
+        """最大分片大小"""
+        return self._get_config().get('MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+
+    @property
+    def session_ttl(self):
+        """会话有效期（秒），每收到一个分片顺延"""
+        return self._get_config().get('SESSION_TTL_SECONDS', 24 * 60 * 60)
+
+    def get_container_name(self, user_id):
+        """用户文件容器"""
+        return f"user_{user_id}_files"
+
+    def get_chunk_container(self, user_id):
+        """分片所在容器（与 SLO 分段容器相同）"""
+        return f"{self.get_container_name(user_id)}_segments"
+
+    def get_chunk_object(self, session, index):
+        """分片对象名"""
+        return f"uploads/{session.id}/{index:08d}"
+
+    def choose_backend(self, user_id):
+        """选择会话使用的存储后端，Swift 不可用时使用本地存储
+
+        Returns:
+            str or None: 'swift'、'local'，都不可用时返回 None
+        """
+        if self._swift.is_available and self._swift.create_container(self.get_chunk_container(user_id)):
+            return 'swift'
+        if self._local.is_enabled:
+            return 'local'
+        return None
+
+    def store_chunk(self, session, index, stream, length):
+        """保存一个分片，同一分片重复上传时覆盖
+
+        Args:
+            session: 上传会话
+            index: 分片序号
+            stream: 可读对象
+            length: 分片长度（字节）
+
+        Returns:
+            tuple: (success, etag or error_message)
+        """
+        if session.backend == 'swift':
+            return self._swift.put_stream(
+                stream,
+                self.get_chunk_container(session.owner_id),
+                self.get_chunk_object(session, index),
+                length
+            )
+
+        success, error = self._local.save_chunk(stream, session.id, index, length)
+        return success, ('' if success else error)
+
+    def assemble(self, session, chunks):
+        """合并全部分片为最终文件
+
+        Args:
+            session: 上传会话
+            chunks: 按序号排序的分片记录
+
+        Returns:
+            tuple: (success, (storage_location, sha256) or error_message)
+                   storage_location 包含 swift_container、swift_object、local_path；
+                   本地存储在拼接时计算 SHA-256，Swift 由服务端合并，数据不经过本机，sha256 为 None
+        """
+        if session.backend == 'local':
+            hasher = hashlib.sha256()
+            success, result = self._local.assemble_chunks(
+                session.id, len(chunks), session.owner_id, session.file_name, hasher=hasher
+            )
+            if not success:
+                return False, result
+            location = {'swift_container': None, 'swift_object': None, 'local_path': result}
+            return True, (location, hasher.hexdigest())
+
+        container_name = self.get_container_name(session.owner_id)
+        chunk_container = self.get_chunk_container(session.owner_id)
+        object_name = f"{session.owner_id}/{uuid.uuid4()}/{session.file_name}"
+
+        if len(chunks) == 1:
+            # 单个分片在服务端复制为普通对象，避免只有一个分段的清单
+            chunk_object = self.get_chunk_object(session, 0)
+            success, message = self._swift.copy_object(
+                chunk_container, chunk_object, container_name, object_name, chunks[0].size
+            )
+            if not success:
+                return False, message
+            self._swift.delete_file(chunk_container, chunk_object, chunks[0].size)
+        else:
+            segments = [
+                {
+                    'path': f'/{chunk_container}/{self.get_chunk_object(session, chunk.index)}',
+                    'etag': chunk.etag or None,
+                    'size_bytes': chunk.size,
+                }
+                for chunk in chunks
+            ]
+            self._swift.create_container(container_name)
+            success, message = self._swift.put_manifest(container_name, object_name, segments)
+            if not success:
+                return False, message
+
+        location = {'swift_container': container_name, 'swift_object': object_name, 'local_path': None}
+        return True, (location, None)
+
+    def discard(self, session, chunks=None):
+        """删除会话已上传的分片
+
+        Args:
+            session: 上传会话
+            chunks: 分片记录（可选，默认查询全部）
+        """
+        if session.backend == 'local':
+            self._local.delete_chunks(session.id)
+            return
+
+        if chunks is None:
+            chunks = session.chunks.all()
+        chunk_container = self.get_chunk_container(session.owner_id)
+        for chunk in chunks:
+            self._swift.delete_file(chunk_container, self.get_chunk_object(session, chunk.index), chunk.size)
+
+
+# 单例实例
+upload_service = ChunkedUploadService()
@@ -0,0 +1,165 @@
+"""
+Celery 任务
+
+每个任务以 Job ID 为参数，状态和进度记录在 Job 中（见 files/jobs.py）；
+任务都可以重复执行，worker 异常退出后重新投递不会重复删除或重复创建文件
+"""
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+
+from accounts.models import User
+from . import maintenance
+from .counters import flush_download_counters as flush_counters
+from .jobs import JobError, create_job, finish_job, run_job
+from .models import File, Folder, Job
+from .quota import reconcile_storage, release_reservation
+from .services.blob_service import blob_service
+from .services.trash_service import trash_service
+from .utils import copy_file_storage
+
+
+def _purge_trash(job, progress):
+    """彻底删除回收站文件，params.ids 为空时清空整个回收站"""
+    files = File.objects.all()
+    if job.params.get('ids'):
+        files = files.filter(pk__in=job.params['ids'])
+
+    count, total_size = trash_service.purge_in_batches(job.owner_id, files, progress=progress)
+    return {'deleted_count': count, 'freed_space': total_size}
+
+
+@shared_task(name='files.purge_trash')
+def purge_trash(job_id):
+    """彻底删除回收站文件（已删除的文件不会再次处理）"""
+    run_job(job_id, _purge_trash)
+
+
+def _save_shared_file(job, progress):
+    """在存储服务端复制分享的文件并创建文件记录
+
+    存储空间在提交任务时已预留（params.reserved），失败时归还；
+    文件记录与任务完成状态在同一事务中提交，重新执行时不会重复创建
+    """
+    params = job.params
+    reserved = params.get('reserved', 0)
+    copied_location = None
+    try:
+        source = File.objects.filter(pk=params['file_id']).first()
+        if source is None:
+            raise JobError('源文件已被删除')
+        folder = None
+        if params.get('folder_id'):
+            folder = Folder.objects.filter(pk=params['folder_id'], owner_id=job.owner_id).first()
+            if folder is None:
+                raise JobError('目标文件夹不存在')
+
+        success, result = copy_file_storage(source, job.owner_id)
+        if not success:
+            raise JobError(f'无法复制文件内容: {result}')
+        copied_location = result
+
+        with transaction.atomic():
+            blob, _ = blob_service.register(None, source.size, copied_location)
+            new_file = File.objects.create(
+                name=source.original_name,
+                original_name=source.original_name,
+                folder=folder,
+                owner_id=job.owner_id,
+                size=source.size,
+                file_type=source.file_type,
+                mime_type=source.mime_type,
+                blob=blob,
+                download_count=0,
+                **blob.location
+            )
+            result = {'file_id': str(new_file.id), 'name': new_file.name}
+            finished = finish_job(job, result=result)
+            if not finished:
+                # 任务已被同时执行的另一次投递完成，撤销本次创建的记录
+                transaction.set_rollback(True)
+    except Exception:
+        if copied_location is not None:
+            blob_service.delete_content(copied_location, source.size)
+        release_reservation(job.owner_id, reserved)
+        raise
+
+    if not finished:
+        blob_service.delete_content(copied_location, source.size)
+    return result
+
+
+@shared_task(name='files.save_shared_file')
+def save_shared_file(job_id):
+    """保存分享的文件（需要在存储服务端复制内容的早期文件）"""
+    run_job(job_id, _save_shared_file)
+
+
+def _sync_storage(job, progress):
+    """按主键顺序分批校正用户的存储使用量"""
+    params = job.params
+    users = User.objects.all()
+    if params.get('start_id') is not None:
+        users = users.filter(pk__gte=params['start_id'])
+    if params.get('end_id') is not None:
+        users = users.filter(pk__lte=params['end_id'])
+
+    batch_size = params.get('batch_size') or getattr(settings, 'JOB_CONFIG', {}).get('SYNC_BATCH_SIZE', 1000)
+    dry_run = params.get('dry_run', False)
+    total = users.count()
+    checked_count = changed_count = updated_count = 0
+    last_id = None
+    while True:
+        batch = users.order_by('pk')
+        if last_id is not None:
+            batch = batch.filter(pk__gt=last_id)
+        ids = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        changes, updated = reconcile_storage(users.filter(pk__gte=ids[0], pk__lte=ids[-1]), dry_run=dry_run)
+        checked_count += len(ids)
+        changed_count += len(changes)
+        updated_count += updated
+        last_id = ids[-1]
+        progress(checked_count, max(total, checked_count))
+
+    return {
+        'checked_count': checked_count,
+        'changed_count': changed_count,
+        'updated_count': updated_count,
+        'dry_run': dry_run,
+    }
+
+
+@shared_task(name='files.sync_storage')
+def sync_storage(job_id):
+    """校正用户的存储使用量（按实际数据重新计算，可重复执行）"""
+    run_job(job_id, _sync_storage)
+
+
+def _run_maintenance(job, progress):
+    """执行定期维护，结果为各步骤的统计"""
+    metrics = maintenance.run_maintenance()
+    if metrics is None:
+        return {'skipped': '其他进程正在执行维护'}
+    return metrics
+
+
+@shared_task(name='files.run_maintenance')
+def run_maintenance():
+    """定期维护（由 beat 定时触发），每次执行的统计保存在 Job.result 中"""
+    job = create_job(None, Job.KIND_MAINTENANCE)
+    run_job(job.id, _run_maintenance)
+
+
+@shared_task(name='files.flush_download_counters')
+def flush_download_counters():
+    """把缓存中累加的下载次数写入数据库"""
+    if getattr(settings, 'DOWNLOAD_COUNTER_CONFIG', {}).get('BUFFERED', False):
+        flush_counters()
+
+
+@shared_task(name='files.hash_blob')
+def hash_blob(blob_id):
+    """计算服务端合并的分片上传内容的 SHA-256 并登记（已有相同内容时合并为一份）"""
+    blob_service.hash_content(blob_id)
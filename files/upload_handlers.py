@@ -0,0 +1,250 @@
+"""
+流式上传处理器
+
+multipart 请求中的文件边接收边写入存储后端，不在内存或临时文件中缓存整个文件；
+同一遍数据中计算大小、SHA-256 并检测 MIME 类型
+"""
+import hashlib
+import queue
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from .services.swift_service import swift_service
+from .services.local_service import local_service
+from .services.blob_service import blob_service
+from . import utils
+from .quota import reserve_storage
+
+# 用于检测 MIME 类型的文件头长度
+SNIFF_LENGTH = 1024
+
+
+class StreamedUploadedFile(UploadedFile):
+    """已直接写入存储后端的上传文件
+
+    内容不在本地，只携带存储位置和上传过程中计算的信息
+    """
+
+    def __init__(self, name, content_type, size, sha256, location, error=None):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.sha256 = sha256
+        self.location = location
+        self.error = error
+
+    def discard(self):
+        """删除已写入的内容（请求校验失败等情况）"""
+        if self.location is not None:
+            blob_service.delete_content(self.location, self.size)
+            self.location = None
+
+
+class _AbortUpload(Exception):
+    """上传被中断"""
+
+
+class _SwiftWriter:
+    """在后台线程中把数据写入 Swift
+
+    接收线程和上传线程之间是长度为 QUEUE_SIZE 的有界队列（默认 2，即双缓冲），
+    网络接收与向 Swift 发送同时进行，内存占用与文件大小无关
+    """
+
+    _EOF = object()
+    _ABORT = object()
+
+    def __init__(self, container_name, object_name, expected_size):
+        self.location = {'swift_container': container_name, 'swift_object': object_name, 'local_path': None}
+        self.error = None
+        config = getattr(settings, 'STREAMING_UPLOAD_CONFIG', {})
+        self._queue = queue.Queue(maxsize=config.get('QUEUE_SIZE', 2))
+        self._thread = threading.Thread(
+            target=self._run, args=(container_name, object_name, expected_size), daemon=True
+        )
+        self._thread.start()
+
+    def _chunks(self):
+        while True:
+            data = self._queue.get()
+            if data is self._EOF:
+                return
+            if data is self._ABORT:
+                # 让进行中的请求失败，Swift 不会保存不完整的对象
+                raise _AbortUpload()
+            yield data
+
+    def _run(self, container_name, object_name, expected_size):
+        success, message = swift_service.upload_iter(
+            self._chunks(), container_name, object_name, expected_size
+        )
+        if not success:
+            self.error = message
+
+    def _put(self, item):
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        # 上传线程已失败时丢弃剩余数据，请求体仍需读完
+        if self.error is None:
+            self._put(data)
+
+    def close(self):
+        self._put(self._EOF)
+        self._thread.join()
+        return self.error is None
+
+    def abort(self):
+        self._put(self._ABORT)
+        self._thread.join()
+
+
+class _LocalWriter:
+    """直接写入本地存储"""
+
+    def __init__(self, user_id, filename):
+        path, self._file = local_service.open_new_file(user_id, filename)
+        self.location = {'swift_container': None, 'swift_object': None, 'local_path': path}
+        self.error = None
+
+    def write(self, data):
+        if self.error is None:
+            try:
+                self._file.write(data)
+            except Exception as e:
+                self.error = str(e)
+
+    def close(self):
+        self._file.close()
+        if self.error is not None:
+            local_service.delete_file(self.location['local_path'])
+            return False
+        return True
+
+    def abort(self):
+        self._file.close()
+        local_service.delete_file(self.location['local_path'])
+
+
+class StreamingStorageUploadHandler(FileUploadHandler):
+    """把名为 file 的上传字段直接写入存储后端
+
+    Swift 可用时写入 Swift，否则写入本地存储；两者都不可用或用户未登录时交给默认处理器
+    """
+
+    field_name_to_stream = 'file'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self._body_length = None
+        self._writer = None
+        self._hasher = None
+        self._head = b''
+        self._size = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # 请求体长度（略大于文件大小），用于判断是否分段上传
+        self._body_length = content_length
+
+        # 读取请求体之前原子地预留 Content-Length 减去 multipart 开销的空间，
+        # 并发上传之间不会超出配额，空间不足时不再接收；视图按实际大小调整预留
+        user = getattr(self.request, 'user', None)
+        if user and user.is_authenticated and content_length:
+            allowance = getattr(settings, 'STREAMING_UPLOAD_CONFIG', {}).get('MULTIPART_ALLOWANCE', 64 * 1024)
+            min_file_size = content_length - allowance
+            if min_file_size > 0:
+                reservation = reserve_storage(user, min_file_size)
+                if reservation is None:
+                    self.request.upload_quota_rejected = min_file_size
+                    return QueryDict(), MultiValueDict()
+                self.request.upload_quota_reservation = reservation
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self._writer = None
+
+        user = getattr(self.request, 'user', None)
+        if field_name != self.field_name_to_stream or not (user and user.is_authenticated):
+            return
+
+        container_name = f"user_{user.id}_files"
+        if swift_service.is_available and swift_service.create_container(container_name):
+            object_name = f"{user.id}/{uuid.uuid4()}/{file_name}"
+            self._writer = _SwiftWriter(container_name, object_name, self._body_length)
+        elif local_service.is_enabled:
+            self._writer = _LocalWriter(user.id, file_name)
+        else:
+            return
+
+        self._hasher = hashlib.sha256()
+        self._head = b''
+        self._size = 0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._writer is None:
+            return raw_data
+
+        self._hasher.update(raw_data)
+        self._size += len(raw_data)
+        if len(self._head) < SNIFF_LENGTH:
+            self._head += raw_data[:SNIFF_LENGTH - len(self._head)]
+        self._writer.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._writer is None:
+            return None
+
+        writer, self._writer = self._writer, None
+        completed = writer.close()
+
+        content_type = self.content_type
+        if utils.magic:
+            content_type = utils.get_file_mime_type(self.file_name, content=self._head)
+
+        return StreamedUploadedFile(
+            name=self.file_name,
+            content_type=content_type,
+            size=self._size,
+            sha256=self._hasher.hexdigest() if completed else None,
+            location=writer.location if completed else None,
+            error=writer.error,
+        )
+
+    def upload_interrupted(self):
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            writer.abort()
+
+
+def streaming_upload(view):
+    """在请求体被解析之前安装流式上传处理器
+
+    放在 @api_view 外层使用；DRF 认证后会把用户写回 Django 请求，处理器据此确定存储位置。
+    处理器预留的配额保存在 request.upload_quota_reservation，
+    空间不足时 request.upload_quota_rejected 为估计的文件大小，请求体不会被读取
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, StreamingStorageUploadHandler(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            # 视图未确认（如认证失败、异常）的配额预留一律归还
+            reservation = getattr(request, 'upload_quota_reservation', None)
+            if reservation is not None:
+                reservation.release()
+    return wrapper
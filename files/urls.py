@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import (
     # 文件夹
-    folder_list, create_folder, delete_folder,
+    folder_list, folder_tree, create_folder, delete_folder,
     # 文件
-    file_list, file_detail, upload_file, delete_file,
+    file_list, file_detail, upload_file, instant_upload, delete_file,
+    # 分片上传
+    create_upload_session, upload_session_detail, upload_chunk, complete_upload_session,
     # 下载
     download_file, get_download_url, temp_download_shared_file,
     download_shared_file_temp, download_temp_file,
@@ -12,19 +14,31 @@ from .views import (
     get_share_info, verify_share_password, download_shared_file, save_shared_file,
     # 回收站
     trash_list, trash_stats, restore_file, permanent_delete_file, empty_trash,
+    bulk_trash,
     # 存储
     storage_info,
+    # 后台任务
+    job_list, job_detail,
 )
 
 urlpatterns = [
     # 文件夹相关
     path('folders/', folder_list, name='folder_list'),
+    path('folders/tree/', folder_tree, name='folder_tree'),
     path('folders/create/', create_folder, name='create_folder'),
     path('folders/<uuid:folder_id>/delete/', delete_folder, name='delete_folder'),
     
     # 文件相关
     path('', file_list, name='file_list'),
     path('upload/', upload_file, name='upload_file'),
+    path('upload/instant/', instant_upload, name='instant_upload'),
+    
+    # 分片上传（断点续传）
+    path('uploads/', create_upload_session, name='create_upload_session'),
+    path('uploads/<uuid:session_id>/', upload_session_detail, name='upload_session_detail'),
+    path('uploads/<uuid:session_id>/chunks/', upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:session_id>/complete/', complete_upload_session, name='complete_upload_session'),
+    
     path('<uuid:file_id>/', file_detail, name='file_detail'),
     path('<uuid:file_id>/delete/', delete_file, name='delete_file'),
     path('<uuid:file_id>/download/', download_file, name='download_file'),
@@ -34,6 +48,7 @@ urlpatterns = [
     path('trash/', trash_list, name='trash_list'),
     path('trash/stats/', trash_stats, name='trash_stats'),
     path('trash/empty/', empty_trash, name='empty_trash'),
+    path('trash/bulk/', bulk_trash, name='bulk_trash'),
     path('trash/<uuid:file_id>/restore/', restore_file, name='restore_file'),
     path('trash/<uuid:file_id>/delete/', permanent_delete_file, name='permanent_delete_file'),
     
@@ -52,4 +67,8 @@ urlpatterns = [
     
     # 存储信息
     path('storage/', storage_info, name='storage_info'),
+    
+    # 后台任务
+    path('jobs/', job_list, name='job_list'),
+    path('jobs/<uuid:job_id>/', job_detail, name='job_detail'),
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import uuid
 import hashlib
 try:
     import magic
@@ -7,122 +8,99 @@ except ImportError:
 from swiftclient.service import SwiftService, SwiftUploadObject
 from swiftclient.exceptions import ClientException
 from django.conf import settings
+from django.db import transaction
 from django.core.files.uploadedfile import UploadedFile
 
+from .services.swift_service import swift_service
+from .services.local_service import local_service
+from .services.blob_service import blob_service
+
 
 def get_swift_connection():
-    """获取Swift连接"""
-    swift_config = settings.SWIFT_CONFIG
-    
-    # 使用基础Connection而不是SwiftService
-    from swiftclient import Connection
-    return Connection(
-        authurl=swift_config['auth_url'],
-        user=swift_config['username'],
-        key=swift_config['password'],
-        tenant_name=swift_config['project_name'],
-        auth_version=swift_config['auth_version'],
-        os_options={
-            'project_domain_id': swift_config['project_domain_id'],
-            'user_domain_id': swift_config['user_domain_id'],
-            'region_name': swift_config['region_name'],
-        }
-    )
+    """获取Swift连接（复用连接池缓存的令牌）"""
+    return swift_service.get_connection()
 
 
 def create_container_if_not_exists(container_name):
     """创建容器（如果不存在）"""
-    try:
-        swift = get_swift_connection()
-        # 尝试获取容器信息，如果不存在会抛出异常
-        swift.head_container(container_name)
-        return True
-    except Exception:
-        # 容器不存在，创建容器
-        try:
-            swift.put_container(container_name)
-            return True
-        except Exception:
-            return False
+    return swift_service.create_container(container_name)
 
 
 def upload_file_to_swift(file_obj, container_name, object_name=None):
     """上传文件到Swift"""
-    if object_name is None:
-        object_name = file_obj.name
+    return swift_service.upload_file(file_obj, container_name, object_name)
+
+
+def delete_file_from_swift(container_name, object_name, size=None):
+    """从Swift删除文件（分段上传的大文件连同分段一起删除）"""
+    return swift_service.delete_file(container_name, object_name, size)
+
+
+def copy_file_storage(file_obj, user_id):
+    """在存储服务端复制文件内容到指定用户名下，数据不经过应用服务器
     
-    # 确保容器存在
-    create_container_if_not_exists(container_name)
+    Args:
+        file_obj: 源文件记录
+        user_id: 目标用户 ID
     
-    try:
-        swift = get_swift_connection()
-        
-        # 直接上传文件
-        swift.put_object(
-            container_name,
-            object_name,
-            contents=file_obj
+    Returns:
+        tuple: (success, storage_location or error_message)
+               storage_location 包含 swift_container、swift_object、local_path
+    """
+    if file_obj.swift_container and file_obj.swift_object:
+        container_name = f"user_{user_id}_files"
+        object_name = f"{user_id}/{uuid.uuid4()}/{file_obj.original_name}"
+        success, result = swift_service.copy_object(
+            file_obj.swift_container, file_obj.swift_object, container_name, object_name, file_obj.size
         )
-        
-        return True, "Upload successful"
-                
-    except Exception as e:
-        return False, str(e)
-
-
-def delete_file_from_swift(container_name, object_name):
-    """从Swift删除文件"""
-    try:
-        swift = get_swift_connection()
-        swift.delete_object(container_name, object_name)
-        return True
-    except Exception as e:
-        return False, str(e)
+        if not success:
+            return False, result
+        return True, {'swift_container': container_name, 'swift_object': object_name, 'local_path': None}
+    
+    if file_obj.local_path:
+        success, result = local_service.copy_file(file_obj.local_path, user_id, file_obj.original_name)
+        if not success:
+            return False, result
+        return True, {'swift_container': None, 'swift_object': None, 'local_path': result}
+    
+    return False, "文件没有可用的存储位置"
 
 
-def download_file_from_swift(container_name, object_name):
-    """从Swift下载文件"""
-    try:
-        swift = get_swift_connection()
-        
-        # 执行下载
-        headers, file_content = swift.get_object(container_name, object_name)
-        
-        # 返回文件内容和头信息
-        return True, (file_content, headers)
-                
-    except Exception as e:
-        return False, str(e)
+def release_file_storage(file_obj):
+    """释放已删除文件记录占用的存储
+    
+    共享内容只减少引用数，最后一个引用释放时才删除对象；没有 blob 的旧数据直接删除对象
+    """
+    if file_obj.blob_id:
+        blob_service.release(file_obj.blob_id)
+        return
+    
+    location = {
+        'swift_container': file_obj.swift_container,
+        'swift_object': file_obj.swift_object,
+        'local_path': file_obj.local_path,
+    }
+    size = file_obj.size
+    transaction.on_commit(lambda: blob_service.delete_content(location, size))
 
 
-def download_file_from_local(file_obj):
-    """从本地存储下载文件（Swift的备用方案）"""
-    try:
-        import os
-        from pathlib import Path
-        
-        # 构建本地文件路径
-        user_dir = Path(settings.LOCAL_STORAGE_PATH) / str(file_obj.owner.id)
-        file_path = user_dir / file_obj.swift_object
-        
-        # 检查文件是否存在
-        if not file_path.exists():
-            return False, f"本地文件不存在: {file_path}"
-        
-        # 读取文件内容
-        with open(file_path, 'rb') as f:
-            file_content = f.read()
-        
-        # 创建简单的头信息
-        headers = {
-            'Content-Length': str(len(file_content)),
-            'Content-Type': file_obj.mime_type,
-        }
-        
-        return True, (file_content, headers)
-        
-    except Exception as e:
-        return False, str(e)
+def open_file_stream(file_obj, byte_range=None):
+    """打开文件的读取流（Swift 优先，其次本地存储）
+    
+    Args:
+        file_obj: 文件记录
+        byte_range: 字节范围 (start, end)，闭区间（可选）
+    
+    Returns:
+        tuple: (success, (stream, headers) or error_message)
+    """
+    if file_obj.swift_container and file_obj.swift_object:
+        return swift_service.open_stream(
+            file_obj.swift_container, file_obj.swift_object, byte_range=byte_range
+        )
+    if file_obj.local_path:
+        return local_service.open_stream(file_obj.local_path, byte_range=byte_range)
+    return False, "文件没有可用的存储位置"
 
 
 def upload_file_to_local(uploaded_file, user_id, filename):
@@ -147,49 +125,28 @@ def upload_file_to_local(uploaded_file, user_id, filename):
         return False, str(e)
 
 
-def get_swift_temp_url(container_name, object_name, expires_in=3600):
-    """获取Swift临时URL"""
-    try:
-        # 检查Swift服务是否可用
-        swift = get_swift_connection()
-        
-        # 尝试列出容器来验证连接
-        connection_ok = False
-        for result in swift.list():
-            if result.get('success', True):  # 如果没有错误，认为连接正常
-                connection_ok = True
-                break
-        
-        if not connection_ok:
-            return None
-            
-        # 从Swift配置获取基础URL
-        swift_config = settings.SWIFT_CONFIG
-        auth_url = swift_config['auth_url']
-        
-        # 构建Swift对象存储的URL
-        # 通常格式为: http://<swift-host>:<port>/v1/AUTH_<tenant-id>/<container>/<object>
-        # 这里我们使用一个简化的方法，直接从auth_url推断
-        if '/identity' in auth_url:
-            base_url = auth_url.replace('/identity', '')
-        else:
-            base_url = auth_url.rstrip('/')
-        
-        # 添加Swift API路径
-        swift_url = f"{base_url}/v1/AUTH_admin/{container_name}/{object_name}"
-        
-        # 由于临时URL需要密钥配置，这里先返回直接URL
-        # 在生产环境中，应该配置TempURL密钥并生成签名
-        return swift_url
-        
-    except Exception as e:
-        print(f"Error generating Swift temp URL: {e}")
-        return None
+def get_swift_temp_url(container_name, object_name, expires_in=3600, ip_range=None, filename=None):
+    """获取Swift临时URL（本地计算 HMAC 签名）"""
+    return swift_service.get_temp_url(
+        container_name, object_name, expires_in, ip_range=ip_range, filename=filename
+    )
 
 
-def get_file_mime_type(file_obj):
-    """获取文件MIME类型"""
-    if isinstance(file_obj, UploadedFile) and magic:
+def get_file_mime_type(file_obj, content=None):
+    """获取文件MIME类型
+    
+    Args:
+        file_obj: 上传的文件或文件名
+        content: 文件开头的内容（可选，已读取时直接用于检测）
+    """
+    if content is not None and magic:
+        try:
+            mime_type = magic.from_buffer(content[:1024], mime=True)
+            if mime_type:
+                return mime_type
+        except Exception:
+            pass
+    elif isinstance(file_obj, UploadedFile) and magic:
         # 对于上传的文件，尝试从内容检测
         content = file_obj.read(1024)
         file_obj.seek(0)
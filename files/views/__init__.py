@@ -4,14 +4,17 @@ Files 应用视图模块
 按功能拆分为多个子模块：
 - folder: 文件夹操作
 - file: 文件基础操作（上传、列表、详情、删除）
+- upload: 分片上传（断点续传）
 - download: 下载相关
 - share: 分享相关
 - trash: 回收站
 - storage: 存储信息
+- jobs: 后台任务
 """
 
 from .folder import (
     folder_list,
+    folder_tree,
     create_folder,
     delete_folder,
 )
@@ -20,9 +23,17 @@ from .file import (
     file_list,
     file_detail,
     upload_file,
+    instant_upload,
     delete_file,
 )
 
+from .upload import (
+    create_upload_session,
+    upload_session_detail,
+    upload_chunk,
+    complete_upload_session,
+)
+
 from .download import (
     download_file,
     get_download_url,
@@ -48,22 +59,35 @@ from .trash import (
     restore_file,
     permanent_delete_file,
     empty_trash,
+    bulk_trash,
 )
 
 from .storage import (
     storage_info,
 )
 
+from .jobs import (
+    job_list,
+    job_detail,
+)
+
 __all__ = [
     # 文件夹
     'folder_list',
+    'folder_tree',
     'create_folder',
     'delete_folder',
     # 文件
     'file_list',
     'file_detail',
     'upload_file',
+    'instant_upload',
     'delete_file',
+    # 分片上传
+    'create_upload_session',
+    'upload_session_detail',
+    'upload_chunk',
+    'complete_upload_session',
     # 下载
     'download_file',
     'get_download_url',
@@ -85,6 +109,10 @@ __all__ = [
     'restore_file',
     'permanent_delete_file',
     'empty_trash',
+    'bulk_trash',
     # 存储
     'storage_info',
+    # 后台任务
+    'job_list',
+    'job_detail',
 ]
@@ -2,15 +2,16 @@
 下载相关视图
 """
 import os
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from ..models import File, FileShare
-from ..utils import download_file_from_swift
+from ..counters import record_download
+from .helpers import serve_file, counts_as_download, build_temp_file_response, get_client_ip
 
 
 @api_view(['GET'])
@@ -20,40 +21,15 @@ def download_file(request, file_id):
     file_obj = get_object_or_404(File, id=file_id, owner=request.user)
     
     try:
-        # 从Swift下载文件
-        success, result = download_file_from_swift(file_obj.swift_container, file_obj.swift_object)
+        # 按块输出文件，支持 Range 断点续传和拖动播放
+        success, result = serve_file(request, file_obj)
         
         if success:
             # 更新下载次数
-            file_obj.download_count += 1
-            file_obj.save()
+            if counts_as_download(request, file_obj, result):
+                record_download('file', file_obj.pk)
             
-            # 获取文件内容
-            file_content, headers = result
-            
-            # 对于二进制文件，使用HttpResponse
-            if file_obj.mime_type.startswith(('image/', 'video/', 'audio/', 'application/')):
-                response = HttpResponse(
-                    file_content,
-                    content_type=file_obj.mime_type
-                )
-            else:
-                response = StreamingHttpResponse(
-                    file_content,
-                    content_type=file_obj.mime_type
-                )
-            
-            # 设置下载头
-            response['Content-Disposition'] = f'attachment; filename="{file_obj.original_name}"'
-            response['Content-Length'] = file_obj.size
-            
-            # 复制其他必要的头信息
-            if headers:
-                for key, value in headers.items():
-                    if key.lower() not in ['content-disposition', 'content-type', 'content-length']:
-                        response[key] = value
-            
-            return response
+            return result
         else:
             return Response({
                 'error': f'Swift下载失败: {result}。请检查Swift服务状态。'
@@ -72,12 +48,12 @@ def get_download_url(request, file_id):
     file_obj = get_object_or_404(File, id=file_id, owner=request.user)
     
     try:
-        # 生成临时下载URL
-        temp_url = file_obj.get_swift_url()
+        # 生成临时下载URL（本地签名，可限制为请求方 IP）
+        ip_range = get_client_ip(request) if getattr(settings, 'SWIFT_TEMP_URL_BIND_IP', False) else None
+        temp_url = file_obj.get_swift_url(ip_range=ip_range)
         if temp_url:
             # 更新下载次数
-            file_obj.download_count += 1
-            file_obj.save()
+            record_download('file', file_obj.pk)
             
             return Response({
                 'download_url': temp_url,
@@ -115,36 +91,21 @@ def temp_download_shared_file(request, share_code, filename):
                 'error': '下载链接已过期'
             }, status=status.HTTP_410_GONE)
         
-        # 读取文件内容
-        with open(temp_file_path, 'rb') as f:
-            file_content = f.read()
+        # 获取分享信息
+        share = get_object_or_404(FileShare, share_code=share_code)
         
-        # 删除临时文件
-        os.unlink(temp_file_path)
+        # 由 FileResponse 发送文件内容并删除临时文件
+        response = build_temp_file_response(
+            temp_file_path,
+            share.file.mime_type or 'application/octet-stream',
+            share.file.original_name
+        )
         
         # 清理session
         if f'temp_file_{share_code}' in request.session:
             del request.session[f'temp_file_{share_code}']
             request.session.save()
         
-        # 获取分享信息
-        share = get_object_or_404(FileShare, share_code=share_code)
-        
-        # 创建响应
-        if share.file.mime_type.startswith(('image/', 'video/', 'audio/', 'application/')):
-            response = HttpResponse(
-                file_content,
-                content_type=share.file.mime_type
-            )
-        else:
-            response = StreamingHttpResponse(
-                file_content,
-                content_type=share.file.mime_type
-            )
-        
-        response['Content-Disposition'] = f'attachment; filename="{share.file.original_name}"'
-        response['Content-Length'] = share.file.size
-        
         return response
         
     except Exception as e:
@@ -177,24 +138,13 @@ def download_shared_file_temp(request, share_code):
             is_active=True
         )
         
-        # 读取文件内容
-        with open(temp_file_path, 'rb') as f:
-            file_content = f.read()
-        
-        # 删除临时文件
-        os.unlink(temp_file_path)
-        
-        # 返回文件响应
-        response = HttpResponse(
-            file_content,
-            content_type=share.file.mime_type
+        # 由 FileResponse 发送文件内容并删除临时文件
+        return build_temp_file_response(
+            temp_file_path,
+            share.file.mime_type,
+            share.file.original_name
         )
         
-        response['Content-Disposition'] = f'attachment; filename="{share.file.original_name}"'
-        response['Content-Length'] = len(file_content)
-        
-        return response
-        
     except (FileShare.DoesNotExist, FileNotFoundError):
         from django.http import Http404
         raise Http404('文件不存在')
@@ -214,18 +164,14 @@ def download_temp_file(request, filename):
     temp_file_path = request.session[temp_file_key]
     
     try:
-        # 读取文件
-        with open(temp_file_path, 'rb') as f:
-            content = f.read()
-        
-        # 删除临时文件
-        os.unlink(temp_file_path)
+        # 由 FileResponse 发送文件内容并删除临时文件
+        response = build_temp_file_response(
+            temp_file_path,
+            'application/octet-stream',
+            request.GET.get("filename", "download")
+        )
         del request.session[temp_file_key]
         
-        # 创建响应
-        response = HttpResponse(content, content_type='application/octet-stream')
-        response['Content-Disposition'] = f'attachment; filename="{request.GET.get("filename", "download")}"'
-        
         return response
         
     except Exception as e:
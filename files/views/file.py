@@ -5,6 +5,7 @@ import os
 import uuid
 
 from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.utils import timezone
@@ -12,12 +13,16 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from ..models import Folder, File
-from ..serializers import FileSerializer, UploadFileSerializer
-from ..utils import upload_file_to_swift, upload_file_to_local
+from ..pagination import KeysetPagination
+from ..serializers import FileSerializer, UploadFileSerializer, InstantUploadSerializer
+from ..utils import upload_file_to_swift, upload_file_to_local, get_file_mime_type
+from ..services.blob_service import blob_service, HashingReader
+from ..upload_handlers import StreamedUploadedFile, streaming_upload
+from ..quota import reserve_storage
+from .helpers import quota_exceeded_response
 
 
 @api_view(['GET'])
@@ -25,16 +30,18 @@ from ..utils import upload_file_to_swift, upload_file_to_local
 def file_list(request):
     """获取文件列表"""
     folder_id = request.GET.get('folder_id')
-    files = File.objects.filter(owner=request.user, is_deleted=False)
+    files = File.objects.filter(owner=request.user, is_deleted=False).select_related('folder')
     
     if folder_id:
         files = files.filter(folder_id=folder_id)
     else:
         files = files.filter(folder__isnull=True)
     
-    # 分页
-    paginator = PageNumberPagination()
-    paginator.page_size = 20
+    # 游标分页，总数按文件夹缓存
+    paginator = KeysetPagination(
+        ordering=('-created_at', 'id'),
+        count_cache_key=f'file_list_count:{request.user.id}:{folder_id or "root"}'
+    )
     result_page = paginator.paginate_queryset(files, request)
     serializer = FileSerializer(result_page, many=True)
     return paginator.get_paginated_response(serializer.data)
@@ -49,55 +56,120 @@ def file_detail(request, file_id):
     return Response(serializer.data)
 
 
+def _discard_upload(uploaded_file):
+    """请求未能完成时删除已写入存储的上传内容"""
+    if isinstance(uploaded_file, StreamedUploadedFile):
+        uploaded_file.discard()
+
+
+def _store_uploaded_file(uploaded_file, user_id):
+    """把已接收的上传文件写入存储（Swift 优先，失败时使用本地存储）
+    
+    Returns:
+        tuple: (storage_location, sha256)，失败时为 (None, 错误响应)
+    """
+    # 生成Swift对象名
+    object_name = f"{user_id}/{uuid.uuid4()}/{uploaded_file.name}"
+    container_name = f"user_{user_id}_files"
+    
+    # 上传的同时计算内容哈希，用于去重
+    reader = HashingReader(uploaded_file)
+    
+    # 尝试上传到Swift，如果失败则使用本地存储
+    swift_success, swift_result = upload_file_to_swift(reader, container_name, object_name)
+    
+    if swift_success:
+        return {
+            'swift_container': container_name,
+            'swift_object': object_name,
+            'local_path': None,
+        }, reader.hexdigest()
+    
+    # Swift失败，尝试本地存储
+    if not getattr(settings, 'LOCAL_STORAGE_ENABLED', False):
+        return None, Response({
+            'error': f'Swift上传失败: {swift_result}。请检查Swift服务状态。'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    try:
+        local_success, local_result = upload_file_to_local(reader, user_id, uploaded_file.name)
+    except Exception as local_error:
+        return None, Response({
+            'error': f'Swift上传失败且本地存储异常: {swift_result}, 本地错误: {str(local_error)}'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    if not local_success:
+        return None, Response({
+            'error': f'Swift和本地存储都失败: Swift错误({swift_result}), 本地错误({local_result})'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    return {
+        'swift_container': None,
+        'swift_object': None,
+        'local_path': local_result,
+    }, reader.hexdigest()
+
+
+@streaming_upload
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
 def upload_file(request):
-    """上传文件"""
-    serializer = UploadFileSerializer(data=request.data)
-    if serializer.is_valid():
-        uploaded_file = serializer.validated_data['file']
-        folder_id = serializer.validated_data.get('folder_id')
-        
-        folder = None
-        if folder_id:
-            folder = get_object_or_404(Folder, id=folder_id, owner=request.user)
+    """上传文件
+    
+    文件内容在请求体接收过程中已由 StreamingStorageUploadHandler 写入存储，
+    这里只需登记内容并创建文件记录；存储空间在读取请求体之前已按 Content-Length
+    减去 multipart 开销预留，这里按实际大小调整
+    """
+    data = request.data
+    rejected_size = getattr(request, 'upload_quota_rejected', None)
+    if rejected_size is not None:
+        return quota_exceeded_response(request.user, rejected_size)
+    
+    serializer = UploadFileSerializer(data=data)
+    if not serializer.is_valid():
+        _discard_upload(data.get('file'))
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    uploaded_file = serializer.validated_data['file']
+    folder_id = serializer.validated_data.get('folder_id')
+    
+    folder = None
+    if folder_id:
+        folder = Folder.objects.filter(id=folder_id, owner=request.user).first()
+        if folder is None:
+            _discard_upload(uploaded_file)
+            raise Http404
+    
+    # 按实际大小调整预留（请求没有 Content-Length 时按实际大小预留）
+    reservation = getattr(request, 'upload_quota_reservation', None)
+    if reservation is None:
+        reservation = reserve_storage(request.user, uploaded_file.size)
+    elif not reservation.resize(uploaded_file.size):
+        reservation = None
+    if reservation is None:
+        _discard_upload(uploaded_file)
+        return quota_exceeded_response(request.user, uploaded_file.size)
+    
+    try:
+        if isinstance(uploaded_file, StreamedUploadedFile):
+            if uploaded_file.error:
+                return Response({
+                    'error': f'文件上传失败: {uploaded_file.error}'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            location = uploaded_file.location
+            sha256 = uploaded_file.sha256
+        else:
+            # 未经流式处理（如存储均不可用时由默认处理器接收）
+            location, result = _store_uploaded_file(uploaded_file, request.user.id)
+            if location is None:
+                return result
+            sha256 = result
         
         try:
             with transaction.atomic():
-                # 生成Swift对象名
-                object_name = f"{request.user.id}/{uuid.uuid4()}/{uploaded_file.name}"
-                container_name = f"user_{request.user.id}_files"
-                
-                # 尝试上传到Swift，如果失败则使用本地存储
-                swift_success, swift_result = upload_file_to_swift(uploaded_file, container_name, object_name)
-                
-                if not swift_success:
-                    # Swift失败，尝试本地存储
-                    if getattr(settings, 'LOCAL_STORAGE_ENABLED', False):
-                        try:
-                            local_success, local_result = upload_file_to_local(uploaded_file, request.user.id, uploaded_file.name)
-                            if local_success:
-                                swift_container = None
-                                swift_object = None
-                                local_path = local_result
-                            else:
-                                return Response({
-                                    'error': f'Swift和本地存储都失败: Swift错误({swift_result}), 本地错误({local_result})'
-                                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                        except Exception as local_error:
-                            return Response({
-                                'error': f'Swift上传失败且本地存储异常: {swift_result}, 本地错误: {str(local_error)}'
-                            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                    else:
-                        return Response({
-                            'error': f'Swift上传失败: {swift_result}。请检查Swift服务状态。'
-                        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                else:
-                    # Swift成功
-                    swift_container = container_name
-                    swift_object = object_name
-                    local_path = None
+                # 登记内容，已有相同内容时删除刚上传的副本
+                blob, created = blob_service.register(sha256, uploaded_file.size, location)
                 
                 # 创建文件记录
                 file_obj = File.objects.create(
@@ -108,23 +180,87 @@ def upload_file(request):
                     size=uploaded_file.size,
                     file_type=os.path.splitext(uploaded_file.name)[1],
                     mime_type=uploaded_file.content_type or 'application/octet-stream',
-                    swift_container=swift_container,
-                    swift_object=swift_object,
-                    local_path=local_path
+                    blob=blob,
+                    **blob.location
                 )
-                
-                # 更新用户存储使用量
-                request.user.used_storage += uploaded_file.size
-                request.user.save()
-                
-                return Response(FileSerializer(file_obj).data, status=status.HTTP_201_CREATED)
-                
         except Exception as e:
+            blob_service.delete_content(location, uploaded_file.size)
             return Response({
                 'error': f'文件上传过程中发生错误: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if not created:
+            blob_service.delete_content(location, uploaded_file.size)
+        
+        # 确认预留的存储空间
+        reservation.commit()
+        
+        return Response(FileSerializer(file_obj).data, status=status.HTTP_201_CREATED)
+    
+    finally:
+        # 未确认的预留（失败路径）归还
+        reservation.release()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def instant_upload(request):
+    """秒传：服务器已有相同内容时不传输文件数据
+    
+    1. 提交 file_name、size、sha256：内容不存在时返回 exists=false，客户端改用普通上传；
+       内容存在时返回需要校验的字节范围 ranges
+    2. 再次提交并附带 samples（各范围内容的 SHA-256）：校验通过后直接创建文件记录
+    """
+    serializer = InstantUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    folder = None
+    if data.get('folder_id'):
+        folder = get_object_or_404(Folder, id=data['folder_id'], owner=request.user)
+    
+    blob = blob_service.find(data['sha256'], data['size'])
+    if blob is None:
+        return Response({'exists': False})
+    
+    ranges = blob_service.get_sample_ranges(data['sha256'], data['size'], request.user.id)
+    samples = data.get('samples')
+    if samples is None:
+        return Response({'exists': True, 'ranges': ranges})
+    
+    if not blob_service.verify_samples(blob, ranges, samples):
+        return Response({'error': '内容校验失败'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        with transaction.atomic():
+            # 配额检查与扣除在同一条 UPDATE 中完成，随事务一起回滚
+            if reserve_storage(request.user, blob.size) is None:
+                return quota_exceeded_response(request.user, blob.size)
+            
+            if not blob_service.acquire(blob):
+                # 内容恰好被删除，客户端改用普通上传
+                transaction.set_rollback(True)
+                return Response({'exists': False})
+            
+            file_obj = File.objects.create(
+                name=data['file_name'],
+                original_name=data['file_name'],
+                folder=folder,
+                owner=request.user,
+                size=blob.size,
+                file_type=os.path.splitext(data['file_name'])[1],
+                mime_type=data.get('mime_type') or get_file_mime_type(data['file_name']),
+                blob=blob,
+                **blob.location
+            )
+            
+            return Response(FileSerializer(file_obj).data, status=status.HTTP_201_CREATED)
+    
+    except Exception as e:
+        return Response({
+            'error': f'文件上传过程中发生错误: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['DELETE'])
@@ -137,7 +273,8 @@ def delete_file(request, file_id):
         # 软删除：标记为已删除
         file_obj.is_deleted = True
         file_obj.deleted_at = timezone.now()
-        file_obj.save()
+        # 只写回删除标记，不覆盖同时在缓冲中累加的下载次数等字段
+        file_obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
         
         return Response({'message': '文件已移至回收站'})
             
@@ -1,6 +1,10 @@
 """
 文件夹相关视图
 """
+import hashlib
+import uuid
+
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -16,11 +20,103 @@ from ..serializers import FolderSerializer, CreateFolderSerializer
 def folder_list(request):
     """获取文件夹列表"""
     parent_id = request.GET.get('parent_id')
-    folders = Folder.objects.filter(owner=request.user, parent_id=parent_id)
-    serializer = FolderSerializer(folders, many=True)
+    folders = Folder.objects.filter(owner=request.user, parent_id=parent_id).with_counts()
+    
+    # 同级文件夹共用父路径，只计算一次
+    parent_path = ''
+    if parent_id:
+        parent = Folder.objects.filter(id=parent_id, owner=request.user).first()
+        parent_path = parent.full_path if parent else ''
+    
+    serializer = FolderSerializer(folders, many=True, context={'parent_path': parent_path})
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def folder_tree(request):
+    """获取文件夹树（嵌套结构）
+    
+    ?root_id= 只返回该文件夹及其子树；?depth= 只返回根以下若干层。
+    一次查询取出全部节点后在内存中组装；响应带 ETag，树未变化时返回 304
+    """
+    root_id = request.GET.get('root_id')
+    depth = request.GET.get('depth')
+    try:
+        depth = int(depth) if depth else None
+        root_id = uuid.UUID(root_id) if root_id else None
+    except ValueError:
+        return Response({'error': '无效的 root_id 或 depth 参数'}, status=status.HTTP_400_BAD_REQUEST)
+    if depth is not None and depth < 0:
+        return Response({'error': 'depth 不能为负数'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    folders = Folder.objects.filter(owner=request.user)
+    if root_id:
+        # 经闭包表取子树，depth 为相对子树根的层级差（条件须在同一个 filter 中，共用一次关联）
+        subtree = {'ancestor_links__ancestor_id': root_id}
+        if depth is not None:
+            subtree['ancestor_links__depth__lte'] = depth
+        folders = folders.filter(**subtree)
+    elif depth is not None:
+        # 祖先数（含自身）即所在层数，根目录下的文件夹为第 1 层
+        folders = folders.annotate(level=Count('ancestor_links')).filter(level__lte=depth)
+    
+    rows = list(folders.order_by('name').values('id', 'name', 'parent_id', 'updated_at'))
+    if root_id and not rows:
+        return Response({'error': '文件夹不存在'}, status=status.HTTP_404_NOT_FOUND)
+    
+    etag = _get_tree_etag(rows)
+    if _etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(_build_tree(rows, root_id))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _get_tree_etag(rows):
+    """根据树中全部节点计算 ETag（改名、移动都会更新 updated_at）"""
+    hasher = hashlib.sha1()
+    for row in rows:
+        hasher.update(f"{row['id']}:{row['parent_id']}:{row['name']}:{row['updated_at'].isoformat()}\n".encode())
+    return f'W/"{hasher.hexdigest()}"'
+
+
+def _etag_matches(request, etag):
+    """If-None-Match 是否包含当前 ETag（弱比较）"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    def opaque(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+    return any(opaque(tag) == opaque(etag) for tag in if_none_match.split(','))
+
+
+def _build_tree(rows, root_id=None):
+    """把扁平的节点列表组装为嵌套结构，O(n)
+    
+    Returns:
+        list: 顶层节点（指定 root_id 时只有该文件夹），每个节点含 children
+    """
+    nodes = {
+        row['id']: {'id': row['id'], 'name': row['name'], 'parent': row['parent_id'], 'children': []}
+        for row in rows
+    }
+    tree = []
+    for row in rows:
+        node = nodes[row['id']]
+        parent = nodes.get(row['parent_id'])
+        if parent is None or row['id'] == root_id:
+            tree.append(node)
+        else:
+            parent['children'].append(node)
+    return tree
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_folder(request):
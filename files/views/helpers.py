@@ -1,8 +1,35 @@
 """
 视图辅助函数模块
 """
+import os
+import uuid
+from urllib.parse import quote
+
 from django.conf import settings
 from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from ..serializers import JobSerializer
+from ..services.local_service import local_service
+from ..utils import open_file_stream
+
+
+# 不从存储后端响应复制给客户端的头
+SKIPPED_STORAGE_HEADERS = {
+    'content-disposition', 'content-type', 'content-length', 'content-range',
+    'accept-ranges', 'etag', 'last-modified',
+    'connection', 'keep-alive', 'transfer-encoding',
+}
+
+# 单个请求允许的最大范围数，超过时按完整文件返回
+MAX_RANGES = 20
+
+# 分享续传凭据的签名盐值
+RESUME_TOKEN_SALT = 'files.share.resume'
 
 
 def get_client_ip(request):
@@ -64,3 +91,342 @@ def format_bytes(bytes_value):
             return f"{bytes_value:.1f} {unit}"
         bytes_value /= 1024.0
     return f"{bytes_value:.1f} PB"
+
+
+def quota_exceeded_response(user, size):
+    """存储空间不足的响应
+    
+    超过账户总配额时返回 413（无论如何都存不下），超过剩余空间时返回 507
+    """
+    user.refresh_from_db(fields=['storage_quota', 'used_storage'])
+    if size > user.storage_quota:
+        return Response({
+            'error': f'文件大小({format_bytes(size)})超过存储配额({format_bytes(user.storage_quota)})'
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return Response({
+        'error': f'存储空间不足，剩余 {format_bytes(user.available_storage)}，需要 {format_bytes(size)}'
+    }, status=status.HTTP_507_INSUFFICIENT_STORAGE)
+
+
+def job_accepted_response(job, message):
+    """已提交后台任务的响应（202）
+    
+    未配置 Celery broker 时任务已在本请求内执行完毕，响应中即为最终状态
+    """
+    job.refresh_from_db()
+    response = Response({
+        'message': message,
+        'job_id': str(job.id),
+        'job': JobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = reverse('job_detail', kwargs={'job_id': job.id})
+    return response
+
+
+def get_file_etag(file_obj):
+    """文件的强校验 ETag（文件记录对应的对象内容不会改变）"""
+    return f'"{file_obj.id.hex}"'
+
+
+def get_file_last_modified(file_obj):
+    """文件内容的最后修改时间（Unix 时间戳）"""
+    return int(file_obj.created_at.timestamp())
+
+
+def parse_range_header(range_header, size):
+    """解析 Range 请求头（RFC 7233）
+    
+    Returns:
+        None: 未指定或格式无效（按完整文件返回）
+        list: [(start, end), ...] 闭区间；空列表表示范围无法满足
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    
+    ranges = []
+    for spec in range_header[len('bytes='):].split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        start_str, sep, end_str = spec.partition('-')
+        if not sep:
+            return None
+        try:
+            if start_str == '':
+                # 后缀范围：最后 N 个字节
+                suffix = int(end_str)
+                if suffix <= 0 or size == 0:
+                    continue
+                start, end = max(0, size - suffix), size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else None
+                if end is not None and end < start:
+                    return None
+                if start >= size:
+                    continue
+                end = size - 1 if end is None else min(end, size - 1)
+        except ValueError:
+            return None
+        ranges.append((start, end))
+    
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def if_range_matches(request, file_obj):
+    """校验 If-Range，不匹配时应忽略 Range 返回完整文件"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # 弱校验值永远不匹配
+        return if_range == get_file_etag(file_obj)
+    return parse_http_date_safe(if_range) == get_file_last_modified(file_obj)
+
+
+def get_requested_ranges(request, file_obj):
+    """本次请求实际输出的范围（If-Range 不匹配时忽略 Range）
+    
+    Returns:
+        None: 输出完整文件
+        list: [(start, end), ...]；空列表表示范围无法满足
+    """
+    if not if_range_matches(request, file_obj):
+        return None
+    return parse_range_header(request.META.get('HTTP_RANGE'), file_obj.size)
+
+
+def is_new_download(ranges):
+    """输出完整文件或包含第 0 字节的请求视为新的下载（续传和拖动进度条不包含文件开头）"""
+    return not ranges or any(start == 0 for start, _ in ranges)
+
+
+def counts_as_download(request, file_obj, response):
+    """新的下载才计入下载次数（拖动进度条不重复计数）
+    
+    按实际输出的范围判断；前端服务器发送文件时它与 Django 按同样的规则处理 Range
+    """
+    if response.status_code not in (200, 206):
+        return False
+    return is_new_download(get_requested_ranges(request, file_obj))
+
+
+def get_resume_cookie_name(share):
+    """分享续传凭据的 Cookie 名"""
+    return f'share_resume_{share.share_code}'
+
+
+def issue_resume_token(request, response, share):
+    """占用名额的下载响应附带签名的续传凭据，之后不包含文件开头的范围请求凭此不再占用名额"""
+    response.set_signed_cookie(
+        get_resume_cookie_name(share),
+        str(share.pk),
+        salt=RESUME_TOKEN_SALT,
+        max_age=getattr(settings, 'SHARE_RESUME_TOKEN_SECONDS', 24 * 60 * 60),
+        path=request.path,
+        httponly=True,
+        samesite='Lax',
+    )
+
+
+def has_resume_token(request, share):
+    """请求是否携带该分享有效的续传凭据"""
+    value = request.get_signed_cookie(
+        get_resume_cookie_name(share),
+        default=None,
+        salt=RESUME_TOKEN_SALT,
+        max_age=getattr(settings, 'SHARE_RESUME_TOKEN_SECONDS', 24 * 60 * 60),
+    )
+    return value == str(share.pk)
+
+
+class MultipartRangeStream:
+    """multipart/byteranges 响应体，逐个范围从存储读取"""
+    
+    def __init__(self, file_obj, ranges, boundary, content_type):
+        self.file_obj = file_obj
+        self.ranges = ranges
+        self.boundary = boundary
+        self.content_type = content_type
+        self._current = None
+    
+    def _part_header(self, start, end):
+        return (
+            f'--{self.boundary}\r\n'
+            f'Content-Type: {self.content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{self.file_obj.size}\r\n'
+            f'\r\n'
+        ).encode()
+    
+    def _closing(self):
+        return f'--{self.boundary}--\r\n'.encode()
+    
+    @property
+    def content_length(self):
+        """响应体总长度"""
+        length = len(self._closing())
+        for start, end in self.ranges:
+            length += len(self._part_header(start, end)) + (end - start + 1) + 2
+        return length
+    
+    def __iter__(self):
+        try:
+            for start, end in self.ranges:
+                yield self._part_header(start, end)
+                success, result = open_file_stream(self.file_obj, (start, end))
+                if not success:
+                    raise IOError(result)
+                self._current = result[0]
+                for chunk in self._current:
+                    yield chunk
+                self._current.close()
+                self._current = None
+                yield b'\r\n'
+            yield self._closing()
+        finally:
+            self.close()
+    
+    def close(self):
+        """关闭正在读取的范围流"""
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def set_file_headers(response, file_obj):
+    """设置下载响应的通用头信息"""
+    response['Content-Disposition'] = f'attachment; filename="{file_obj.original_name}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = get_file_etag(file_obj)
+    response['Last-Modified'] = http_date(get_file_last_modified(file_obj))
+
+
+def build_stream_response(file_obj, stream, headers=None, status=200, byte_range=None):
+    """根据文件读取流构造下载响应，内存占用与文件大小无关"""
+    response = StreamingHttpResponse(
+        stream,
+        status=status,
+        content_type=file_obj.mime_type or 'application/octet-stream'
+    )
+    if byte_range is not None:
+        start, end = byte_range
+        response['Content-Range'] = f'bytes {start}-{end}/{file_obj.size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response['Content-Length'] = file_obj.size
+    
+    # 复制其他必要的头信息
+    if headers:
+        for key, value in headers.items():
+            if key.lower() not in SKIPPED_STORAGE_HEADERS:
+                response[key] = value
+    
+    set_file_headers(response, file_obj)
+    return response
+
+
+def build_local_file_response(file_obj, ranges):
+    """按 LOCAL_STORAGE_SERVE_MODE 输出本地存储的文件
+    
+    x-accel-redirect / x-sendfile 模式由前端服务器发送文件内容（含 Range 处理），
+    sendfile 模式返回 FileResponse，由 WSGI 服务器零拷贝发送完整文件
+    
+    Returns:
+        HttpResponse or None: 不适用时返回 None，由调用方按流式方式输出
+    """
+    mode = getattr(settings, 'LOCAL_STORAGE_SERVE_MODE', 'stream')
+    content_type = file_obj.mime_type or 'application/octet-stream'
+    
+    if mode == 'x-accel-redirect':
+        relative_path = local_service.get_relative_path(file_obj.local_path)
+        if relative_path is None:
+            return None
+        prefix = getattr(settings, 'LOCAL_STORAGE_ACCEL_PREFIX', '/protected-storage/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(relative_path)}"
+        set_file_headers(response, file_obj)
+        return response
+    
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(file_obj.local_path)
+        set_file_headers(response, file_obj)
+        return response
+    
+    if mode == 'sendfile' and ranges is None:
+        try:
+            file_handle = open(file_obj.local_path, 'rb')
+        except OSError:
+            return None
+        response = FileResponse(file_handle, content_type=content_type)
+        set_file_headers(response, file_obj)
+        return response
+    
+    return None
+
+
+def build_temp_file_response(temp_file_path, content_type, filename):
+    """输出临时文件并删除
+    
+    文件打开后立即删除目录项，已打开的句柄仍可读取，由 FileResponse 发送
+    """
+    file_handle = open(temp_file_path, 'rb')
+    os.unlink(temp_file_path)
+    
+    response = FileResponse(file_handle, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def serve_file(request, file_obj):
+    """输出文件，支持 Range / If-Range 请求
+    
+    单个范围转为存储后端的范围读取，多个范围以 multipart/byteranges 返回
+    
+    Returns:
+        tuple: (success, response or error_message)
+    """
+    ranges = get_requested_ranges(request, file_obj)
+    
+    # 仅存于本地存储的文件，按配置交给前端服务器或 sendfile 发送
+    if file_obj.local_path and not (file_obj.swift_container and file_obj.swift_object):
+        response = build_local_file_response(file_obj, ranges)
+        if response is not None:
+            return True, response
+    
+    if ranges is None:
+        success, result = open_file_stream(file_obj)
+        if not success:
+            return False, result
+        stream, headers = result
+        return True, build_stream_response(file_obj, stream, headers)
+    
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{file_obj.size}'
+        response['Accept-Ranges'] = 'bytes'
+        return True, response
+    
+    if len(ranges) == 1:
+        success, result = open_file_stream(file_obj, ranges[0])
+        if not success:
+            return False, result
+        stream, headers = result
+        return True, build_stream_response(
+            file_obj, stream, headers, status=206, byte_range=ranges[0]
+        )
+    
+    boundary = uuid.uuid4().hex
+    stream = MultipartRangeStream(
+        file_obj, ranges, boundary, file_obj.mime_type or 'application/octet-stream'
+    )
+    response = StreamingHttpResponse(
+        stream,
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = stream.content_length
+    set_file_headers(response, file_obj)
+    return True, response
@@ -0,0 +1,29 @@
+"""
+后台任务相关视图
+"""
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from ..models import Job
+from ..serializers import JobSerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_list(request):
+    """获取最近的后台任务（?active=1 只返回未结束的任务）"""
+    jobs = Job.objects.filter(owner=request.user)
+    if request.GET.get('active', '').lower() in ('1', 'true', 'yes'):
+        jobs = jobs.filter(status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING])
+    serializer = JobSerializer(jobs[:50], many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail(request, job_id):
+    """查询后台任务的状态和进度"""
+    job = get_object_or_404(Job, id=job_id, owner=request.user)
+    return Response(JobSerializer(job).data)
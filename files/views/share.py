@@ -1,23 +1,35 @@
 """
 分享相关视图
 """
-import uuid
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
 from django.conf import settings
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from ..models import Folder, File, FileShare
+from ..jobs import create_job, enqueue_job
+from ..models import Folder, File, FileShare, Job
+from ..pagination import KeysetPagination
 from ..serializers import FileSerializer, FileShareSerializer
-from ..utils import generate_share_code, download_file_from_swift, upload_file_to_swift
+from ..tasks import save_shared_file as save_shared_file_task
+from ..utils import generate_share_code
+from ..services.blob_service import blob_service
+from ..quota import reserve_storage
+from ..counters import record_download, claim_capped_download, release_capped_download
 from .helpers import (
+    quota_exceeded_response,
     check_password_attempts,
     record_failed_attempt,
     clear_password_attempts,
+    serve_file,
+    counts_as_download,
+    get_requested_ranges,
+    is_new_download,
+    issue_resume_token,
+    has_resume_token,
+    job_accepted_response,
 )
 
 
@@ -56,18 +68,22 @@ def create_share(request, file_id):
 @permission_classes([IsAuthenticated])
 def my_shares(request):
     """获取我的分享列表"""
-    shares = FileShare.objects.filter(owner=request.user, is_active=True).order_by('-created_at')
-    serializer = FileShareSerializer(shares, many=True)
-    return Response(serializer.data)
+    shares = FileShare.objects.filter(owner=request.user, is_active=True).select_related('file')
+    paginator = KeysetPagination(count_cache_key=f'share_list_count:{request.user.id}')
+    result_page = paginator.paginate_queryset(shares, request)
+    serializer = FileShareSerializer(result_page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def deleted_shares(request):
     """获取已删除的分享列表"""
-    shares = FileShare.objects.filter(owner=request.user, is_active=False).order_by('-created_at')
-    serializer = FileShareSerializer(shares, many=True)
-    return Response(serializer.data)
+    shares = FileShare.objects.filter(owner=request.user, is_active=False).select_related('file')
+    paginator = KeysetPagination(count_cache_key=f'deleted_share_list_count:{request.user.id}')
+    result_page = paginator.paginate_queryset(shares, request)
+    serializer = FileShareSerializer(result_page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['DELETE'])
@@ -76,7 +92,8 @@ def delete_share(request, share_id):
     """删除分享"""
     share = get_object_or_404(FileShare, id=share_id, owner=request.user)
     share.is_active = False
-    share.save()
+    # 只更新状态，不覆盖并发下载累加的 download_count
+    share.save(update_fields=['is_active'])
     return Response({'message': '分享已取消'})
 
 
@@ -229,8 +246,16 @@ def download_shared_file(request, share_code):
             is_active=True
         )
         
-        # 检查是否过期
-        if share.is_expired():
+        # 限制下载次数的分享：按实际输出的范围判断，完整文件或包含文件开头的请求是新的下载，
+        # 需要占用名额；只有携带续传凭据（占用名额时签发）且不包含文件开头的请求属于续传，
+        # 不再占用，次数已满时仍可继续已开始的下载
+        capped = bool(share.max_downloads)
+        resuming = (
+            capped
+            and not is_new_download(get_requested_ranges(request, share.file))
+            and has_resume_token(request, share)
+        )
+        if share.is_expired(include_downloads=not resuming):
             return Response({
                 'error': '分享已过期'
             }, status=status.HTTP_410_GONE)
@@ -269,39 +294,38 @@ def download_shared_file(request, share_code):
         if share.password:
             clear_password_attempts(share_code, request)
         
-        # 检查下载次数
-        if share.max_downloads and share.download_count >= share.max_downloads:
+        # 新的下载原子地占用名额，并发下载不会超出上限
+        claimed = capped and not resuming
+        if claimed and not claim_capped_download(share):
             return Response({
                 'error': '下载次数已达上限'
             }, status=status.HTTP_410_GONE)
         
-        # 从Swift下载文件
-        success, result = download_file_from_swift(
-            share.file.swift_container, 
-            share.file.swift_object
-        )
-        
-        if not success:
-            return Response({
-                'error': f'文件下载失败: {result}'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        
-        # 更新下载次数
-        share.download_count += 1
-        share.save()
+        # 按块输出文件，支持 Range 断点续传和拖动播放
+        try:
+            success, result = serve_file(request, share.file)
+        except Exception:
+            if claimed:
+                release_capped_download(share)
+            raise
+        
+        if not success or result.status_code == 416:
+            if claimed:
+                release_capped_download(share)
+            if not success:
+                return Response({
+                    'error': f'文件下载失败: {result}'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return result
         
-        # 获取文件内容
-        file_content, headers = result
+        if claimed:
+            issue_resume_token(request, result, share)
         
-        # 直接返回文件内容进行下载
-        response = HttpResponse(
-            file_content,
-            content_type=share.file.mime_type or 'application/octet-stream'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{share.file.original_name}"'
-        response['Content-Length'] = share.file.size
+        # 不限次数的分享只统计新的下载，计数先在缓存中累加
+        if not capped and counts_as_download(request, share.file, result):
+            record_download('share', share.pk)
         
-        return response
+        return result
         
     except FileShare.DoesNotExist:
         return Response({
@@ -354,59 +378,55 @@ def save_shared_file(request):
                 'error': f'文件 "{share.file.original_name}" 已存在于目标位置'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 从Swift下载原文件内容
-        success, result = download_file_from_swift(
-            share.file.swift_container,
-            share.file.swift_object
-        )
-        
-        if not success:
-            return Response({
-                'error': f'无法获取文件内容: {result}'
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        
-        file_content, headers = result
+        source = share.file
+        
+        # 复制前预留存储空间，空间不足时不复制内容
+        reservation = reserve_storage(request.user, source.size)
+        if reservation is None:
+            return quota_exceeded_response(request.user, source.size)
+        
+        if not source.blob_id:
+            # 早期文件没有内容记录，需要在存储服务端复制一份（Swift COPY / 硬链接），
+            # 大文件耗时较长，交给后台任务；预留的空间由任务确认或归还
+            try:
+                job = create_job(request.user, Job.KIND_SAVE_SHARED_FILE, {
+                    'file_id': str(source.id),
+                    'folder_id': str(folder.id) if folder else None,
+                    'reserved': reservation.size,
+                })
+            except Exception:
+                reservation.release()
+                raise
+            reservation.commit()
+            enqueue_job(job, save_shared_file_task)
+            return job_accepted_response(job, '正在保存文件')
         
         try:
             with transaction.atomic():
-                # 生成新的Swift对象名
-                object_name = f"{request.user.id}/{uuid.uuid4()}/{share.file.original_name}"
-                container_name = f"user_{request.user.id}_files"
-                
-                # 将文件内容上传到用户的Swift容器
-                from django.core.files.uploadedfile import SimpleUploadedFile
-                temp_file = SimpleUploadedFile(
-                    share.file.original_name,
-                    file_content,
-                    content_type=share.file.mime_type
-                )
-                
-                upload_success, upload_result = upload_file_to_swift(
-                    temp_file, container_name, object_name
-                )
-                
-                if not upload_success:
+                if blob_service.acquire(source.blob):
+                    # 直接引用同一份内容，不复制数据
+                    blob = source.blob
+                else:
                     return Response({
-                        'error': f'文件上传失败: {upload_result}'
-                    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                        'error': '无法获取文件内容: 源文件已被删除'
+                    }, status=status.HTTP_410_GONE)
                 
                 # 创建文件记录
                 new_file = File.objects.create(
-                    name=share.file.original_name,
-                    original_name=share.file.original_name,
+                    name=source.original_name,
+                    original_name=source.original_name,
                     folder=folder,
                     owner=request.user,
-                    size=share.file.size,
-                    file_type=share.file.file_type,
-                    mime_type=share.file.mime_type,
-                    swift_container=container_name,
-                    swift_object=object_name,
-                    download_count=0
+                    size=source.size,
+                    file_type=source.file_type,
+                    mime_type=source.mime_type,
+                    blob=blob,
+                    download_count=0,
+                    **blob.location
                 )
                 
-                # 更新用户存储使用量
-                request.user.used_storage += share.file.size
-                request.user.save()
+                # 存储使用量已在预留时计入
+                reservation.commit()
                 
                 return Response({
                     'message': '文件保存成功',
@@ -417,6 +437,9 @@ def save_shared_file(request):
             return Response({
                 'error': f'保存过程中发生错误: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            # 未成功保存时归还预留
+            reservation.release()
             
     except FileShare.DoesNotExist:
         return Response({
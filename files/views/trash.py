@@ -1,39 +1,61 @@
 """
 回收站相关视图
+
+统计、恢复是针对集合的语句，不把回收站中的文件逐条读入内存；
+清空和批量彻底删除提交为后台任务（files.tasks.purge_trash），立即返回 202
 """
-import os
+import uuid
+
 from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from ..models import File
+from ..jobs import create_job, enqueue_job, find_active_job
+from ..models import File, Job
+from ..pagination import KeysetPagination
+from ..quota import adjust_storage
 from ..serializers import FileSerializer
-from ..utils import delete_file_from_swift
-from .helpers import format_bytes
+from ..tasks import purge_trash
+from ..utils import release_file_storage
+from .helpers import format_bytes, job_accepted_response
+
+# 一次批量操作最多处理的文件数
+BULK_TRASH_LIMIT = 1000
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def trash_list(request):
     """获取回收站文件列表"""
-    files = File.objects.filter(owner=request.user, is_deleted=True).order_by('-deleted_at')
-    serializer = FileSerializer(files, many=True)
-    return Response(serializer.data)
+    # 键集分页要求排序字段不为 NULL；移入回收站时都会设置 deleted_at，旧数据已由迁移补齐
+    files = File.objects.filter(
+        owner=request.user, is_deleted=True, deleted_at__isnull=False
+    ).select_related('folder')
+    paginator = KeysetPagination(
+        ordering=('-deleted_at', 'id'),
+        count_cache_key=f'trash_list_count:{request.user.id}'
+    )
+    result_page = paginator.paginate_queryset(files, request)
+    serializer = FileSerializer(result_page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def trash_stats(request):
     """获取回收站统计信息"""
-    deleted_files = File.objects.filter(owner=request.user, is_deleted=True)
-    count = deleted_files.count()
-    total_size = sum(f.size for f in deleted_files)
+    totals = File.objects.filter(owner=request.user, is_deleted=True).aggregate(
+        count=Count('id'), total_size=Sum('size')
+    )
+    total_size = totals['total_size'] or 0
     
     return Response({
-        'count': count,
+        'count': totals['count'],
         'total_size': total_size,
         'total_size_display': format_bytes(total_size)
     })
@@ -49,7 +71,7 @@ def restore_file(request, file_id):
         # 恢复文件
         file_obj.is_deleted = False
         file_obj.deleted_at = None
-        file_obj.save()
+        file_obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
         
         return Response({
             'message': '文件已恢复',
@@ -69,29 +91,12 @@ def permanent_delete_file(request, file_id):
     
     try:
         with transaction.atomic():
-            # 尝试从Swift删除文件
-            try:
-                if file_obj.swift_container and file_obj.swift_object:
-                    success, result = delete_file_from_swift(file_obj.swift_container, file_obj.swift_object)
-                    if not success:
-                        print(f"Warning: Swift deletion failed: {result}")
-            except Exception as swift_error:
-                print(f"Warning: Swift deletion error: {swift_error}")
-            
-            # 尝试删除本地文件
-            if file_obj.local_path:
-                try:
-                    if os.path.exists(file_obj.local_path):
-                        os.remove(file_obj.local_path)
-                except Exception as local_error:
-                    print(f"Warning: Local file deletion error: {local_error}")
+            # 删除文件记录，再释放存储（内容无其他引用时才删除对象）
+            file_obj.delete()
+            release_file_storage(file_obj)
             
             # 更新用户存储使用量
-            request.user.used_storage -= file_obj.size
-            request.user.save()
-            
-            # 删除文件记录
-            file_obj.delete()
+            adjust_storage(request.user.id, -file_obj.size)
             
             return Response({'message': '文件已彻底删除'})
             
@@ -105,43 +110,54 @@ def permanent_delete_file(request, file_id):
 @permission_classes([IsAuthenticated])
 def empty_trash(request):
     """清空回收站"""
+    if not File.objects.filter(owner=request.user, is_deleted=True).exists():
+        return Response({
+            'message': '回收站已经是空的',
+            'deleted_count': 0,
+            'freed_space': 0
+        })
+    
+    # 已有进行中的清空任务时直接返回该任务
+    job = find_active_job(request.user, Job.KIND_PURGE_TRASH)
+    if job is None:
+        job = create_job(request.user, Job.KIND_PURGE_TRASH)
+        enqueue_job(job, purge_trash)
+    return job_accepted_response(job, '正在清空回收站')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_trash(request):
+    """批量恢复或彻底删除回收站文件
+    
+    请求体：{"action": "restore" | "delete", "ids": [文件ID, ...]}，
+    一次最多 BULK_TRASH_LIMIT 个；不在回收站中的 ID 忽略。
+    恢复直接执行，彻底删除提交为后台任务
+    """
+    action = request.data.get('action')
+    ids = request.data.get('ids')
+    if action not in ('restore', 'delete'):
+        return Response({'error': 'action 必须是 restore 或 delete'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(ids, list) or not ids:
+        return Response({'error': 'ids 必须是非空列表'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > BULK_TRASH_LIMIT:
+        return Response({
+            'error': f'一次最多处理 {BULK_TRASH_LIMIT} 个文件'
+        }, status=status.HTTP_400_BAD_REQUEST)
     try:
-        with transaction.atomic():
-            deleted_files = File.objects.filter(owner=request.user, is_deleted=True)
-            total_size = 0
-            
-            for file_obj in deleted_files:
-                # 尝试从Swift删除文件
-                try:
-                    if file_obj.swift_container and file_obj.swift_object:
-                        delete_file_from_swift(file_obj.swift_container, file_obj.swift_object)
-                except Exception:
-                    pass
-                
-                # 尝试删除本地文件
-                if file_obj.local_path:
-                    try:
-                        if os.path.exists(file_obj.local_path):
-                            os.remove(file_obj.local_path)
-                    except Exception:
-                        pass
-                
-                total_size += file_obj.size
-            
-            count = deleted_files.count()
-            deleted_files.delete()
-            
-            # 更新用户存储使用量
-            request.user.used_storage -= total_size
-            request.user.save()
-            
-            return Response({
-                'message': f'已清空回收站，共删除 {count} 个文件',
-                'deleted_count': count,
-                'freed_space': total_size
-            })
-            
-    except Exception as e:
+        ids = sorted({str(uuid.UUID(str(file_id))) for file_id in ids})
+    except ValueError:
+        return Response({'error': 'ids 中包含无效的文件ID'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if action == 'restore':
+        count = File.objects.filter(owner=request.user, is_deleted=True, id__in=ids).update(
+            is_deleted=False, deleted_at=None, updated_at=timezone.now()
+        )
         return Response({
-            'error': f'清空回收站失败: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            'message': f'已恢复 {count} 个文件',
+            'restored_count': count
+        })
+    
+    job = create_job(request.user, Job.KIND_PURGE_TRASH, {'ids': ids})
+    enqueue_job(job, purge_trash)
+    return job_accepted_response(job, f'正在彻底删除 {len(ids)} 个文件')
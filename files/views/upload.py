@@ -0,0 +1,260 @@
+"""
+分片上传（断点续传）视图
+
+流程：创建会话 → 按偏移 PUT 分片（可乱序、并行）→ 查询已接收的偏移 → 完成合并
+创建会话时按声明的文件大小预留存储空间，空间不足时直接拒绝；文件记录只在合并成功后写入，
+取消或合并失败时归还预留
+"""
+import io
+import os
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from ..models import Folder, File, UploadSession, UploadChunk
+from ..quota import reserve_storage, release_reservation
+from ..serializers import FileSerializer, CreateUploadSessionSerializer, UploadSessionSerializer
+from ..services.blob_service import blob_service
+from ..services.local_service import local_service
+from ..services.upload_service import upload_service
+from ..tasks import hash_blob
+from ..utils import delete_file_from_swift, get_file_mime_type
+from .helpers import quota_exceeded_response
+
+
+def _get_active_session(request, session_id):
+    """获取当前用户未过期的上传会话（过期会话的分片和预留空间由定期清理回收）"""
+    session = get_object_or_404(UploadSession, id=session_id, owner=request.user)
+    if session.status == UploadSession.STATUS_UPLOADING and session.is_expired():
+        return None
+    return session
+
+
+def _session_progress(session, chunks):
+    """计算上传进度
+
+    Returns:
+        dict: received_chunks 已接收的分片序号，offset 从头开始连续已接收的字节数
+    """
+    received = sorted(chunk.index for chunk in chunks)
+    contiguous = 0
+    for index in received:
+        if index != contiguous:
+            break
+        contiguous += 1
+    return {
+        'received_chunks': received,
+        'received_bytes': sum(chunk.size for chunk in chunks),
+        'offset': min(contiguous * session.chunk_size, session.size),
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload_session(request):
+    """创建分片上传会话"""
+    serializer = CreateUploadSessionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    folder = None
+    if data.get('folder_id'):
+        folder = get_object_or_404(Folder, id=data['folder_id'], owner=request.user)
+
+    chunk_size = data.get('chunk_size') or upload_service.default_chunk_size
+    if not upload_service.min_chunk_size <= chunk_size <= upload_service.max_chunk_size:
+        return Response({
+            'error': f'分片大小必须在 {upload_service.min_chunk_size} 到 '
+                     f'{upload_service.max_chunk_size} 字节之间'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    backend = upload_service.choose_backend(request.user.id)
+    if backend is None:
+        return Response({
+            'error': 'Swift和本地存储都不可用，请检查存储服务状态。'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    # 创建会话时预留存储空间，直到会话完成或取消
+    if reserve_storage(request.user, data['size']) is None:
+        return quota_exceeded_response(request.user, data['size'])
+
+    try:
+        session = UploadSession.objects.create(
+            owner=request.user,
+            folder=folder,
+            file_name=data['file_name'],
+            mime_type=data.get('mime_type') or get_file_mime_type(data['file_name']),
+            size=data['size'],
+            chunk_size=chunk_size,
+            backend=backend,
+            expires_at=timezone.now() + timedelta(seconds=upload_service.session_ttl),
+        )
+    except Exception:
+        release_reservation(request.user.id, data['size'])
+        raise
+
+    return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, session_id):
+    """查询上传进度（GET）或取消上传（DELETE）"""
+    session = _get_active_session(request, session_id)
+    if session is None:
+        return Response({'error': '上传会话已过期'}, status=status.HTTP_410_GONE)
+
+    chunks = list(session.chunks.all())
+
+    if request.method == 'DELETE':
+        if session.status == UploadSession.STATUS_COMPLETING:
+            return Response({'error': '文件正在合并，无法取消'}, status=status.HTTP_409_CONFLICT)
+        if session.status == UploadSession.STATUS_UPLOADING:
+            upload_service.discard(session, chunks)
+            release_reservation(session.owner_id, session.size)
+        session.delete()
+        return Response({'message': '上传已取消'})
+
+    data = UploadSessionSerializer(session).data
+    data.update(_session_progress(session, chunks))
+    return Response(data)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, session_id):
+    """上传一个分片
+
+    请求体为分片的原始字节，通过 ?offset= 指定分片在文件中的起始位置，
+    offset 必须是分片大小的整数倍。同一分片可重复上传（覆盖）
+    """
+    session = _get_active_session(request, session_id)
+    if session is None:
+        return Response({'error': '上传会话已过期'}, status=status.HTTP_410_GONE)
+    if session.status != UploadSession.STATUS_UPLOADING:
+        return Response({'error': '上传会话已结束'}, status=status.HTTP_409_CONFLICT)
+
+    try:
+        offset = int(request.GET.get('offset', ''))
+    except ValueError:
+        return Response({'error': '缺少有效的 offset 参数'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if offset < 0 or offset % session.chunk_size != 0 or (offset >= session.size and offset != 0):
+        return Response({'error': 'offset 必须是分片大小的整数倍且小于文件大小'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    index = offset // session.chunk_size
+    length = session.get_chunk_length(index)
+
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or '')
+    except ValueError:
+        return Response({'error': '缺少 Content-Length'}, status=status.HTTP_411_LENGTH_REQUIRED)
+    if content_length != length:
+        return Response({'error': f'分片长度应为 {length} 字节'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 请求体直接写入存储，不经过表单解析
+    stream = request.stream if length else io.BytesIO()
+    success, result = upload_service.store_chunk(session, index, stream, length)
+    if not success:
+        return Response({'error': f'分片保存失败: {result}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    try:
+        UploadChunk.objects.update_or_create(
+            session=session, index=index,
+            defaults={'size': length, 'etag': result or ''}
+        )
+    except IntegrityError:
+        # 同一分片并发上传，以后写入的为准
+        UploadChunk.objects.filter(session=session, index=index).update(size=length, etag=result or '')
+
+    # 有新分片到达时顺延会话有效期
+    UploadSession.objects.filter(id=session.id).update(
+        expires_at=timezone.now() + timedelta(seconds=upload_service.session_ttl)
+    )
+
+    return Response({'index': index, 'offset': offset, 'size': length})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_upload_session(request, session_id):
+    """完成分片上传：合并分片并创建文件记录"""
+    session = _get_active_session(request, session_id)
+    if session is None:
+        return Response({'error': '上传会话已过期'}, status=status.HTTP_410_GONE)
+
+    if session.status == UploadSession.STATUS_COMPLETED and session.file_id:
+        # 重复提交（如客户端未收到响应后重试）
+        return Response(FileSerializer(session.file).data)
+
+    chunks = list(session.chunks.all())
+    received = {chunk.index for chunk in chunks}
+    missing = [index for index in range(session.total_chunks) if index not in received]
+    if missing:
+        return Response({
+            'error': '分片未上传完整',
+            'missing_chunks': missing[:100],
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # 原子地抢占会话，避免并发请求重复合并
+    claimed = UploadSession.objects.filter(
+        id=session.id, status=UploadSession.STATUS_UPLOADING
+    ).update(status=UploadSession.STATUS_COMPLETING)
+    if not claimed:
+        return Response({'error': '文件正在合并'}, status=status.HTTP_409_CONFLICT)
+
+    success, result = upload_service.assemble(session, chunks)
+    if not success:
+        UploadSession.objects.filter(id=session.id).update(status=UploadSession.STATUS_UPLOADING)
+        return Response({'error': f'文件合并失败: {result}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    location, sha256 = result
+
+    try:
+        with transaction.atomic():
+            # 登记内容，已有相同内容时删除刚合并的副本
+            blob, created = blob_service.register(sha256, session.size, location)
+            file_obj = File.objects.create(
+                name=session.file_name,
+                original_name=session.file_name,
+                folder=session.folder,
+                owner=request.user,
+                size=session.size,
+                file_type=os.path.splitext(session.file_name)[1],
+                mime_type=session.mime_type or 'application/octet-stream',
+                blob=blob,
+                **blob.location
+            )
+
+            # 存储空间已在创建会话时预留
+            session.status = UploadSession.STATUS_COMPLETED
+            session.file = file_obj
+            session.save()
+            session.chunks.all().delete()
+
+            if sha256 is None:
+                # Swift 在服务端合并，提交后读取合并结果计算哈希，之后参与去重和秒传
+                transaction.on_commit(lambda: hash_blob.delay(blob.pk))
+    except Exception as e:
+        # 分片已合并，无法回到上传中状态：删除合并结果并结束会话
+        if location['swift_object']:
+            delete_file_from_swift(location['swift_container'], location['swift_object'], session.size)
+        if location['local_path']:
+            local_service.delete_file(location['local_path'])
+        UploadSession.objects.filter(id=session.id).delete()
+        release_reservation(session.owner_id, session.size)
+        return Response({
+            'error': f'文件上传过程中发生错误: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if not created:
+        blob_service.delete_content(location, session.size)
+
+    return Response(FileSerializer(file_obj).data, status=status.HTTP_201_CREATED)
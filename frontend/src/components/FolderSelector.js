@@ -36,10 +36,9 @@ const FolderSelector = ({
   const fetchFolders = async () => {
     try {
       setLoadingTree(true);
-      const response = await api.get('/api/files/folders/');
+      const response = await api.get('/api/files/folders/tree/');
       
-      const folders = response.data;
-      const treeData = buildTreeData(folders);
+      const treeData = buildTreeData(response.data);
       
       setTreeData([
         {
@@ -56,15 +55,13 @@ const FolderSelector = ({
     }
   };
 
-  const buildTreeData = (folders, parentId = null) => {
-    return folders
-      .filter(folder => folder.parent === parentId)
-      .map(folder => ({
-        title: folder.name,
-        key: folder.id,
-        icon: <FolderOutlined />,
-        children: buildTreeData(folders, folder.id)
-      }));
+  const buildTreeData = (folders) => {
+    return folders.map(folder => ({
+      title: folder.name,
+      key: folder.id,
+      icon: <FolderOutlined />,
+      children: buildTreeData(folder.children)
+    }));
   };
 
   const handleSelect = (selectedKeys) => {
@@ -29,8 +29,9 @@ import {
   CloudDownloadOutlined
 } from '@ant-design/icons';
 import { useParams, useNavigate } from 'react-router-dom';
-import { useQuery, useMutation, useQueryClient } from 'react-query';
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from 'react-query';
 import api from '../services/api';
+import { fetchCursorPage, getNextCursor, flattenPages } from '../services/pagination';
 import ShareModal from '../components/ShareModal';
 
 const { Title, Text } = Typography;
@@ -63,12 +64,26 @@ const Files = () => {
     }).then(res => res.data)
   );
 
-  const { data: filesData, isLoading } = useQuery(
+  // 文件列表为游标分页，按需加载更多
+  const {
+    data: filesPages,
+    isLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage
+  } = useInfiniteQuery(
     ['files', folderId],
-    () => api.get('/api/files/', { 
-      params: folderId ? { folder_id: folderId } : {} 
-    }).then(res => res.data),
-    { refetchOnWindowFocus: false }
+    fetchCursorPage('/api/files/', folderId ? { folder_id: folderId } : {}),
+    { refetchOnWindowFocus: false, getNextPageParam: getNextCursor }
+  );
+  const files = flattenPages(filesPages);
+
+  const loadMoreFiles = hasNextPage && (
+    <div style={{ textAlign: 'center', marginTop: 16 }}>
+      <Button onClick={() => fetchNextPage()} loading={isFetchingNextPage}>
+        加载更多
+      </Button>
+    </div>
   );
 
   const uploadMutation = useMutation(
@@ -559,20 +574,12 @@ const Files = () => {
           
           <Card className="cel-card" title="文件" size="small">
             <List
-              dataSource={filesData?.results || filesData || []}
+              dataSource={files}
               renderItem={MobileFileItem}
               loading={isLoading}
               size="small"
-              pagination={
-                filesData?.count > 20 ? {
-                  total: filesData?.count,
-                  pageSize: 20,
-                  showSizeChanger: false,
-                  showQuickJumper: false,
-                  simple: true,
-                } : false
-              }
             />
+            {loadMoreFiles}
           </Card>
         </Space>
       ) : (
@@ -594,17 +601,13 @@ const Files = () => {
             <Card className="cel-card" title="文件">
               <Table
                 columns={fileColumns}
-                dataSource={filesData?.results || filesData || []}
+                dataSource={files}
                 rowKey="id"
                 loading={isLoading}
-                pagination={{
-                  total: filesData?.count,
-                  pageSize: 20,
-                  showSizeChanger: false,
-                  showQuickJumper: true,
-                }}
+                pagination={false}
                 size="small"
               />
+              {loadMoreFiles}
             </Card>
           </Col>
         </Row>
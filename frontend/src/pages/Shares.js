@@ -26,9 +26,10 @@ import {
   EyeOutlined,
   HistoryOutlined
 } from '@ant-design/icons';
-import { useQuery, useMutation, useQueryClient } from 'react-query';
+import { useInfiniteQuery, useMutation, useQueryClient } from 'react-query';
 import dayjs from 'dayjs';
 import api from '../services/api';
+import { fetchCursorPage, getNextCursor, flattenPages } from '../services/pagination';
 import { formatBytes, formatDateTime, getFileIcon } from '../utils/format';
 
 const { Title, Text } = Typography;
@@ -52,18 +53,22 @@ const Shares = () => {
     return () => window.removeEventListener('resize', checkMobile);
   }, []);
 
-  const { data: shares = [], isLoading } = useQuery(
+  // 游标分页，按需加载更多
+  const sharesQuery = useInfiniteQuery(
     'my-shares',
-    () => api.get('/api/files/shares/').then(res => res.data),
-    { enabled: !showDeleted }
+    fetchCursorPage('/api/files/shares/'),
+    { enabled: !showDeleted, getNextPageParam: getNextCursor }
   );
 
-  const { data: deletedShares = [], isLoading: isLoadingDeleted } = useQuery(
+  const deletedSharesQuery = useInfiniteQuery(
     'deleted-shares',
-    () => api.get('/api/files/shares/deleted/').then(res => res.data),
-    { enabled: showDeleted }
+    fetchCursorPage('/api/files/shares/deleted/'),
+    { enabled: showDeleted, getNextPageParam: getNextCursor }
   );
 
+  const currentQuery = showDeleted ? deletedSharesQuery : sharesQuery;
+  const currentShares = flattenPages(currentQuery.data);
+
   const createShareMutation = useMutation(
     (fileId) => api.post(`/api/files/${fileId}/share/`),
     {
@@ -339,12 +344,12 @@ const Shares = () => {
         // 移动端视图
         <Card className="cel-card" size="small">
           <List
-            dataSource={showDeleted ? deletedShares : shares}
+            dataSource={currentShares}
             renderItem={MobileShareItem}
-            loading={showDeleted ? isLoadingDeleted : isLoading}
+            loading={currentQuery.isLoading}
             size="small"
             pagination={
-              (showDeleted ? deletedShares : shares)?.length > 10 ? {
+              currentShares.length > 10 ? {
                 pageSize: 10,
                 showSizeChanger: false,
                 showQuickJumper: false,
@@ -358,9 +363,9 @@ const Shares = () => {
         <Card className="cel-card">
           <Table
             columns={columns}
-            dataSource={showDeleted ? deletedShares : shares}
+            dataSource={currentShares}
             rowKey="id"
-            loading={showDeleted ? isLoadingDeleted : isLoading}
+            loading={currentQuery.isLoading}
             pagination={{
               pageSize: 10,
               showSizeChanger: false,
@@ -370,6 +375,14 @@ const Shares = () => {
         </Card>
       )}
 
+      {currentQuery.hasNextPage && (
+        <div style={{ textAlign: 'center', marginTop: 16 }}>
+          <Button onClick={() => currentQuery.fetchNextPage()} loading={currentQuery.isFetchingNextPage}>
+            加载更多
+          </Button>
+        </div>
+      )}
+
       {/* 创建分享模态框 */}
       <Modal
         title="创建文件分享"
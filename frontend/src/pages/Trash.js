@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useState } from 'react';
 import { 
   Card, 
   Table, 
@@ -27,8 +27,10 @@ import {
   PlayCircleOutlined,
   ClearOutlined
 } from '@ant-design/icons';
-import { useQuery, useMutation, useQueryClient } from 'react-query';
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from 'react-query';
 import api from '../services/api';
+import { resolveJob } from '../services/jobs';
+import { fetchCursorPage, getNextCursor, flattenPages } from '../services/pagination';
 
 const { Title, Text } = Typography;
 const { confirm } = Modal;
@@ -78,11 +80,19 @@ const formatDate = (dateStr) => {
 
 const Trash = () => {
   const queryClient = useQueryClient();
+  const [selectedRowKeys, setSelectedRowKeys] = useState([]);
 
-  // 获取回收站文件列表
-  const { data: trashFiles, isLoading } = useQuery('trash-files', () =>
-    api.get('/api/files/trash/').then(res => res.data)
-  );
+  // 获取回收站文件列表（游标分页，按需加载更多）
+  const {
+    data: trashPages,
+    isLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage
+  } = useInfiniteQuery('trash-files', fetchCursorPage('/api/files/trash/'), {
+    getNextPageParam: getNextCursor
+  });
+  const trashFiles = flattenPages(trashPages);
 
   // 获取回收站统计
   const { data: trashStats } = useQuery('trash-stats', () =>
@@ -123,10 +133,10 @@ const Trash = () => {
 
   // 清空回收站
   const emptyTrashMutation = useMutation(
-    () => api.delete('/api/files/trash/empty/'),
+    () => api.delete('/api/files/trash/empty/').then((res) => resolveJob(res)),
     {
-      onSuccess: (res) => {
-        message.success(res.data.message || '回收站已清空');
+      onSuccess: (result) => {
+        message.success(`已清空回收站，共删除 ${result?.deleted_count || 0} 个文件`);
         queryClient.invalidateQueries('trash-files');
         queryClient.invalidateQueries('trash-stats');
         queryClient.invalidateQueries('storage-info');
@@ -137,6 +147,28 @@ const Trash = () => {
     }
   );
 
+  // 批量恢复 / 彻底删除
+  const bulkMutation = useMutation(
+    ({ action, ids }) => api.post('/api/files/trash/bulk/', { action, ids }).then((res) => resolveJob(res)),
+    {
+      onSuccess: (result) => {
+        message.success(
+          result.restored_count !== undefined
+            ? `已恢复 ${result.restored_count} 个文件`
+            : `已彻底删除 ${result.deleted_count} 个文件`
+        );
+        setSelectedRowKeys([]);
+        queryClient.invalidateQueries('trash-files');
+        queryClient.invalidateQueries('trash-stats');
+        queryClient.invalidateQueries('file-list');
+        queryClient.invalidateQueries('storage-info');
+      },
+      onError: (error) => {
+        message.error(error.response?.data?.error || '操作失败');
+      }
+    }
+  );
+
   // 确认清空回收站
   const handleEmptyTrash = () => {
     confirm({
@@ -303,10 +335,37 @@ const Trash = () => {
           boxShadow: '4px 4px 0 #333'
         }}
       >
+        {selectedRowKeys.length > 0 && (
+          <Space style={{ marginBottom: 16 }}>
+            <Text>已选择 {selectedRowKeys.length} 个文件</Text>
+            <Button
+              icon={<UndoOutlined />}
+              loading={bulkMutation.isLoading}
+              onClick={() => bulkMutation.mutate({ action: 'restore', ids: selectedRowKeys })}
+            >
+              批量恢复
+            </Button>
+            <Popconfirm
+              title={`确定彻底删除选中的 ${selectedRowKeys.length} 个文件吗？此操作不可恢复！`}
+              onConfirm={() => bulkMutation.mutate({ action: 'delete', ids: selectedRowKeys })}
+              okText="删除"
+              cancelText="取消"
+              okButtonProps={{ danger: true }}
+            >
+              <Button danger icon={<DeleteOutlined />} loading={bulkMutation.isLoading}>
+                批量删除
+              </Button>
+            </Popconfirm>
+          </Space>
+        )}
         <Table
           columns={columns}
-          dataSource={trashFiles || []}
+          dataSource={trashFiles}
           rowKey="id"
+          rowSelection={{
+            selectedRowKeys,
+            onChange: setSelectedRowKeys
+          }}
           loading={isLoading}
           pagination={{ 
             pageSize: 10,
@@ -322,6 +381,13 @@ const Trash = () => {
           }}
           scroll={{ x: 700 }}
         />
+        {hasNextPage && (
+          <div style={{ textAlign: 'center', marginTop: 16 }}>
+            <Button onClick={() => fetchNextPage()} loading={isFetchingNextPage}>
+              加载更多
+            </Button>
+          </div>
+        )}
       </Card>
 
       {/* 提示信息 */}
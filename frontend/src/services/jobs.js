@@ -0,0 +1,27 @@
+import api from './api';
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// 轮询后台任务直到结束，返回任务的最终状态
+export const waitForJob = async (jobId, { interval = 1000, onProgress } = {}) => {
+  for (;;) {
+    const { data: job } = await api.get(`/api/files/jobs/${jobId}/`);
+    if (onProgress) onProgress(job);
+    if (job.is_finished) return job;
+    await sleep(interval);
+  }
+};
+
+// 接口返回 202 时等待后台任务结束；任务失败时抛出错误（与请求失败的处理方式一致）
+export const resolveJob = async (response, options) => {
+  if (response.status !== 202) return response.data;
+  const job = response.data.job.is_finished
+    ? response.data.job
+    : await waitForJob(response.data.job_id, options);
+  if (job.status === 'failed') {
+    const error = new Error(job.error);
+    error.response = { data: { error: job.error } };
+    throw error;
+  }
+  return job.result;
+};
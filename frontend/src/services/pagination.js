@@ -0,0 +1,11 @@
+import api from './api';
+
+// 游标分页（后端 KeysetPagination）：第一页按 url 和 params 请求，之后请求上一页返回的 next 链接（已带查询参数）
+export const fetchCursorPage = (url, params) => ({ pageParam }) =>
+  (pageParam ? api.get(pageParam) : api.get(url, { params })).then((res) => res.data);
+
+// next 为 null 时没有更多数据
+export const getNextCursor = (lastPage) => lastPage.next || undefined;
+
+// 合并已加载的各页结果
+export const flattenPages = (data) => (data ? data.pages.flatMap((page) => page.results) : []);